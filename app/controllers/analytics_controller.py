@@ -0,0 +1,70 @@
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
+from litestar import Controller, get
+from litestar.params import Parameter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.records import (
+    DailyRevenueRecord,
+    ProductDailySalesRecord,
+    ProductSalesRecord,
+    StatusRevenueRecord,
+    to_records,
+)
+from app.services.analytics_service import AnalyticsService
+
+
+class AnalyticsController(Controller):
+    path = "/analytics"
+
+    @get("/revenue")
+    async def get_revenue(
+        self,
+        analytics_service: AnalyticsService,
+        db_session: AsyncSession,
+        date_from: Optional[date] = Parameter(default=None),
+        date_to: Optional[date] = Parameter(default=None),
+        status: str = Parameter(default=""),
+    ) -> List[DailyRevenueRecord]:
+        """Число заказов и выручка по дням, при необходимости - только заказов в статусе status"""
+        rows = await analytics_service.revenue_by_day(db_session, date_from, date_to, status or None)
+        return to_records(rows, DailyRevenueRecord)
+
+    @get("/statuses")
+    async def get_statuses(
+        self,
+        analytics_service: AnalyticsService,
+        db_session: AsyncSession,
+        date_from: Optional[date] = Parameter(default=None),
+        date_to: Optional[date] = Parameter(default=None),
+    ) -> List[StatusRevenueRecord]:
+        """Число заказов и выручка за период в разрезе статусов"""
+        rows = await analytics_service.revenue_by_status(db_session, date_from, date_to)
+        return to_records(rows, StatusRevenueRecord)
+
+    @get("/products")
+    async def get_top_products(
+        self,
+        analytics_service: AnalyticsService,
+        db_session: AsyncSession,
+        limit: int = Parameter(gt=0, le=100, default=10),
+        date_from: Optional[date] = Parameter(default=None),
+        date_to: Optional[date] = Parameter(default=None),
+    ) -> List[ProductSalesRecord]:
+        """Продукты с наибольшей выручкой за период"""
+        rows = await analytics_service.top_products(db_session, limit, date_from, date_to)
+        return to_records(rows, ProductSalesRecord)
+
+    @get("/products/{product_id:uuid}")
+    async def get_product_sales(
+        self,
+        analytics_service: AnalyticsService,
+        db_session: AsyncSession,
+        product_id: UUID = Parameter(),
+        date_from: Optional[date] = Parameter(default=None),
+        date_to: Optional[date] = Parameter(default=None),
+    ) -> List[ProductDailySalesRecord]:
+        """Продажи продукта по дням"""
+        rows = await analytics_service.product_by_day(db_session, product_id, date_from, date_to)
+        return to_records(rows, ProductDailySalesRecord)
@@ -0,0 +1,25 @@
+from typing import Any, List, Optional
+from uuid import UUID
+
+from litestar.exceptions import ValidationException
+
+from app.schemas.batch import MAX_BATCH_IDS
+
+
+def parse_ids(raw: str) -> List[UUID]:
+    """Список id из параметра ?ids= через запятую, в порядке запроса"""
+    parts = [part.strip() for part in raw.split(",")]
+    if len(parts) > MAX_BATCH_IDS:
+        raise ValidationException(detail=f"Too many ids: at most {MAX_BATCH_IDS} per request")
+    ids = []
+    for part in parts:
+        try:
+            ids.append(UUID(part))
+        except ValueError:
+            raise ValidationException(detail=f"Invalid id: {part!r}")
+    return ids
+
+
+def missing_ids(ids: List[UUID], records: List[Optional[Any]]) -> List[UUID]:
+    """Запрошенные id, для которых не нашлось записи (без повторов, в порядке запроса)"""
+    return list(dict.fromkeys(id_ for id_, record in zip(ids, records) if record is None))
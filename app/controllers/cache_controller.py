@@ -0,0 +1,18 @@
+from litestar import Controller, get
+
+from app.repositories.cache import CACHES
+from app.services.single_flight import FLIGHTS
+
+
+class CacheController(Controller):
+    path = "/cache"
+
+    @get("/stats")
+    async def get_cache_stats(self) -> dict:
+        """Счётчики попаданий, промахов и вытеснений кэшей get_by_id и итогов include_total"""
+        return {name: cache.stats() for name, cache in CACHES.items()}
+
+    @get("/coalescing")
+    async def get_coalescing_stats(self) -> dict:
+        """Объединение одновременных одинаковых чтений: ведущие, присоединившиеся и их доля"""
+        return {name: flight.stats() for name, flight in FLIGHTS.items()}
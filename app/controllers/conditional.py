@@ -0,0 +1,60 @@
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from litestar import Response
+from litestar.exceptions import HTTPException
+from litestar.status_codes import HTTP_304_NOT_MODIFIED, HTTP_412_PRECONDITION_FAILED
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True, wildcard: bool = True) -> bool:
+    """Проверить заголовок If-None-Match / If-Match на совпадение с ETag.
+
+    If-None-Match сравнивает слабо (префикс W/ игнорируется), If-Match - только сильно.
+    "*" совпадает с любым ETag существующего ресурса; wildcard=False - пока
+    не известно, существует ли он.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return wildcard
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 без тела: ни запроса к БД, ни сериализации"""
+    return Response(content=None, status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def check_if_match(header: Optional[str], etag: Optional[str]) -> None:
+    """Отклонить запись по устаревшему представлению (412 Precondition Failed); etag None - совпадений нет"""
+    if header and not etag_matches(header, etag, weak=False):
+        raise HTTPException(
+            status_code=HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified since it was fetched",
+        )
+
+
+async def write_if_match(
+    session: AsyncSession,
+    if_match: Optional[str],
+    service: Any,
+    key: Hashable,
+    write: Callable[[AsyncSession], Awaitable[Any]],
+) -> Tuple[Any, Callable[[], str]]:
+    """Работа задачи записи: проверка If-Match и запись строки key без промежутка между ними.
+
+    Задача записи выполняет работы по очереди, поэтому две записи с одним
+    If-Match не пройдут проверку обе - даже в одной пачке. Возвращает
+    результат write и функцию, дающую после commit ETag этой записи.
+    """
+    check_if_match(if_match, service.etag_for_write(session, key))
+    result = await write(session)
+    return result, service.written_etag(session, key)
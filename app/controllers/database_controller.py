@@ -0,0 +1,12 @@
+from litestar import Controller, get
+
+from app.database import ReadWriteDatabase
+
+
+class DatabaseController(Controller):
+    path = "/db"
+
+    @get("/pool")
+    async def get_pool_stats(self, database: ReadWriteDatabase) -> dict:
+        """Метрики пулов чтения и записи: выдачи соединений, занятые соединения и время ожидания"""
+        return database.stats()
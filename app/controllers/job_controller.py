@@ -0,0 +1,67 @@
+import os
+from typing import Optional
+from uuid import UUID
+
+from litestar import Controller, Response, get, post
+from litestar.exceptions import ClientException, NotFoundException, ValidationException
+from litestar.params import Parameter
+from litestar.response import File
+from litestar.status_codes import HTTP_202_ACCEPTED, HTTP_409_CONFLICT
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.jobs import JobRunner
+from app.schemas.job import JobCreate
+from app.schemas.records import JobRecord, to_record
+from src.models import Job
+
+
+def prefers_async(prefer: Optional[str]) -> bool:
+    """Клиент просит не ждать выполнения: заголовок Prefer: respond-async (RFC 7240)"""
+    if not prefer:
+        return False
+    return any(token.split("=")[0].strip().lower() == "respond-async" for token in prefer.split(","))
+
+
+def accepted(job: Job) -> Response[JobRecord]:
+    """Ответ 202 с задачей; Location указывает, где следить за её состоянием"""
+    return Response(
+        to_record(job, JobRecord),
+        status_code=HTTP_202_ACCEPTED,
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+class JobController(Controller):
+    path = "/jobs"
+
+    @post("/")
+    async def create_job(self, jobs: JobRunner, data: JobCreate) -> Response[JobRecord]:
+        """Поставить фоновую задачу в очередь"""
+        try:
+            job = await jobs.enqueue(data.kind, data.params, data.max_attempts)
+        except ValueError as exc:
+            raise ValidationException(detail=str(exc))
+        return accepted(job)
+
+    @get("/{job_id:uuid}")
+    async def get_job(self, jobs: JobRunner, db_session: AsyncSession, job_id: UUID = Parameter()) -> JobRecord:
+        """Состояние задачи: queued, running, succeeded или failed, с результатом или ошибкой"""
+        job = await jobs.get(db_session, job_id)
+        if not job:
+            raise NotFoundException(detail=f"Job with ID {job_id} not found")
+        return to_record(job, JobRecord)
+
+    @get("/{job_id:uuid}/result")
+    async def get_job_result(self, jobs: JobRunner, db_session: AsyncSession, job_id: UUID = Parameter()) -> Response:
+        """Результат выполненной задачи; для выгрузок - сам файл"""
+        job = await jobs.get(db_session, job_id)
+        if not job:
+            raise NotFoundException(detail=f"Job with ID {job_id} not found")
+        if job.status != "succeeded":
+            raise ClientException(detail=f"Job {job_id} is {job.status}", status_code=HTTP_409_CONFLICT)
+        result = job.result
+        if isinstance(result, dict) and "file" in result:
+            if not os.path.exists(result["file"]):
+                raise NotFoundException(detail=f"Export file of job {job_id} no longer exists")
+            return File(result["file"], filename=os.path.basename(result["file"]), media_type=result["media_type"])
+        return Response(result)
@@ -0,0 +1,20 @@
+from litestar import Controller, Response, get
+
+from app.database import ReadWriteDatabase
+from app.metrics import POOL_CHECKED_OUT, POOL_SIZE, REGISTRY
+
+# Версия текстового формата экспозиции Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsController(Controller):
+    path = "/metrics"
+
+    @get("/")
+    async def get_metrics(self, database: ReadWriteDatabase) -> Response[str]:
+        """Метрики процесса в текстовом формате Prometheus"""
+        # Состояние пулов снимается в момент запроса метрик
+        for side, stats in database.stats().items():
+            POOL_CHECKED_OUT.set(stats["checked_out"], pool=side)
+            POOL_SIZE.set(stats["size"], pool=side)
+        return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,21 +1,26 @@
-from typing import List
+from typing import List, Optional, Union
 from uuid import UUID
-from litestar import Controller, get, post, put, delete
-from litestar.di import Provide
+from litestar import Controller, Response, get, post, put, delete
+from litestar.exceptions import ValidationException
 from litestar.params import Parameter
+from litestar.response import Stream
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.schemas.order import OrderCreate, OrderUpdate, OrderResponse
+from app.schemas.order import OrderCreate, OrderUpdate
+from app.schemas.batch import BatchIds
+from app.schemas.records import JobRecord, OrderBatchRecord, OrderRecord, to_record
+from app.controllers.batch import missing_ids, parse_ids
+from app.controllers.conditional import etag_matches, not_modified, write_if_match
+from app.controllers.job_controller import accepted, prefers_async
+from app.jobs import JobRunner
+from app.services.export import EXPORT_MEDIA_TYPES
+from app.writer import GroupCommitWriter
 from app.services.order_service import OrderService
 
 
 class OrderController(Controller):
     path = "/orders"
-    
-    def __init__(self):
-        self.dependencies = {
-            "order_service": Provide(lambda: OrderService()),
-        }
 
     @get("/")
     async def get_all_orders(
@@ -24,18 +29,86 @@ class OrderController(Controller):
         db_session: AsyncSession,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(ge=1, default=1),
-        user_id: UUID = Parameter(default=None),
+        after: str = Parameter(default=""),
+        ids: str = Parameter(default=""),
+        user_id: Optional[UUID] = Parameter(default=None),
         status: str = Parameter(default=""),
-    ) -> List[OrderResponse]:
-        """Получить все заказы с пагинацией и фильтрацией"""
+        include_total: bool = Parameter(default=False),
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> Response[Union[List[OrderRecord], OrderBatchRecord]]:
+        """Получить все заказы с пагинацией и фильтрацией; ids=a,b,... - заказы по списку id"""
+        # ETag берётся до запроса: устаревшие данные никогда не получат новый тег
+        etag = order_service.collection_etag()
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        if ids:
+            # Пакетное чтение по списку id одним запросом; фильтры и пагинация не применяются
+            requested = parse_ids(ids)
+            records = await order_service.get_records_by_ids(db_session, requested)
+            return Response(OrderBatchRecord(items=records, missing=missing_ids(requested, records)), headers={"ETag": etag})
+
         filters = {}
         if user_id:
             filters["user_id"] = user_id
         if status:
             filters["status"] = status
             
-        orders = await order_service.get_by_filter(db_session, count, page, **filters)
-        return [OrderResponse.model_validate(order) for order in orders]
+        try:
+            orders, next_cursor = await order_service.get_page(db_session, count, page, after or None, **filters)
+        except ValueError as exc:
+            raise ValidationException(detail=str(exc))
+
+        # Курсор следующей страницы отдаём заголовком, чтобы не менять формат тела ответа
+        headers = {"ETag": etag}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if include_total:
+            # Итог из таблиц счётчиков или кэша; приблизительный помечается X-Total-Count-Exact: false
+            total, exact = await order_service.count_by_filter(db_session, **filters)
+            headers["X-Total-Count"] = str(total)
+            headers["X-Total-Count-Exact"] = "true" if exact else "false"
+        return Response(orders, headers=headers)
+
+    @post("/lookup", status_code=200)
+    async def lookup_orders(
+        self,
+        order_service: OrderService,
+        db_session: AsyncSession,
+        data: BatchIds,
+    ) -> OrderBatchRecord:
+        """Получить заказы по списку id из тела запроса - то же, что ?ids=, для длинных списков"""
+        records = await order_service.get_records_by_ids(db_session, data.ids)
+        return OrderBatchRecord(items=records, missing=missing_ids(data.ids, records))
+
+    @get("/export")
+    async def export_orders(
+        self,
+        order_service: OrderService,
+        db_session_factory: sessionmaker,
+        jobs: JobRunner,
+        export_format: str = Parameter(query="format", default="ndjson"),
+        user_id: Optional[UUID] = Parameter(default=None),
+        status: str = Parameter(default=""),
+        prefer: Optional[str] = Parameter(header="Prefer", default=None),
+    ) -> Union[Stream, Response[JobRecord]]:
+        """Потоковая выгрузка заказов в NDJSON или CSV с теми же фильтрами, что и у списка.
+
+        С Prefer: respond-async выгрузка пишется в файл фоновой задачей (202, файл - GET /jobs/{id}/result).
+        """
+        if export_format not in EXPORT_MEDIA_TYPES:
+            raise ValidationException(detail=f"Unsupported export format: {export_format}")
+
+        filters = {}
+        if user_id:
+            filters["user_id"] = user_id
+        if status:
+            filters["status"] = status
+        if prefers_async(prefer):
+            return accepted(await order_service.schedule_export(jobs, export_format, **filters))
+        return Stream(
+            order_service.export(db_session_factory, export_format, **filters),
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+        )
 
     @get("/{order_id:uuid}")
     async def get_order_by_id(
@@ -43,49 +116,64 @@ class OrderController(Controller):
         order_service: OrderService,
         db_session: AsyncSession,
         order_id: UUID = Parameter(),
-    ) -> OrderResponse:
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> Response[OrderRecord]:
         """Получить заказ по ID"""
-        order = await order_service.get_by_id(db_session, order_id)
+        etag = order_service.etag(order_id)
+        # "*" совпадает только с существующим ресурсом: для отсутствующего id ответ 404, а не 304
+        if etag_matches(if_none_match, etag, wildcard=False):
+            return not_modified(etag)
+
+        order = await order_service.get_record(db_session, order_id)
         if not order:
             from litestar.exceptions import NotFoundException
             raise NotFoundException(detail=f"Order with ID {order_id} not found")
-        return OrderResponse.model_validate(order)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(order, headers={"ETag": etag})
 
     @post("/")
     async def create_order(
         self,
         order_service: OrderService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         data: OrderCreate,
-    ) -> OrderResponse:
+    ) -> OrderRecord:
         """Создать новый заказ"""        
-        order = await order_service.create_order(db_session, data)
-        await db_session.commit()
-        return OrderResponse.model_validate(order)
+        try:
+            order = await writer.submit(lambda session: order_service.create_order(session, data))
+        except ValueError as exc:
+            # Отклонённый заказ (нет пользователя, продукта или остатка) - ошибка клиента
+            raise ValidationException(detail=str(exc))
+        return to_record(order, OrderRecord)
 
     @put("/{order_id:uuid}")
     async def update_order(
         self,
         order_service: OrderService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         data: OrderUpdate,
         order_id: UUID = Parameter(),
-    ) -> OrderResponse:
+        if_match: Optional[str] = Parameter(header="If-Match", default=None),
+    ) -> Response[OrderRecord]:
         """Обновить заказ"""       
-        order = await order_service.update(db_session, order_id, data)
-        await db_session.commit()
-        return OrderResponse.model_validate(order)
+        # Проверка If-Match - в той же работе задачи записи, что и сама запись
+        order, etag = await writer.submit(
+            lambda session: write_if_match(
+                session, if_match, order_service, order_id, lambda session: order_service.update(session, order_id, data)
+            )
+        )
+        return Response(to_record(order, OrderRecord), headers={"ETag": etag()})
 
-    @delete("/{order_id:uuid}")
+    @delete("/{order_id:uuid}", status_code=200)
     async def delete_order(
         self,
         order_service: OrderService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         order_id: UUID = Parameter(),
     ) -> dict:
         """Удалить заказ"""
-        result = await order_service.delete(db_session, order_id)
-        await db_session.commit()
+        result = await writer.submit(lambda session: order_service.delete(session, order_id))
         if not result:
             from litestar.exceptions import NotFoundException
             raise NotFoundException(detail=f"Order with ID {order_id} not found")
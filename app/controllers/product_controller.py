@@ -1,21 +1,28 @@
-from typing import List
+from typing import List, Optional, Union
 from uuid import UUID
-from litestar import Controller, get, post, put, delete, patch
-from litestar.di import Provide
+from litestar import Controller, Request, Response, get, post, put, delete
+from litestar.exceptions import HTTPException, ValidationException
 from litestar.params import Parameter
+from litestar.response import Stream
+from litestar.status_codes import HTTP_413_REQUEST_ENTITY_TOO_LARGE
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.schemas.batch import BatchIds
+from app.schemas.records import JobRecord, ProductBatchRecord, ProductRecord, to_record
+from app.controllers.batch import missing_ids, parse_ids
+from app.controllers.conditional import etag_matches, not_modified, write_if_match
+from app.controllers.job_controller import accepted, prefers_async
+from app.jobs import JobRunner
+from app.services.export import EXPORT_MEDIA_TYPES
+from app.writer import GroupCommitWriter
+from app.services.product_import import IMPORT_FORMATS, LineTooLongError
 from app.services.product_service import ProductService
 
 
 class ProductController(Controller):
     path = "/products"
-    
-    def __init__(self):
-        self.dependencies = {
-            "product_service": Provide(lambda: ProductService()),
-        }
 
     @get("/")
     async def get_all_products(
@@ -24,12 +31,29 @@ class ProductController(Controller):
         db_session: AsyncSession,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(ge=1, default=1),
+        after: str = Parameter(default=""),
+        ids: str = Parameter(default=""),
+        q: str = Parameter(default=""),
         name: str = Parameter(default=""),
-        min_price: float = Parameter(default=None),
-        max_price: float = Parameter(default=None),
-    ) -> List[ProductResponse]:
-        """Получить все продукты с пагинацией и фильтрацией"""
+        min_price: Optional[float] = Parameter(default=None),
+        max_price: Optional[float] = Parameter(default=None),
+        include_total: bool = Parameter(default=False),
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> Response[Union[List[ProductRecord], ProductBatchRecord]]:
+        """Получить все продукты с пагинацией и фильтрацией; q - полнотекстовый поиск по релевантности, ids=a,b,... - продукты по списку id"""
+        # ETag берётся до запроса: устаревшие данные никогда не получат новый тег
+        etag = product_service.collection_etag()
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        if ids:
+            # Пакетное чтение по списку id одним запросом; фильтры и пагинация не применяются
+            requested = parse_ids(ids)
+            records = await product_service.get_records_by_ids(db_session, requested)
+            return Response(ProductBatchRecord(items=records, missing=missing_ids(requested, records)), headers={"ETag": etag})
+
         filters = {}
+        if q:
+            filters["q"] = q
         if name:
             filters["name"] = name
         if min_price is not None:
@@ -37,8 +61,68 @@ class ProductController(Controller):
         if max_price is not None:
             filters["max_price"] = max_price
             
-        products = await product_service.get_by_filter(db_session, count, page, **filters)
-        return [ProductResponse.model_validate(product) for product in products]
+        try:
+            products, next_cursor = await product_service.get_page(db_session, count, page, after or None, **filters)
+        except ValueError as exc:
+            raise ValidationException(detail=str(exc))
+
+        # Курсор следующей страницы отдаём заголовком, чтобы не менять формат тела ответа
+        headers = {"ETag": etag}
+        if next_cursor and not q:
+            headers["X-Next-Cursor"] = next_cursor
+        if include_total:
+            # Итог из таблиц счётчиков или кэша; приблизительный помечается X-Total-Count-Exact: false
+            total, exact = await product_service.count_by_filter(db_session, **filters)
+            headers["X-Total-Count"] = str(total)
+            headers["X-Total-Count-Exact"] = "true" if exact else "false"
+        return Response(products, headers=headers)
+
+    @post("/lookup", status_code=200)
+    async def lookup_products(
+        self,
+        product_service: ProductService,
+        db_session: AsyncSession,
+        data: BatchIds,
+    ) -> ProductBatchRecord:
+        """Получить продукты по списку id из тела запроса - то же, что ?ids=, для длинных списков"""
+        records = await product_service.get_records_by_ids(db_session, data.ids)
+        return ProductBatchRecord(items=records, missing=missing_ids(data.ids, records))
+
+    @get("/export")
+    async def export_products(
+        self,
+        product_service: ProductService,
+        db_session_factory: sessionmaker,
+        jobs: JobRunner,
+        export_format: str = Parameter(query="format", default="ndjson"),
+        q: str = Parameter(default=""),
+        name: str = Parameter(default=""),
+        min_price: Optional[float] = Parameter(default=None),
+        max_price: Optional[float] = Parameter(default=None),
+        prefer: Optional[str] = Parameter(header="Prefer", default=None),
+    ) -> Union[Stream, Response[JobRecord]]:
+        """Потоковая выгрузка продуктов в NDJSON или CSV с теми же фильтрами, что и у списка.
+
+        С Prefer: respond-async выгрузка пишется в файл фоновой задачей (202, файл - GET /jobs/{id}/result).
+        """
+        if export_format not in EXPORT_MEDIA_TYPES:
+            raise ValidationException(detail=f"Unsupported export format: {export_format}")
+
+        filters = {}
+        if q:
+            filters["q"] = q
+        if name:
+            filters["name"] = name
+        if min_price is not None:
+            filters["min_price"] = min_price
+        if max_price is not None:
+            filters["max_price"] = max_price
+        if prefers_async(prefer):
+            return accepted(await product_service.schedule_export(jobs, export_format, **filters))
+        return Stream(
+            product_service.export(db_session_factory, export_format, **filters),
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+        )
 
     @get("/{product_id:uuid}")
     async def get_product_by_id(
@@ -46,49 +130,90 @@ class ProductController(Controller):
         product_service: ProductService,
         db_session: AsyncSession,
         product_id: UUID = Parameter(),
-    ) -> ProductResponse:
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> Response[ProductRecord]:
         """Получить продукт по ID"""
-        product = await product_service.get_by_id(db_session, product_id)
+        etag = product_service.etag(product_id)
+        # "*" совпадает только с существующим ресурсом: для отсутствующего id ответ 404, а не 304
+        if etag_matches(if_none_match, etag, wildcard=False):
+            return not_modified(etag)
+
+        product = await product_service.get_record(db_session, product_id)
         if not product:
             from litestar.exceptions import NotFoundException
             raise NotFoundException(detail=f"Product with ID {product_id} not found")
-        return ProductResponse.model_validate(product)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(product, headers={"ETag": etag})
 
     @post("/")
     async def create_product(
         self,
         product_service: ProductService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         data: ProductCreate,
-    ) -> ProductResponse:
+    ) -> ProductRecord:
         """Создать новый продукт"""        
-        product = await product_service.create(db_session, data)
-        await db_session.commit()
-        return ProductResponse.model_validate(product)
+        product = await writer.submit(lambda session: product_service.create(session, data))
+        return to_record(product, ProductRecord)
+
+    @post("/import", status_code=200, request_max_body_size=None)
+    async def import_products(
+        self,
+        request: Request,
+        product_service: ProductService,
+        writer: GroupCommitWriter,
+        import_format: str = Parameter(query="format", default=""),
+        chunk_size: int = Parameter(gt=0, le=10000, default=1000),
+    ) -> dict:
+        """Потоковый импорт продуктов из NDJSON или CSV с upsert по названию; слишком длинная строка - 413"""
+        if not import_format:
+            content_type = request.headers.get("content-type", "")
+            import_format = "csv" if "csv" in content_type else "ndjson"
+        if import_format not in IMPORT_FORMATS:
+            raise ValidationException(detail=f"Unsupported import format: {import_format}")
+
+        try:
+            return await product_service.import_products(
+                writer, request.stream(), import_format, chunk_size
+            )
+        except LineTooLongError as exc:
+            # Пачки до этой строки уже записаны - отчёт о них в extra
+            raise HTTPException(
+                status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc), extra={"report": exc.report}
+            )
 
     @put("/{product_id:uuid}")
     async def update_product(
         self,
         product_service: ProductService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         data: ProductUpdate,
         product_id: UUID = Parameter(),
-    ) -> ProductResponse:
+        if_match: Optional[str] = Parameter(header="If-Match", default=None),
+    ) -> Response[ProductRecord]:
         """Обновить продукт"""       
-        product = await product_service.update(db_session, product_id, data)
-        await db_session.commit()
-        return ProductResponse.model_validate(product)
+        # Проверка If-Match - в той же работе задачи записи, что и сама запись
+        product, etag = await writer.submit(
+            lambda session: write_if_match(
+                session, if_match, product_service, product_id, lambda session: product_service.update(session, product_id, data)
+            )
+        )
+        return Response(to_record(product, ProductRecord), headers={"ETag": etag()})
 
-    @delete("/{product_id:uuid}")
+    @delete("/{product_id:uuid}", status_code=200)
     async def delete_product(
         self,
         product_service: ProductService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
+        jobs: JobRunner,
         product_id: UUID = Parameter(),
-    ) -> dict:
-        """Удалить продукт"""
-        result = await product_service.delete(db_session, product_id)
-        await db_session.commit()
+        prefer: Optional[str] = Parameter(header="Prefer", default=None),
+    ) -> Union[dict, Response[JobRecord]]:
+        """Удалить продукт; с Prefer: respond-async - фоновой задачей, позиции заказов снимаются пачками (202)"""
+        if prefers_async(prefer):
+            return accepted(await product_service.schedule_delete(jobs, product_id))
+        result = await writer.submit(lambda session: product_service.delete(session, product_id))
         if not result:
             from litestar.exceptions import NotFoundException
             raise NotFoundException(detail=f"Product with ID {product_id} not found")
@@ -1,14 +1,23 @@
 import uuid
-from typing import List
+from typing import List, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from litestar import Controller, get, post, put, delete
-from litestar.di import Provide
-from litestar.exceptions import NotFoundException
+from litestar import Controller, Response, get, post, put, delete
+from litestar.exceptions import NotFoundException, ValidationException
 from litestar.params import Parameter
+from litestar.response import Stream
 
+from app.schemas.batch import BatchIds
+from app.schemas.records import JobRecord, UserBatchRecord, UserRecord, to_record
+from app.controllers.batch import missing_ids, parse_ids
+from app.controllers.conditional import etag_matches, not_modified, write_if_match
+from app.controllers.job_controller import accepted, prefers_async
+from app.jobs import JobRunner
+from app.services.export import EXPORT_MEDIA_TYPES
+from app.writer import GroupCommitWriter
 from app.services.user_service import UserService
-from app.schemas.user import UserResponse, UserCreate, UserUpdate
+from app.schemas.user import UserCreate, UserUpdate
 
 
 class UserController(Controller):
@@ -20,12 +29,20 @@ class UserController(Controller):
         user_service: UserService,
         db_session: AsyncSession,
         user_id: uuid.UUID = Parameter(),
-    ) -> UserResponse:
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> Response[UserRecord]:
         """Получить пользователя по ID"""
-        user = await user_service.get_by_id(db_session, user_id)
+        etag = user_service.etag(user_id)
+        # "*" совпадает только с существующим ресурсом: для отсутствующего id ответ 404, а не 304
+        if etag_matches(if_none_match, etag, wildcard=False):
+            return not_modified(etag)
+
+        user = await user_service.get_record(db_session, user_id)
         if not user:
             raise NotFoundException(detail=f"User with ID {user_id} not found")
-        return UserResponse.model_validate(user)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(user, headers={"ETag": etag})
 
     @get("/")
     async def get_all_users(
@@ -34,53 +51,136 @@ class UserController(Controller):
         db_session: AsyncSession,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(ge=1, default=1),
+        after: str = Parameter(default=""),
+        ids: str = Parameter(default=""),
+        q: str = Parameter(default=""),
         username: str = Parameter(default=""),
         email: str = Parameter(default=""),
-    ) -> List[UserResponse]:
-        """Получить всех пользователей с пагинацией и фильтрацией"""
+        include_total: bool = Parameter(default=False),
+        if_none_match: Optional[str] = Parameter(header="If-None-Match", default=None),
+    ) -> Response[Union[List[UserRecord], UserBatchRecord]]:
+        """Получить всех пользователей с пагинацией и фильтрацией; q - полнотекстовый поиск по релевантности, ids=a,b,... - пользователи по списку id"""
+        # ETag берётся до запроса: устаревшие данные никогда не получат новый тег
+        etag = user_service.collection_etag()
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        if ids:
+            # Пакетное чтение по списку id одним запросом; фильтры и пагинация не применяются
+            requested = parse_ids(ids)
+            records = await user_service.get_records_by_ids(db_session, requested)
+            return Response(UserBatchRecord(items=records, missing=missing_ids(requested, records)), headers={"ETag": etag})
+
         filters = {}
+        if q:
+            filters["q"] = q
         if username:
             filters["username"] = username
         if email:
             filters["email"] = email
             
-        users = await user_service.get_by_filter(db_session, count, page, **filters)
-        return [UserResponse.model_validate(user) for user in users]
+        try:
+            users, next_cursor = await user_service.get_page(db_session, count, page, after or None, **filters)
+        except ValueError as exc:
+            raise ValidationException(detail=str(exc))
+
+        # Курсор следующей страницы отдаём заголовком, чтобы не менять формат тела ответа
+        headers = {"ETag": etag}
+        if next_cursor and not q:
+            headers["X-Next-Cursor"] = next_cursor
+        if include_total:
+            # Итог из таблиц счётчиков или кэша; приблизительный помечается X-Total-Count-Exact: false
+            total, exact = await user_service.count_by_filter(db_session, **filters)
+            headers["X-Total-Count"] = str(total)
+            headers["X-Total-Count-Exact"] = "true" if exact else "false"
+        return Response(users, headers=headers)
+
+    @post("/lookup", status_code=200)
+    async def lookup_users(
+        self,
+        user_service: UserService,
+        db_session: AsyncSession,
+        data: BatchIds,
+    ) -> UserBatchRecord:
+        """Получить пользователей по списку id из тела запроса - то же, что ?ids=, для длинных списков"""
+        records = await user_service.get_records_by_ids(db_session, data.ids)
+        return UserBatchRecord(items=records, missing=missing_ids(data.ids, records))
+
+    @get("/export")
+    async def export_users(
+        self,
+        user_service: UserService,
+        db_session_factory: sessionmaker,
+        jobs: JobRunner,
+        export_format: str = Parameter(query="format", default="ndjson"),
+        q: str = Parameter(default=""),
+        username: str = Parameter(default=""),
+        email: str = Parameter(default=""),
+        prefer: Optional[str] = Parameter(header="Prefer", default=None),
+    ) -> Union[Stream, Response[JobRecord]]:
+        """Потоковая выгрузка пользователей в NDJSON или CSV с теми же фильтрами, что и у списка.
+
+        С Prefer: respond-async выгрузка пишется в файл фоновой задачей (202, файл - GET /jobs/{id}/result).
+        """
+        if export_format not in EXPORT_MEDIA_TYPES:
+            raise ValidationException(detail=f"Unsupported export format: {export_format}")
+
+        filters = {}
+        if q:
+            filters["q"] = q
+        if username:
+            filters["username"] = username
+        if email:
+            filters["email"] = email
+        if prefers_async(prefer):
+            return accepted(await user_service.schedule_export(jobs, export_format, **filters))
+        return Stream(
+            user_service.export(db_session_factory, export_format, **filters),
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+        )
 
     @post("/")
     async def create_user(
         self,
         user_service: UserService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         data: UserCreate,
-    ) -> UserResponse:
+    ) -> UserRecord:
         """Создать нового пользователя"""        
-        user = await user_service.create(db_session, data)
-        await db_session.commit()
-        return UserResponse.model_validate(user)
+        user = await writer.submit(lambda session: user_service.create(session, data))
+        return to_record(user, UserRecord)
 
     @delete("/{user_id:uuid}")
     async def delete_user(
         self,
         user_service: UserService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
+        jobs: JobRunner,
         user_id: uuid.UUID = Parameter(),
-    ) -> None:
-        """Удалить пользователя"""
-        deleted = await user_service.delete(db_session, user_id)
+        prefer: Optional[str] = Parameter(header="Prefer", default=None),
+    ) -> Response[None]:
+        """Удалить пользователя; с Prefer: respond-async - фоновой задачей, заказы снимаются пачками (202)"""
+        # Аннотация Response[None] нужна для 204 по умолчанию; 202 с задачей отдаётся явным Response
+        if prefers_async(prefer):
+            return accepted(await user_service.schedule_delete(jobs, user_id))
+        deleted = await writer.submit(lambda session: user_service.delete(session, user_id))
         if not deleted:
             raise NotFoundException(detail=f"User with ID {user_id} not found")
-        await db_session.commit()
+        return Response(None)
 
     @put("/{user_id:uuid}")
     async def update_user(
         self,
         user_service: UserService,
-        db_session: AsyncSession,
+        writer: GroupCommitWriter,
         data: UserUpdate,
         user_id: uuid.UUID = Parameter(),
-    ) -> UserResponse:
+        if_match: Optional[str] = Parameter(header="If-Match", default=None),
+    ) -> Response[UserRecord]:
         """Обновить пользователя"""       
-        user = await user_service.update(db_session, user_id, data)
-        await db_session.commit()
-        return UserResponse.model_validate(user)
+        # Проверка If-Match - в той же работе задачи записи, что и сама запись
+        user, etag = await writer.submit(
+            lambda session: write_if_match(
+                session, if_match, user_service, user_id, lambda session: user_service.update(session, user_id, data)
+            )
+        )
+        return Response(to_record(user, UserRecord), headers={"ETag": etag()})
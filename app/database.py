@@ -0,0 +1,200 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.metrics import POOL_TIMEOUTS, POOL_WAIT
+
+# Профили настройки соединений SQLite. PRAGMA выполняются по порядку при
+# открытии каждого соединения пула; journal_mode=WAL хранится в самом файле БД,
+# остальные настройки действуют только на своё соединение.
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+    # Каждый commit сбрасывается на диск: не теряется даже при отключении питания
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+        "cache_size": -64_000,          # в КиБ: ~64 МБ страничного кэша на соединение
+        "mmap_size": 256 * 1024 ** 2,
+        "temp_store": "MEMORY",
+    },
+    # fsync только при checkpoint: сбой питания может откатить последние commit,
+    # но не повредит БД; заметно быстрее на частых мелких записях
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+        "cache_size": -256_000,
+        "mmap_size": 1024 ** 3,
+        "temp_store": "MEMORY",
+    },
+    # Соединения только для чтения: любая запись отклоняется самим SQLite
+    "readonly": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+        "cache_size": -256_000,
+        "mmap_size": 1024 ** 3,
+        "temp_store": "MEMORY",
+        "query_only": "ON",
+    },
+}
+
+# Профиль соединений приложения, переопределяется переменной окружения
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "durable")
+
+# Число соединений на чтение: каждое соединение aiosqlite обслуживает свой поток,
+# поэтому по умолчанию - по одному на ядро
+READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "0")) or os.cpu_count() or 1
+
+# Сколько секунд ждать свободное соединение пула, прежде чем вернуть ошибку
+POOL_TIMEOUT = 30.0
+
+# HTTP-методы, которые не меняют данные и обслуживаются пулом чтения
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def configure_sqlite(engine: AsyncEngine, profile: str = SQLITE_PROFILE, begin: Optional[str] = None) -> AsyncEngine:
+    """Применять PRAGMA профиля к каждому новому соединению движка.
+
+    begin ("DEFERRED" / "IMMEDIATE") отключает неявные транзакции драйвера
+    sqlite3 и открывает их явным BEGIN: без этого SAVEPOINT работают некорректно.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {profile}")
+    pragmas = SQLITE_PROFILES[profile]
+
+    def apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+        if begin:
+            dbapi_connection.isolation_level = None
+
+    def begin_transaction(connection) -> None:
+        connection.exec_driver_sql(f"BEGIN {begin}")
+
+    sync_engine: Engine = engine.sync_engine
+    event.listen(sync_engine, "connect", apply_pragmas)
+    if begin:
+        event.listen(sync_engine, "begin", begin_transaction)
+    return engine
+
+
+class PoolMetrics:
+    """Счётчики пула соединений: выдачи, занятые соединения и ожидание свободного"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.checkouts = 0
+        self.checked_out = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+        self.checked_out += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.checked_out -= 1
+
+    def observe_wait(self, seconds: float) -> None:
+        """Учесть время от запроса соединения до его получения"""
+        self.waits += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def stats(self) -> Dict[str, float]:
+        pool = self.engine.sync_engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": self.wait_total / self.waits * 1000 if self.waits else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+            "wait_total_ms": self.wait_total * 1000,
+        }
+
+
+class ReadWriteDatabase:
+    """Отдельные движки для чтения и записи одной БД SQLite.
+
+    В WAL читатели не блокируют писателя и друг друга, поэтому чтения идут
+    через пул из read_pool_size соединений с профилем readonly, а все записи -
+    через единственное соединение движка записи: SQLite всё равно допускает
+    одного писателя, а очередь в пуле дешевле, чем ожидание блокировки в busy_timeout.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        read_pool_size: int = READ_POOL_SIZE,
+        write_profile: str = SQLITE_PROFILE,
+        **engine_kwargs,
+    ):
+        engine_kwargs.setdefault("connect_args", {"check_same_thread": False})
+        # BEGIN IMMEDIATE берёт блокировку записи сразу, а не при первой записи внутри транзакции
+        self.write_engine = configure_sqlite(
+            create_async_engine(url, pool_size=1, max_overflow=0, pool_timeout=POOL_TIMEOUT, **engine_kwargs),
+            write_profile,
+            begin="IMMEDIATE",
+        )
+        self.read_engine = configure_sqlite(
+            create_async_engine(url, pool_size=read_pool_size, max_overflow=0, pool_timeout=POOL_TIMEOUT, **engine_kwargs),
+            "readonly",
+        )
+        self.write_sessions = sessionmaker(self.write_engine, class_=AsyncSession, expire_on_commit=False)
+        self.read_sessions = sessionmaker(self.read_engine, class_=AsyncSession, expire_on_commit=False)
+        self.metrics = {
+            "read": PoolMetrics(self.read_engine),
+            "write": PoolMetrics(self.write_engine),
+        }
+        # Ряд счётчика есть с нуля: rate() не теряет первый таймаут
+        for side in self.metrics:
+            POOL_TIMEOUTS.inc(0, pool=side)
+
+    def sessions_for(self, method: str) -> sessionmaker:
+        """Фабрика сессий для HTTP-метода: чтение - пул чтения, остальное - движок записи"""
+        return self.read_sessions if method.upper() in READ_METHODS else self.write_sessions
+
+    @asynccontextmanager
+    async def session(self, method: str) -> AsyncIterator[AsyncSession]:
+        """Сессия для HTTP-метода с уже полученным соединением; ожидание пула попадает в метрики"""
+        side = "read" if method.upper() in READ_METHODS else "write"
+        metrics = self.metrics[side]
+        async with self.sessions_for(method)() as session:
+            started = time.perf_counter()
+            try:
+                await session.connection()
+            except PoolTimeoutError:
+                metrics.timeouts += 1
+                POOL_TIMEOUTS.inc(pool=side)
+                raise
+            waited = time.perf_counter() - started
+            metrics.observe_wait(waited)
+            POOL_WAIT.observe(waited, pool=side)
+            yield session
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {side: metrics.stats() for side, metrics in self.metrics.items()}
+
+    async def dispose(self) -> None:
+        await self.read_engine.dispose()
+        await self.write_engine.dispose()
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.metrics import JOB_DURATION, JOBS_RUNNING
+from app.query_log import current_route
+from app.writer import GroupCommitWriter
+from src.models import Job
+
+# Сколько задач выполняется одновременно и как часто свободный обработчик
+# заглядывает в таблицу (новые задачи будят его сразу, опрос нужен для
+# отложенных повторов и задач, поставленных другими процессами)
+JOB_CONCURRENCY = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+# Пауза перед повтором: base * 2^(попытка-1), не больше max, случайно урезанная до половины
+JOB_BACKOFF_BASE = 1.0
+JOB_BACKOFF_MAX = 300.0
+
+# Конечные состояния задачи
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Ошибки в параметрах или данных задачи: повтор их не исправит
+PERMANENT_ERRORS = (ValueError, LookupError, TypeError)
+
+# Обработчик получает id задачи и её параметры; результат должен сериализоваться в JSON
+Handler = Callable[[uuid.UUID, Dict[str, Any]], Awaitable[Any]]
+
+logger = logging.getLogger("app.jobs")
+
+
+class JobRunner:
+    """Фоновые задачи внутри процесса с очередью в таблице jobs.
+
+    Задача ставится в очередь строкой таблицы (enqueue), поэтому переживает
+    перезапуск: при старте задачи, прерванные в состоянии running, снова
+    становятся queued. Не больше concurrency обработчиков берут готовые
+    задачи по порядку run_after; захват и смена состояния идут через задачу
+    записи, так что одна задача не достанется двум обработчикам.
+
+    Упавшая задача повторяется с экспоненциальной паузой, пока не исчерпает
+    max_attempts; ошибки из PERMANENT_ERRORS (не найдено, неверные
+    параметры) сразу переводят её в failed.
+
+    Очередь рассчитана на один процесс приложения на базу: восстановление
+    при старте считает все running-задачи своими прерванными.
+    """
+
+    def __init__(
+        self,
+        writer: GroupCommitWriter,
+        session_factory: sessionmaker,
+        concurrency: int = JOB_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        backoff_base: float = JOB_BACKOFF_BASE,
+        backoff_max: float = JOB_BACKOFF_MAX,
+    ):
+        self.writer = writer
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.handlers: Dict[str, Handler] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._waiters: Dict[uuid.UUID, List[asyncio.Future]] = {}
+
+    def register(self, kind: str, handler: Handler) -> None:
+        """Зарегистрировать обработчик задач вида kind"""
+        self.handlers[kind] = handler
+
+    async def enqueue(self, kind: str, params: Optional[Dict[str, Any]] = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+        """Поставить задачу в очередь и вернуть её строку (после commit)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        async def insert(session: AsyncSession) -> Job:
+            job = Job(kind=kind, params=params or {}, max_attempts=max_attempts)
+            session.add(job)
+            return job
+
+        job = await self.writer.submit(insert)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, session: AsyncSession, job_id: uuid.UUID) -> Optional[Job]:
+        """Получить задачу по id"""
+        return await session.get(Job, job_id)
+
+    async def wait(self, job_id: uuid.UUID) -> Job:
+        """Дождаться конечного состояния задачи, выполняемой этим процессом, и вернуть её строку"""
+        # Ожидание регистрируется до чтения: завершение между чтением и ожиданием не потеряется
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, []).append(future)
+        try:
+            async with self.session_factory() as session:
+                job = await self.get(session, job_id)
+            if job is None:
+                raise LookupError(f"Job with id {job_id} not found")
+            if job.status in FINISHED_STATUSES:
+                return job
+            await future
+            async with self.session_factory() as session:
+                return await self.get(session, job_id)
+        finally:
+            waiters = self._waiters.get(job_id, [])
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._waiters.pop(job_id, None)
+
+    def _notify(self, job_id: uuid.UUID) -> None:
+        for future in self._waiters.get(job_id, []):
+            if not future.done():
+                future.set_result(None)
+
+    def backoff(self, attempts: int) -> float:
+        """Пауза в секундах перед следующей попыткой после attempts неудачных"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        # Случайная доля разводит повторы задач, упавших одновременно
+        return delay * random.uniform(0.5, 1.0)
+
+    async def start(self) -> None:
+        """Запустить обработчики в фоне; старт приложения не ждёт базу"""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        """Остановить обработчики; прерванные задачи продолжатся после следующего start"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        # Флаг вдобавок к cancel: wait_for в Python 3.10 может проглотить отмену, если событие
+        # сработало одновременно с ней, и обработчик ушёл бы на следующий круг
+        self._stopping = True
+        self._wakeup.set()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _supervise(self) -> None:
+        # Восстановление и первая проверка очереди - через poll_interval после старта
+        await asyncio.sleep(self.poll_interval)
+        try:
+            await self.writer.submit(self._requeue_interrupted)
+        except OperationalError:
+            # Приложение запущено на базе без миграции с таблицей jobs: остальное работает, задачи - нет
+            logger.warning("Table jobs is missing (run alembic upgrade head): background jobs are disabled")
+            return
+        workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _requeue_interrupted(self, session: AsyncSession) -> None:
+        now = datetime.now()
+        await session.execute(
+            update(Job)
+            .where(Job.status == "running", Job.attempts >= Job.max_attempts)
+            .values(status="failed", error="Interrupted by shutdown", updated_at=now)
+        )
+        await session.execute(
+            update(Job).where(Job.status == "running").values(status="queued", run_after=now, updated_at=now)
+        )
+
+    def _next_due(self) -> Select:
+        return (
+            select(Job)
+            .where(Job.status == "queued", Job.run_after <= datetime.now())
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+        )
+
+    async def _has_due(self) -> bool:
+        # Опрос пустой очереди - чтение через пул чтения, без транзакции в задаче записи
+        async with self.session_factory() as session:
+            return (await session.execute(self._next_due().with_only_columns(Job.id))).first() is not None
+
+    async def _claim(self, session: AsyncSession) -> Optional[Tuple[uuid.UUID, str, Dict[str, Any], int, int]]:
+        job = (await session.execute(self._next_due())).scalar_one_or_none()
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        return job.id, job.kind, dict(job.params), job.attempts, job.max_attempts
+
+    async def _finish(self, session: AsyncSession, job_id: uuid.UUID, **values: Any) -> None:
+        await session.execute(update(Job).where(Job.id == job_id).values(updated_at=datetime.now(), **values))
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            # Сброс до захвата: задача, поставленная после неудачного захвата, разбудит ожидание
+            self._wakeup.clear()
+            try:
+                claimed = await self.writer.submit(self._claim) if await self._has_due() else None
+            except Exception:
+                logger.exception("Failed to claim a job")
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(*claimed)
+
+    async def _run(self, job_id: uuid.UUID, kind: str, params: Dict[str, Any], attempts: int, max_attempts: int) -> None:
+        token = current_route.set(f"job {kind}")
+        started = time.perf_counter()
+        JOBS_RUNNING.inc(kind=kind)
+        try:
+            try:
+                result = await self.handlers[kind](job_id, params)
+                await self.writer.submit(
+                    lambda session: self._finish(session, job_id, status="succeeded", result=result, error=None)
+                )
+                status = "succeeded"
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                error = f"{exc.__class__.__name__}: {exc}"
+                if isinstance(exc, PERMANENT_ERRORS) or attempts >= max_attempts:
+                    status, values = "failed", {}
+                else:
+                    status = "queued"
+                    values = {"run_after": datetime.now() + timedelta(seconds=self.backoff(attempts))}
+                logger.warning("Job %s (%s) attempt %d/%d: %s", job_id, kind, attempts, max_attempts, error)
+                await self.writer.submit(
+                    lambda session: self._finish(session, job_id, status=status, error=error, **values)
+                )
+            if status in FINISHED_STATUSES:
+                self._notify(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Не удалось записать состояние: задача останется running и вернётся в очередь при старте
+            logger.exception("Failed to record the state of job %s", job_id)
+            status = "error"
+        finally:
+            JOBS_RUNNING.dec(kind=kind)
+            current_route.reset(token)
+        JOB_DURATION.observe(time.perf_counter() - started, kind=kind, status=status)
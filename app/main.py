@@ -1,39 +1,81 @@
-import os
+import time
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from litestar import Litestar
+from litestar import Litestar, Request
 from litestar.di import Provide
 
+from app.database import READ_METHODS, ReadWriteDatabase
+from app.metrics import SESSION_LIFETIME, MetricsMiddleware, attach_statement_metrics
+from app.query_log import QueryLogger, set_current_route
+from app.query_budget import DEBUG_QUERIES, QueryBudgetMiddleware
+from app.writer import GroupCommitWriter
+from app.jobs import JobRunner
+from app.services.job_handlers import register_jobs
 from app.controllers.user_controller import UserController
 from app.controllers.product_controller import ProductController
 from app.controllers.order_controller import OrderController
+from app.controllers.cache_controller import CacheController
+from app.controllers.database_controller import DatabaseController
+from app.controllers.analytics_controller import AnalyticsController
+from app.controllers.metrics_controller import MetricsController
+from app.controllers.job_controller import JobController
 from app.repositories.user_repository import UserRepository
 from app.services.user_service import UserService
 from app.repositories.product_repository import ProductRepository
 from app.services.product_service import ProductService
 from app.repositories.order_repository import OrderRepository
 from app.services.order_service import OrderService
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.services.analytics_service import AnalyticsService
 
 # Настройка базы данных - используем существующий data.db
 DATABASE_URL = "sqlite+aiosqlite:///./data.db"  # Путь относительно текущей директории
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    connect_args={"check_same_thread": False}  # Важно для SQLite
-)
-async_session_factory = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+# Пул соединений на чтение и отдельный движок записи; PRAGMA профилей - см. app/database.py
+database = ReadWriteDatabase(DATABASE_URL)
+
+# Журнал медленных и выборочных запросов вместо echo=True - см. app/query_log.py
+query_log = QueryLogger()
+query_log.attach(database.read_engine, "read")
+query_log.attach(database.write_engine, "write")
+
+# Метрики Prometheus по запросам и пулам - см. app/metrics.py и GET /metrics
+attach_statement_metrics(database.read_engine, "read")
+attach_statement_metrics(database.write_engine, "write")
+
+# Изменяющие запросы выполняются одной задачей записи с групповым commit - см. app/writer.py
+writer = GroupCommitWriter(database.write_sessions)
+
+# Тяжёлые операции (каскадные удаления, выгрузки, пересчёт агрегатов) - фоновыми задачами, см. app/jobs.py
+jobs = JobRunner(writer, database.read_sessions)
+register_jobs(jobs)
 
-async def provide_db_session() -> AsyncGenerator[AsyncSession, None]:
-    """Провайдер сессии базы данных"""
-    async with async_session_factory() as session:
-        try:
+async def provide_database() -> ReadWriteDatabase:
+    """Провайдер движков БД (для метрик пулов)"""
+    return database
+
+async def provide_writer() -> GroupCommitWriter:
+    """Провайдер задачи записи"""
+    return writer
+
+async def provide_jobs() -> JobRunner:
+    """Провайдер очереди фоновых задач"""
+    return jobs
+
+async def provide_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Провайдер сессии базы данных: GET читает через пул чтения, остальные методы - через движок записи"""
+    started = time.perf_counter()
+    try:
+        async with database.session(request.method) as session:
             yield session
-        finally:
-            await session.close()
+    finally:
+        side = "read" if request.method.upper() in READ_METHODS else "write"
+        SESSION_LIFETIME.observe(time.perf_counter() - started, side=side)
+
+async def provide_db_session_factory(request: Request) -> sessionmaker:
+    """Провайдер фабрики сессий для потоковых ответов, которые переживают сессию запроса"""
+    return database.sessions_for(request.method)
 
 async def provide_user_repository() -> UserRepository:
     """Провайдер репозитория пользователей"""
@@ -63,17 +105,37 @@ async def provide_order_service(
     """Провайдер сервиса заказов"""
     return OrderService(order_repository, user_repository, product_repository)
 
+async def provide_analytics_repository() -> AnalyticsRepository:
+    """Провайдер репозитория агрегатов продаж"""
+    return AnalyticsRepository()
+
+async def provide_analytics_service(analytics_repository: AnalyticsRepository) -> AnalyticsService:
+    """Провайдер сервиса аналитики"""
+    return AnalyticsService(analytics_repository)
+
 app = Litestar(
-    route_handlers=[UserController, ProductController, OrderController],
+    route_handlers=[UserController, ProductController, OrderController, CacheController, DatabaseController, AnalyticsController, MetricsController, JobController],
     dependencies={
+        "database": Provide(provide_database),
+        "writer": Provide(provide_writer),
+        "jobs": Provide(provide_jobs),
         "db_session": Provide(provide_db_session),
+        "db_session_factory": Provide(provide_db_session_factory),
         "user_repository": Provide(provide_user_repository),
         "user_service": Provide(provide_user_service),
         "product_repository": Provide(provide_product_repository),
         "product_service": Provide(provide_product_service),
         "order_repository": Provide(provide_order_repository),
         "order_service": Provide(provide_order_service),
+        "analytics_repository": Provide(provide_analytics_repository),
+        "analytics_service": Provide(provide_analytics_service),
     },
+    # APP_DEBUG_QUERIES=1: число запросов и признаки N+1 в заголовках ответа - см. app/query_budget.py
+    middleware=[MetricsMiddleware(), *([QueryBudgetMiddleware()] if DEBUG_QUERIES else [])],
+    before_request=set_current_route,
+    on_startup=[query_log.start, jobs.start],
+    # Обработчики задач пишут через задачу записи - останавливаются раньше неё
+    on_shutdown=[jobs.stop, writer.stop, database.dispose, query_log.stop],
 )
 
 if __name__ == "__main__":
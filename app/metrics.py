@@ -0,0 +1,285 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+Счётчики, датчики и гистограммы хранятся в памяти процесса и отдаются
+эндпоинтом /metrics; внешний сборщик или клиентская библиотека не нужны.
+Обновления выполняются в потоке цикла событий, поэтому блокировки не нужны.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from litestar.exceptions import HTTPException
+from litestar.middleware import ASGIMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Границы гистограмм по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Границы гистограммы числа SQL-запросов на HTTP-запрос
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """Значение, которое может расти и убывать"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Распределение наблюдений по корзинам с суммой и числом наблюдений"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Для каждого набора меток: счётчики корзин (не накопленные), сумма, число
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * len(self.buckets), [0.0, 0.0])
+        counts, totals = entry
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        totals[0] += value
+        totals[1] += 1
+
+    def samples(self) -> Iterable[str]:
+        names = self.labelnames + ("le",)
+        for key, (counts, (total, count)) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {_format_value(count)}"
+
+
+class MetricsRegistry:
+    """Набор метрик процесса и их текстовое представление"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("handler",)
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route handler", ("handler", "method", "status")
+)
+REQUEST_STATEMENTS = REGISTRY.histogram(
+    "db_statements_per_request", "SQL statements executed per HTTP request", ("handler",), STATEMENT_COUNT_BUCKETS
+)
+REQUEST_STATEMENT_SECONDS = REGISTRY.histogram(
+    "db_statement_seconds_per_request", "Total SQL execution time per HTTP request", ("handler",)
+)
+STATEMENTS = REGISTRY.counter(
+    "db_statements_total", "SQL statements executed", ("engine",)
+)
+STATEMENT_DURATION = REGISTRY.histogram(
+    "db_statement_duration_seconds", "SQL statement execution time", ("engine",)
+)
+SESSION_LIFETIME = REGISTRY.histogram(
+    "db_session_lifetime_seconds", "Lifetime of request-scoped DB sessions", ("side",)
+)
+POOL_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("pool",)
+)
+POOL_CHECKED_OUT = REGISTRY.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ("pool",)
+)
+POOL_SIZE = REGISTRY.gauge(
+    "db_pool_size", "Configured pool size", ("pool",)
+)
+POOL_TIMEOUTS = REGISTRY.counter(
+    "db_pool_timeouts_total", "Pool checkouts that timed out", ("pool",)
+)
+JOBS_RUNNING = REGISTRY.gauge(
+    "jobs_running", "Background jobs currently running", ("kind",)
+)
+JOB_DURATION = REGISTRY.histogram(
+    "job_duration_seconds", "Background job attempt duration by outcome", ("kind", "status")
+)
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    "single_flight_calls_total", "Coalesced reads: leaders query the DB, followers share an in-flight result", ("name", "role")
+)
+
+
+class RequestStats:
+    """SQL-запросы одного HTTP-запроса; задачи записи получают объект через контекст"""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def attach_statement_metrics(engine: AsyncEngine, name: str) -> AsyncEngine:
+    """Считать запросы движка и их длительность - всего и по текущему HTTP-запросу"""
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        STATEMENTS.inc(engine=name)
+        STATEMENT_DURATION.observe(elapsed, engine=name)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_execute)
+    return engine
+
+
+def handler_name(scope: Scope) -> str:
+    """Имя обработчика маршрута: "UserController.get_user_by_id" """
+    route_handler = scope.get("route_handler")
+    fn = getattr(route_handler, "fn", None)
+    return getattr(fn, "__qualname__", None) or getattr(route_handler, "handler_name", "unknown")
+
+
+class MetricsMiddleware(ASGIMiddleware):
+    """Задержка, статус, запросы в работе и SQL-запросы каждого HTTP-запроса"""
+
+    scopes = ("http",)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        handler = handler_name(scope)
+        status = 500
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(handler=handler)
+        started = time.perf_counter()
+        try:
+            await next_app(scope, receive, send_wrapper)
+        except HTTPException as exc:
+            status = exc.status_code
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.dec(handler=handler)
+            current_request_stats.reset(token)
+            REQUEST_DURATION.observe(time.perf_counter() - started, handler=handler, method=scope["method"], status=str(status))
+            REQUEST_STATEMENTS.observe(stats.statements, handler=handler)
+            REQUEST_STATEMENT_SECONDS.observe(stats.seconds, handler=handler)
@@ -0,0 +1,116 @@
+"""Подсчёт SQL-запросов единицы работы и поиск N+1.
+
+Счётчик включается контекстным менеджером count_queries (фикстура тестов
+assert_max_queries) или QueryBudgetMiddleware (заголовки ответа в режиме
+разработки) и видит все запросы, выполненные в его контексте, через любой
+движок. N+1 выглядит как один и тот же SELECT, повторённый для каждой
+строки: запросы сравниваются по форме - тексту SQL без значений параметров.
+"""
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from litestar.datastructures import MutableScopeHeaders
+from litestar.middleware import ASGIMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Заголовки X-Query-Count / X-Query-Repeated в ответах (только для разработки)
+DEBUG_QUERIES = os.getenv("APP_DEBUG_QUERIES", "") == "1"
+
+# Сколько одинаковых SELECT за единицу работы считать признаком N+1
+REPEAT_THRESHOLD = 3
+
+# Учитываются только запросы к данным: BEGIN, SAVEPOINT и PRAGMA не зависят от кода репозиториев
+_COUNTED_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# Раскрытые списки IN (?, ?, ?) разной длины - одна и та же форма запроса
+_EXPANDED_LIST_RE = re.compile(r"\(\?(?:, \?)+\)")
+
+logger = logging.getLogger("app.query_budget")
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: SQL без различий в длине списков параметров и пробелах"""
+    return " ".join(_EXPANDED_LIST_RE.sub("(?)", statement).split())
+
+
+class QueryCounter:
+    """SQL-запросы к данным, выполненные за единицу работы"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    def record(self, statement: str) -> None:
+        if statement.lstrip()[:6].upper().startswith(_COUNTED_PREFIXES):
+            self.statements.append(statement_shape(statement))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> Dict[str, int]:
+        """SELECT, выполненные не меньше threshold раз, - вероятные N+1"""
+        counts = Counter(shape for shape in self.statements if shape.upper().startswith(("SELECT", "WITH")))
+        return {shape: count for shape, count in counts.items() if count >= threshold}
+
+    def report(self) -> str:
+        lines = [f"{self.count} statement(s):"]
+        lines += [f"  {index}. {shape}" for index, shape in enumerate(self.statements, 1)]
+        return "\n".join(lines)
+
+
+current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("current_query_counter", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Считать запросы, выполненные внутри блока (в том числе задачей записи по его работам)"""
+    counter = QueryCounter()
+    token = current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        current_counter.reset(token)
+
+
+class QueryBudgetMiddleware(ASGIMiddleware):
+    """Число запросов обработчика и повторяющиеся SELECT - в заголовках ответа и в журнале.
+
+    Запросы, выполненные уже после начала ответа (потоковая выгрузка), в заголовки не попадают.
+    """
+
+    scopes = ("http",)
+
+    def __init__(self, repeat_threshold: int = REPEAT_THRESHOLD):
+        self.repeat_threshold = repeat_threshold
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        with count_queries() as counter:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    repeated = counter.repeated(self.repeat_threshold)
+                    headers = MutableScopeHeaders.from_message(message)
+                    headers["X-Query-Count"] = str(counter.count)
+                    if repeated:
+                        headers["X-Query-Repeated"] = str(max(repeated.values()))
+                        logger.warning(
+                            "possible N+1 in %s %s: %s", scope["method"], scope["path"],
+                            "; ".join(f"{count}x {shape}" for shape, count in repeated.items()),
+                        )
+                await send(message)
+
+            await next_app(scope, receive, send_wrapper)
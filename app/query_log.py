@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Запросы медленнее порога (мс) пишутся всегда, остальные - с вероятностью SQL_LOG_SAMPLE_RATE
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+SAMPLE_RATE = float(os.getenv("SQL_LOG_SAMPLE_RATE", "0"))
+
+# Сколько символов SQL сохранять в записи журнала
+MAX_STATEMENT_LENGTH = 2000
+
+# Маршрут текущего HTTP-запроса ("GET /orders/{order_id}"); задачи записи получают его от вызывающего
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+# Каталог репозиториев: первый кадр стека из него - метод, который выполнил запрос
+_REPOSITORIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "repositories") + os.sep
+
+
+async def set_current_route(request) -> None:
+    """Хук before_request: запомнить шаблон маршрута для записей журнала запросов.
+
+    Асинхронный намеренно: синхронный хук Litestar может выполнить в потоке,
+    и значение осталось бы в копии контекста.
+    """
+    current_route.set(f"{request.method} {request.scope.get('path_template', request.url.path)}")
+
+
+def _repository_caller() -> Optional[str]:
+    """Метод репозитория, из которого выполняется запрос.
+
+    Запросы AsyncSession выполняются в отдельном greenlet, поэтому стек
+    вызывающей корутины ищется и в родительском greenlet.
+    """
+    frame = sys._getframe(2)
+    parent = getcurrent().parent
+    frames = [frame, parent.gr_frame if parent is not None else None]
+    for frame in frames:
+        while frame is not None:
+            if frame.f_code.co_filename.startswith(_REPOSITORIES_DIR):
+                owner = frame.f_locals.get("self")
+                name = frame.f_code.co_name
+                return f"{type(owner).__name__}.{name}" if owner is not None else name
+            frame = frame.f_back
+    return None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись журнала запросов - одна строка JSON"""
+
+    fields = ("duration_ms", "slow", "route", "caller", "statement", "executemany", "engine")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"time": self.formatTime(record), "level": record.levelname}
+        entry.update({name: getattr(record, name, None) for name in self.fields})
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class QueryLogger:
+    """Журнал медленных и выборочных SQL-запросов вместо echo=True.
+
+    Длительность каждого запроса измеряется событиями before/after_cursor_execute,
+    но запись формируется только для медленных (не быстрее threshold_ms) и
+    случайно выбранных (доля sample_rate) запросов. Записи уходят в очередь,
+    а в обработчики их пишет фоновый поток, поэтому запрос не ждёт вывода.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        sample_rate: float = SAMPLE_RATE,
+        handlers: Optional[List[logging.Handler]] = None,
+        logger_name: str = "app.sql",
+    ):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.logged = 0
+        if handlers is None:
+            handler = logging.StreamHandler()
+            handler.setFormatter(JsonFormatter())
+            handlers = [handler]
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener = QueueListener(self._queue, *handlers, respect_handler_level=True)
+        self.logger = logging.getLogger(logger_name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(QueueHandler(self._queue))
+
+    def attach(self, engine: AsyncEngine, name: str = "default") -> AsyncEngine:
+        """Измерять запросы движка; name попадает в запись (например, read/write)"""
+
+        def before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            if context is not None:
+                context._query_log_started = time.perf_counter()
+
+        def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            started = getattr(context, "_query_log_started", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            slow = elapsed >= self.threshold
+            if not slow and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+                return
+            self.logged += 1
+            self.logger.log(
+                logging.WARNING if slow else logging.INFO,
+                "slow query" if slow else "sampled query",
+                extra={
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "slow": slow,
+                    "route": current_route.get(),
+                    "caller": _repository_caller(),
+                    "statement": statement[:MAX_STATEMENT_LENGTH],
+                    "executemany": executemany,
+                    "engine": name,
+                },
+            )
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", after_execute)
+        return engine
+
+    def start(self) -> None:
+        """Запустить фоновый поток записи"""
+        if self.listener._thread is None:
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Дописать накопленные записи и остановить фоновый поток"""
+        if self.listener._thread is not None:
+            self.listener.stop()
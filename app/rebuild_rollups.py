@@ -0,0 +1,38 @@
+"""Пересчитать агрегаты продаж (daily_status_orders, daily_product_sales) из заказов.
+
+Нужен после ручной правки заказов в обход триггеров или восстановления БД:
+    python -m app.rebuild_rollups --batch-days 30
+"""
+import argparse
+import asyncio
+
+from app.database import ReadWriteDatabase
+from app.main import DATABASE_URL
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.services.analytics_service import REBUILD_BATCH_DAYS, AnalyticsService
+from app.writer import GroupCommitWriter
+
+
+async def rebuild(database_url: str, batch_days: int) -> int:
+    database = ReadWriteDatabase(database_url, read_pool_size=1)
+    writer = GroupCommitWriter(database.write_sessions)
+    try:
+        return await AnalyticsService(AnalyticsRepository()).rebuild(writer, batch_days)
+    finally:
+        await writer.stop()
+        await database.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пересчёт агрегатов продаж с нуля")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--batch-days", type=int, default=REBUILD_BATCH_DAYS, help="дней в одной транзакции")
+    args = parser.parse_args()
+    if args.batch_days < 1:
+        parser.error("--batch-days must be positive")
+    batches = asyncio.run(rebuild(args.database_url, args.batch_days))
+    print(f"Rebuilt rollups in {batches} batch(es)")
+
+
+if __name__ == "__main__":
+    main()
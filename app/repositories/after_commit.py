@@ -0,0 +1,56 @@
+from typing import Any, Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+def defer(session: AsyncSession, bucket: str, item: Any) -> None:
+    """Отложить item до commit внешней транзакции сессии.
+
+    Элемент помечается транзакцией, в которой его записали: текущей точкой
+    сохранения, если она есть. Откат точки сохранения отбрасывает только её
+    элементы, а её RELEASE передаёт их родительской транзакции.
+    """
+    sync_session = getattr(session, "sync_session", session)
+    owner = sync_session.get_nested_transaction() or sync_session.get_transaction()
+    sync_session.info.setdefault(bucket, []).append((owner, item))
+
+
+def deferred(session: AsyncSession, bucket: str) -> List[Any]:
+    """Элементы, ожидающие commit, во всех точках сохранения"""
+    return [item for _, item in session.info.get(bucket, ())]
+
+
+def on_commit(bucket: str, apply: Callable[[Any], None]) -> None:
+    """Применять элементы bucket после commit внешней транзакции и отбрасывать при откате.
+
+    SQLAlchemy вызывает after_commit и after_rollback и для точек сохранения
+    (RELEASE / ROLLBACK TO SAVEPOINT) - тогда сессия ещё внутри вложенной
+    транзакции, и настоящего commit не было.
+    """
+    @event.listens_for(Session, "after_commit")
+    def _commit(session: Session) -> None:
+        entries = session.info.get(bucket)
+        if not entries:
+            return
+        if session.in_nested_transaction():
+            savepoint = session.get_nested_transaction()
+            session.info[bucket] = [
+                (savepoint.parent if owner is savepoint else owner, item) for owner, item in entries
+            ]
+            return
+        for _, item in session.info.pop(bucket):
+            apply(item)
+
+    @event.listens_for(Session, "after_rollback")
+    def _rollback(session: Session) -> None:
+        if session.in_nested_transaction():
+            savepoint = session.get_nested_transaction()
+            entries = [(owner, item) for owner, item in session.info.get(bucket, ()) if owner is not savepoint]
+            if entries:
+                session.info[bucket] = entries
+            else:
+                session.info.pop(bucket, None)
+            return
+        session.info.pop(bucket, None)
@@ -0,0 +1,135 @@
+import uuid
+from datetime import date
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, union
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import DailyProductSales, DailyStatusOrders, Order, Product, order_items
+
+
+class AnalyticsRepository:
+    """Репозиторий агрегатов продаж.
+
+    Таблицы daily_status_orders и daily_product_sales обновляются триггерами
+    SQLite в транзакции изменения заказа (см. src/models.py), поэтому здесь
+    только чтение агрегатов и их полный пересчёт из заказов.
+    """
+
+    async def revenue_by_day(self, session: AsyncSession, date_from: Optional[date] = None,
+                             date_to: Optional[date] = None, status: Optional[str] = None) -> List[Row]:
+        """Заказы и выручка по дням (day, order_count, revenue)"""
+        stmt = select(
+            DailyStatusOrders.day,
+            func.sum(DailyStatusOrders.order_count).label('order_count'),
+            func.sum(DailyStatusOrders.revenue).label('revenue'),
+        )
+        stmt = self._day_range(stmt, DailyStatusOrders.day, date_from, date_to)
+        if status:
+            stmt = stmt.where(DailyStatusOrders.status == status)
+        stmt = stmt.group_by(DailyStatusOrders.day).order_by(DailyStatusOrders.day)
+        result = await session.execute(stmt)
+        return result.all()
+
+    async def revenue_by_status(self, session: AsyncSession, date_from: Optional[date] = None,
+                                date_to: Optional[date] = None) -> List[Row]:
+        """Заказы и выручка по статусам за период (status, order_count, revenue)"""
+        stmt = select(
+            DailyStatusOrders.status,
+            func.sum(DailyStatusOrders.order_count).label('order_count'),
+            func.sum(DailyStatusOrders.revenue).label('revenue'),
+        )
+        stmt = self._day_range(stmt, DailyStatusOrders.day, date_from, date_to)
+        stmt = stmt.group_by(DailyStatusOrders.status).order_by(DailyStatusOrders.status)
+        result = await session.execute(stmt)
+        return result.all()
+
+    async def top_products(self, session: AsyncSession, limit: int, date_from: Optional[date] = None,
+                           date_to: Optional[date] = None) -> List[Row]:
+        """Продукты с наибольшей выручкой за период (product_id, name, order_count, quantity, revenue)"""
+        totals = select(
+            DailyProductSales.product_id,
+            func.sum(DailyProductSales.order_count).label('order_count'),
+            func.sum(DailyProductSales.quantity).label('quantity'),
+            func.sum(DailyProductSales.revenue).label('revenue'),
+        )
+        totals = self._day_range(totals, DailyProductSales.day, date_from, date_to)
+        totals = (
+            totals.group_by(DailyProductSales.product_id)
+            .order_by(func.sum(DailyProductSales.revenue).desc(), DailyProductSales.product_id)
+            .limit(limit)
+            .subquery()
+        )
+        # Имена догружаются только для строк страницы, а не для всех продуктов периода
+        stmt = (
+            select(totals.c.product_id, Product.name, totals.c.order_count, totals.c.quantity, totals.c.revenue)
+            .join(Product, Product.id == totals.c.product_id)
+            .order_by(totals.c.revenue.desc(), totals.c.product_id)
+        )
+        result = await session.execute(stmt)
+        return result.all()
+
+    async def product_by_day(self, session: AsyncSession, product_id: uuid.UUID, date_from: Optional[date] = None,
+                             date_to: Optional[date] = None) -> List[Row]:
+        """Продажи продукта по дням (day, order_count, quantity, revenue)"""
+        stmt = select(
+            DailyProductSales.day,
+            DailyProductSales.order_count,
+            DailyProductSales.quantity,
+            DailyProductSales.revenue,
+        ).where(DailyProductSales.product_id == product_id)
+        stmt = self._day_range(stmt, DailyProductSales.day, date_from, date_to)
+        result = await session.execute(stmt.order_by(DailyProductSales.day))
+        return result.all()
+
+    async def day_bounds(self, session: AsyncSession) -> Tuple[Optional[date], Optional[date]]:
+        """Первый и последний день, которые затрагивает пересчёт: по заказам и по уже накопленным агрегатам"""
+        days = union(
+            select(func.min(func.date(Order.order_date)).label('low'), func.max(func.date(Order.order_date)).label('high')),
+            select(func.min(DailyStatusOrders.day), func.max(DailyStatusOrders.day)),
+            select(func.min(DailyProductSales.day), func.max(DailyProductSales.day)),
+        ).subquery()
+        result = await session.execute(select(func.min(days.c.low), func.max(days.c.high)))
+        low, high = result.one()
+        return (date.fromisoformat(low) if low else None, date.fromisoformat(high) if high else None)
+
+    async def rebuild_days(self, session: AsyncSession, day_from: date, day_to: date) -> None:
+        """Пересчитать агрегаты за дни [day_from, day_to] заново из заказов и их позиций"""
+        order_day = func.date(Order.order_date)
+        low, high = day_from.isoformat(), day_to.isoformat()
+
+        await session.execute(delete(DailyStatusOrders).where(DailyStatusOrders.day.between(day_from, day_to)))
+        await session.execute(delete(DailyProductSales).where(DailyProductSales.day.between(day_from, day_to)))
+
+        statuses = (
+            select(order_day, Order.status, func.count(), func.sum(Order.total_price))
+            .where(order_day.between(low, high))
+            .group_by(order_day, Order.status)
+        )
+        await session.execute(
+            insert(DailyStatusOrders).from_select(['day', 'status', 'order_count', 'revenue'], statuses)
+        )
+
+        products = (
+            select(
+                order_day,
+                order_items.c.product_id,
+                func.count(),
+                func.sum(order_items.c.quantity),
+                func.sum(order_items.c.quantity * order_items.c.price_at_order),
+            )
+            .select_from(order_items.join(Order, Order.id == order_items.c.order_id))
+            .where(order_day.between(low, high))
+            .group_by(order_day, order_items.c.product_id)
+        )
+        await session.execute(
+            insert(DailyProductSales).from_select(['day', 'product_id', 'order_count', 'quantity', 'revenue'], products)
+        )
+
+    @staticmethod
+    def _day_range(stmt, column, date_from: Optional[date], date_to: Optional[date]):
+        if date_from:
+            stmt = stmt.where(column >= date_from)
+        if date_to:
+            stmt = stmt.where(column <= date_to)
+        return stmt
@@ -0,0 +1,174 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Type
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.repositories.after_commit import defer, deferred, on_commit
+
+# Настройки кэшей get_by_id по умолчанию
+CACHE_MAX_SIZE = 10_000
+CACHE_TTL_SECONDS = 60.0
+
+# Итоги include_total для фильтров без счётчика: сколько наборов фильтров помнить
+# и предел давности приблизительного числа в секундах
+COUNT_CACHE_MAX_SIZE = 1_000
+COUNT_STALENESS_SECONDS = 30.0
+
+# Ключ в session.info со списком ключей, записанных в текущей транзакции
+_PENDING_KEY = "cache_pending_invalidations"
+
+
+class LRUCache:
+    """LRU-кэш в памяти процесса с TTL и ограничением размера.
+
+    Любой объект с теми же методами (get, set, token, invalidate, clear, stats)
+    можно передать в репозиторий вместо него.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Растёт при каждой инвалидации; значение, прочитанное до неё, в кэш не попадёт
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение по ключу или None при промахе"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def token(self) -> int:
+        """Метка, которую нужно взять до чтения из БД и передать в set"""
+        return self._epoch
+
+    def set(self, key: Hashable, value: Any, token: int) -> None:
+        """Сохранить значение, если с момента взятия token не было инвалидаций"""
+        if self.maxsize <= 0 or token != self._epoch:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удалить значение по ключу"""
+        self._epoch += 1
+        self.invalidations += 1
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш целиком"""
+        self._epoch += 1
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики для подбора размера кэша"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Общие кэши репозиториев: репозитории создаются на каждый запрос, кэш - один на процесс
+product_cache = LRUCache()
+user_cache = LRUCache()
+order_cache = LRUCache()
+count_cache = LRUCache(maxsize=COUNT_CACHE_MAX_SIZE, ttl=COUNT_STALENESS_SECONDS)
+
+CACHES = {
+    "products": product_cache,
+    "users": user_cache,
+    "orders": order_cache,
+    "counts": count_cache,
+}
+
+
+def invalidate_after_commit(session: AsyncSession, cache: LRUCache, key: Hashable) -> None:
+    """Пометить ключ записанным: до конца транзакции сессия читает его мимо кэша,
+    а из кэша он удаляется только после commit внешней транзакции (не RELEASE SAVEPOINT)"""
+    defer(session, _PENDING_KEY, (cache, key))
+
+
+def _is_pending(session: AsyncSession, cache: LRUCache, key: Hashable) -> bool:
+    return (cache, key) in deferred(session, _PENDING_KEY)
+
+
+on_commit(_PENDING_KEY, lambda item: item[0].invalidate(item[1]))
+
+
+async def cached_get(
+    session: AsyncSession,
+    cache: LRUCache,
+    model: Type,
+    key: Hashable,
+    load: Callable[[], Awaitable[Optional[Any]]],
+    collections: Sequence[str] = (),
+) -> Optional[Any]:
+    """Cache-aside чтение сущности по первичному ключу.
+
+    В кэше хранится снимок значений столбцов, а не ORM-объект: при попадании
+    снимок присоединяется к сессии вызывающего без обращения к БД.
+    Связи-коллекции из collections (load должен загружать их сам) входят
+    в снимок вместе со столбцами дочерних строк.
+    """
+    if _is_pending(session, cache, key):
+        return await load()
+
+    values = cache.get(key)
+    if values is not None:
+        existing = session.identity_map.get(identity_key(model, key))
+        if existing is not None and not any(name in inspect(existing).unloaded for name in collections):
+            return existing
+        relationships = inspect(model).relationships
+        instance = _detached(model, {name: value for name, value in values.items() if name not in collections})
+        for name in collections:
+            # Без событий связи: merge(load=False) принимает только неизменённые объекты
+            children = [_detached(relationships[name].mapper.class_, child) for child in values[name]]
+            set_committed_value(instance, name, children)
+        return await session.merge(instance, load=False)
+
+    token = cache.token()
+    instance = await load()
+    if instance is not None and not _is_pending(session, cache, key):
+        snapshot = _column_values(instance)
+        for name in collections:
+            snapshot[name] = [_column_values(child) for child in getattr(instance, name)]
+        cache.set(key, snapshot, token)
+    return instance
+
+
+def _column_values(instance: Any) -> Dict[str, Any]:
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+
+
+def _detached(model: Type, values: Dict[str, Any]) -> Any:
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return instance
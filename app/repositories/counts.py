@@ -0,0 +1,38 @@
+from typing import Any, Hashable, Tuple, Type
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.cache import LRUCache
+from app.repositories.versions import VersionTracker
+
+
+async def counter_value(session: AsyncSession, model: Type, count_column: Any, *where: Any) -> int:
+    """Значение счётчика из таблицы счётчиков (src.models); нет строки - 0"""
+    value = await session.scalar(select(count_column).select_from(model).where(*where))
+    return value or 0
+
+
+async def cached_count(
+    session: AsyncSession,
+    cache: LRUCache,
+    versions: VersionTracker,
+    key: Hashable,
+    stmt: Select,
+) -> Tuple[int, bool]:
+    """COUNT(*) по выборке stmt через кэш; возвращает число и признак точности.
+
+    Для фильтров, у которых нет счётчика. Сохранённое число отдаётся, пока
+    оно не старше TTL кэша; если с момента подсчёта версия таблицы не
+    менялась, оно точное, иначе - приблизительное с ограниченной давностью.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        total, counted_version = entry
+        return total, counted_version == versions.table_version
+
+    # Версия берётся до подсчёта: запись во время него сделает число приблизительным, а не наоборот
+    token, version = cache.token(), versions.table_version
+    total = await session.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    cache.set(key, (total, version), token)
+    return total, True
@@ -1,81 +1,206 @@
 import uuid
-from typing import List, Optional
-from sqlalchemy import select, update, delete
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import case, literal, Select, select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.util import identity_key
 
-from src.models import Order, User, Product, order_items
+from src.models import Order, OrderItem, Product, StatusOrderCount, TableRowCount, UserOrderCount
+from app.repositories.cache import LRUCache, cached_get, count_cache, invalidate_after_commit, order_cache
+from app.repositories.cache import product_cache as default_product_cache
+from app.repositories.counts import cached_count, counter_value
+from app.repositories.pagination import apply_keyset, encode_cursor
+from app.repositories.versions import bump_after_commit, order_versions, product_versions
 
 
 class OrderRepository:
     """Репозиторий для работы с заказами"""
+
+    # Ключ сортировки для курсорной пагинации; id в конце делает ключ уникальным
+    cursor_columns = (Order.order_date, Order.id)
+    
+    # Версии таблицы и строк для ETag
+    versions = order_versions
+    
+    def __init__(self, *, cache: Optional[LRUCache] = None, product_cache: Optional[LRUCache] = None):
+        self.cache = cache if cache is not None else order_cache
+        self.count_cache = count_cache
+        self.product_cache = product_cache if product_cache is not None else default_product_cache
+    
+    # Позиции всех заказов выборки - одним дополнительным SELECT ... WHERE order_id IN (...)
+    load_items = selectinload(Order.items)
+    
+    def _mark_written(self, session: AsyncSession, order_id: uuid.UUID) -> None:
+        """После commit сбросить запись в кэше и поднять её версию для ETag"""
+        invalidate_after_commit(session, self.cache, order_id)
+        bump_after_commit(session, self.versions, order_id)
     
     async def get_by_id(self, session: AsyncSession, order_id: uuid.UUID) -> Optional[Order]:
-        """Получить заказ по ID"""
-        stmt = select(Order).where(Order.id == order_id)
+        """Получить заказ по ID (через кэш)"""
+        return await cached_get(
+            session, self.cache, Order, order_id, lambda: self._load_by_id(session, order_id), collections=("items",)
+        )
+    
+    async def _load_by_id(self, session: AsyncSession, order_id: uuid.UUID) -> Optional[Order]:
+        stmt = select(Order).where(Order.id == order_id).options(self.load_items)
         result = await session.execute(stmt)
         return result.scalar_one_or_none()
     
-    async def get_by_filter(self, session: AsyncSession, count: int, page: int, **kwargs) -> List[Order]:
-        """Получить заказы по фильтрам с пагинацией"""
-        stmt = select(Order)
+    async def get_by_ids(self, session: AsyncSession, order_ids: List[uuid.UUID]) -> List[Order]:
+        """Получить заказы по списку ID одним запросом (позиции - ещё одним для всех)"""
+        if not order_ids:
+            return []
+        stmt = select(Order).where(Order.id.in_(order_ids)).options(self.load_items)
+        result = await session.execute(stmt)
+        return result.scalars().all()
+    
+    def _filter_stmt(self, **kwargs) -> Select:
+        """Выборка с применёнными фильтрами get_by_filter"""
+        stmt = select(Order).options(self.load_items)
         
         # Применяем фильтры
         if 'user_id' in kwargs and kwargs['user_id']:
             stmt = stmt.where(Order.user_id == kwargs['user_id'])
         if 'status' in kwargs and kwargs['status']:
             stmt = stmt.where(Order.status == kwargs['status'])
+        return stmt
+    
+    async def get_by_filter(self, session: AsyncSession, count: int, page: int, after: Optional[str] = None, **kwargs) -> List[Order]:
+        """Получить заказы по фильтрам с пагинацией"""
+        stmt = self._filter_stmt(**kwargs)
         
-        # Применяем пагинацию
-        offset = (page - 1) * count
-        stmt = stmt.offset(offset).limit(count)
+        # Применяем пагинацию: курсор `after` имеет приоритет над номером страницы
+        stmt = apply_keyset(stmt, self.cursor_columns, after)
+        if not after:
+            stmt = stmt.offset((page - 1) * count)
+        stmt = stmt.limit(count)
         
         result = await session.execute(stmt)
         return result.scalars().all()
     
+    async def count_by_filter(self, session: AsyncSession, **kwargs) -> Tuple[int, bool]:
+        """Число заказов по фильтрам get_by_filter и признак точности.
+
+        Без фильтров, только по статусу или только по пользователю - точное
+        число из таблиц счётчиков; иначе - COUNT(*) через кэш итогов.
+        """
+        filters = {key: value for key, value in kwargs.items() if value}
+        if not filters:
+            return await counter_value(session, TableRowCount, TableRowCount.row_count, TableRowCount.table_name == 'orders'), True
+        if filters.keys() == {'status'}:
+            return await counter_value(
+                session, StatusOrderCount, StatusOrderCount.order_count, StatusOrderCount.status == filters['status']
+            ), True
+        if filters.keys() == {'user_id'}:
+            return await counter_value(
+                session, UserOrderCount, UserOrderCount.order_count, UserOrderCount.user_id == filters['user_id']
+            ), True
+        key = ('orders', tuple(sorted(filters.items())))
+        return await cached_count(session, self.count_cache, self.versions, key, self._filter_stmt(**filters))
+    
+    def next_cursor(self, items: List[Order], count: int) -> Optional[str]:
+        """Курсор на следующую страницу или None, если страница неполная"""
+        if len(items) < count:
+            return None
+        return encode_cursor(items[-1], self.cursor_columns)
+    
+    async def stream_by_filter(self, session: AsyncSession, batch_size: int = 1000, **kwargs) -> AsyncIterator[List[Order]]:
+        """Потоково выдавать заказы по фильтрам пачками по batch_size строк"""
+        stmt = self._filter_stmt(**kwargs).order_by(*self.cursor_columns)
+        result = await session.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+    
     async def create(self, session: AsyncSession, user_id: uuid.UUID, address_id: Optional[uuid.UUID] = None, 
                      items: Optional[List[dict]] = None, total_price: float = 0.0, status: str = 'pending') -> Order:
-        """Создать новый заказ"""
+        """Создать новый заказ.
+
+        Число запросов не зависит от числа позиций: цены (если их не передали
+        в `price_at_order`) читаются одним IN-запросом, позиции вставляются
+        вместе с заказом одним executemany, а остатки списываются одним
+        условным UPDATE.
+        Проверка остатка и списание атомарны, поэтому параллельные заказы
+        не могут увести остаток в минус. Повторы продукта в items сливаются
+        в одну позицию с суммарным количеством.
+        """
+        # Позиция на продукт одна (первичный ключ - order_id, product_id), и списать
+        # нужно сумму количеств: CASE по product_id увидел бы только последний повтор
+        merged: Dict[uuid.UUID, dict] = {}
+        for item in items or []:
+            row = merged.get(item['product_id'])
+            if row is None:
+                merged[item['product_id']] = dict(item)
+                continue
+            row['quantity'] += item['quantity']
+            if 'price_at_order' in item:
+                row.setdefault('price_at_order', item['price_at_order'])
+        rows = list(merged.values())
+        
+        # Догружаем цены тех позиций, для которых их не передал сервис
+        missing = [row['product_id'] for row in rows if 'price_at_order' not in row]
+        if missing:
+            result = await session.execute(
+                select(Product.id, Product.price).where(Product.id.in_(missing))
+            )
+            prices = dict(result.all())
+            for row in rows:
+                if 'price_at_order' not in row:
+                    if row['product_id'] not in prices:
+                        raise ValueError(f"Product with id {row['product_id']} not found")
+                    row['price_at_order'] = prices[row['product_id']]
+        
+        # Общая стоимость считается в том же проходе, до вставки заказа
+        total_price += sum(row['price_at_order'] * row['quantity'] for row in rows)
+        
+        # Позиции сохраняются тем же flush, что и заказ: все одной executemany-вставкой
         order = Order(
             user_id=user_id,
             address_id=address_id,
             total_price=total_price,
-            status=status
+            status=status,
+            items=[
+                OrderItem(product_id=row['product_id'], quantity=row['quantity'], price_at_order=row['price_at_order'])
+                for row in rows
+            ],
         )
-        
         session.add(order)
         await session.flush()
-        await session.refresh(order)
+        self._mark_written(session, order.id)
         
-        # Если переданы элементы заказа, добавляем их
-        if items:
-            for item in items:
-                product_id = item['product_id']
-                quantity = item['quantity']
-                
-                # Получаем продукт для получения цены на момент заказа
-                product = await session.get(Product, product_id)
-                if product:
-                    # Проверяем, достаточно ли товара на складе
-                    if product.stock_quantity >= quantity:
-                        # Уменьшаем количество товара на складе
-                        product.stock_quantity -= quantity
-                        
-                        # Добавляем запись в промежуточную таблицу
-                        stmt = order_items.insert().values(
-                            order_id=order.id,
-                            product_id=product_id,
-                            quantity=quantity,
-                            price_at_order=product.price
-                        )
-                        await session.execute(stmt)
-                        
-                        # Обновляем общую стоимость заказа
-                        order.total_price += product.price * quantity
-                    else:
-                        raise ValueError(f"Not enough stock for product {product_id}")
+        if rows:
+
+            # Списываем остатки одним условным UPDATE: строка меняется, только если
+            # остатка хватает, а RETURNING сообщает, какие позиции приняты
+            products = Product.__table__
+            # Ключи WHEN связываются с типом столбца id: сами по себе UUID ушли бы как текст
+            quantity = case(
+                {literal(row['product_id'], products.c.id.type): row['quantity'] for row in rows},
+                value=products.c.id,
+            )
+            stmt = (
+                update(products)
+                .where(products.c.id.in_([row['product_id'] for row in rows]))
+                .where(products.c.stock_quantity >= quantity)
+                .values(stock_quantity=products.c.stock_quantity - quantity)
+                .returning(products.c.id)
+            )
+            result = await session.execute(stmt)
+            accepted = set(result.scalars().all())
+            
+            # Хотя бы одна позиция отклонена - заказ целиком недействителен,
+            # вызывающий код откатывает транзакцию
+            for row in rows:
+                if row['product_id'] not in accepted:
+                    raise ValueError(f"Not enough stock for product {row['product_id']}")
+            
+            # Остатки в уже загруженных объектах Product и в кэше продуктов устарели
+            for row in rows:
+                invalidate_after_commit(session, self.product_cache, row['product_id'])
+                bump_after_commit(session, product_versions, row['product_id'])
+                product = session.identity_map.get(identity_key(Product, row['product_id']))
+                if product is not None:
+                    session.expire(product, ['stock_quantity'])
         
-        await session.flush()
-        await session.refresh(order)
         return order
     
     async def update(self, session: AsyncSession, order_id: uuid.UUID, **kwargs) -> Order:
@@ -98,6 +223,7 @@ class OrderRepository:
                 raise ValueError(f"Order with id {order_id} not found")
             return order
         
+        self._mark_written(session, order_id)
         stmt = update(Order).where(Order.id == order_id).values(**update_data)
         await session.execute(stmt)
         
@@ -115,4 +241,5 @@ class OrderRepository:
             
         stmt = delete(Order).where(Order.id == order_id)
         await session.execute(stmt)
+        self._mark_written(session, order_id)
         return True
\ No newline at end of file
@@ -0,0 +1,62 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Select, tuple_
+
+
+def encode_cursor(entity: Any, columns: Sequence) -> str:
+    """Закодировать ключ сортировки записи в непрозрачный курсор"""
+    values = []
+    for column in columns:
+        value = getattr(entity, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = value.hex
+        values.append(value)
+
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, columns: Sequence) -> list:
+    """Раскодировать курсор обратно в значения ключа сортировки"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise ValueError(f"Invalid cursor: {token}")
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError(f"Invalid cursor: {token}")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is uuid.UUID:
+                value = uuid.UUID(value)
+            elif not isinstance(value, python_type):
+                raise TypeError
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid cursor: {token}")
+        decoded.append(value)
+    return decoded
+
+
+def apply_keyset(stmt: Select, columns: Sequence, after: Optional[str] = None) -> Select:
+    """Упорядочить выборку по ключу и, если передан курсор, продолжить сразу после него.
+
+    Сравнение кортежей `(a, b) > (:a, :b)` SQLite обслуживает поиском по индексу,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    """
+    if after:
+        values = decode_cursor(after, columns)
+        stmt = stmt.where(tuple_(*columns) > tuple(values))
+    return stmt.order_by(*columns)
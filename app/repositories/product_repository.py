@@ -1,39 +1,118 @@
 import uuid
-from typing import List, Optional
-from sqlalchemy import select, update, delete
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import Select, select, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import Product
+from src.models import OrderItem, Product, TableRowCount
+from app.repositories.cache import LRUCache, cached_get, count_cache, invalidate_after_commit, product_cache
+from app.repositories.cache import order_cache as default_order_cache
+from app.repositories.counts import cached_count, counter_value
+from app.repositories.pagination import apply_keyset, encode_cursor
+from app.repositories.search import apply_search, search_rank
+from app.repositories.versions import bump_after_commit, order_versions, product_versions
 
 
 class ProductRepository:
     """Репозиторий для работы с продуктами"""
+
+    # Ключ сортировки для курсорной пагинации; id в конце делает ключ уникальным
+    cursor_columns = (Product.name, Product.id)
+    
+    # Веса столбцов полнотекстового индекса для ранжирования bm25
+    search_weights = (10.0, 1.0)
+    
+    # Версии таблицы и строк для ETag
+    versions = product_versions
+    
+    def __init__(self, *, cache: Optional[LRUCache] = None, order_cache: Optional[LRUCache] = None):
+        self.cache = cache if cache is not None else product_cache
+        self.count_cache = count_cache
+        self.order_cache = order_cache if order_cache is not None else default_order_cache
+    
+    def _mark_written(self, session: AsyncSession, product_id: uuid.UUID) -> None:
+        """После commit сбросить запись в кэше и поднять её версию для ETag"""
+        invalidate_after_commit(session, self.cache, product_id)
+        bump_after_commit(session, self.versions, product_id)
     
     async def get_by_id(self, session: AsyncSession, product_id: uuid.UUID) -> Optional[Product]:
-        """Получить продукт по ID"""
+        """Получить продукт по ID (через кэш)"""
+        return await cached_get(session, self.cache, Product, product_id, lambda: self._load_by_id(session, product_id))
+    
+    async def _load_by_id(self, session: AsyncSession, product_id: uuid.UUID) -> Optional[Product]:
         stmt = select(Product).where(Product.id == product_id)
         result = await session.execute(stmt)
         return result.scalar_one_or_none()
     
-    async def get_by_filter(self, session: AsyncSession, count: int, page: int, **kwargs) -> List[Product]:
-        """Получить продукты по фильтрам с пагинацией"""
+    async def get_by_ids(self, session: AsyncSession, product_ids: List[uuid.UUID]) -> List[Product]:
+        """Получить продукты по списку ID одним запросом"""
+        if not product_ids:
+            return []
+        stmt = select(Product).where(Product.id.in_(product_ids))
+        result = await session.execute(stmt)
+        return result.scalars().all()
+    
+    def _filter_stmt(self, **kwargs) -> Select:
+        """Выборка с применёнными фильтрами get_by_filter"""
         stmt = select(Product)
         
-        # Применяем фильтры
+        # Применяем фильтры: q - полнотекстовый поиск по индексу FTS5,
+        # name - поиск подстроки (полный просмотр таблицы, но находит части слов)
+        if kwargs.get('q'):
+            stmt = apply_search(stmt, Product, kwargs['q'])
         if 'name' in kwargs and kwargs['name']:
             stmt = stmt.where(Product.name.ilike(f"%{kwargs['name']}%"))
         if 'min_price' in kwargs:
             stmt = stmt.where(Product.price >= kwargs['min_price'])
         if 'max_price' in kwargs:
             stmt = stmt.where(Product.price <= kwargs['max_price'])
+        return stmt
+    
+    async def get_by_filter(self, session: AsyncSession, count: int, page: int, after: Optional[str] = None, **kwargs) -> List[Product]:
+        """Получить продукты по фильтрам с пагинацией"""
+        stmt = self._filter_stmt(**kwargs)
         
-        # Применяем пагинацию
-        offset = (page - 1) * count
-        stmt = stmt.offset(offset).limit(count)
+        if kwargs.get('q'):
+            # Результаты поиска упорядочены по релевантности - только постраничная пагинация
+            if after:
+                raise ValueError("Invalid cursor: cursor pagination is not supported with q")
+            stmt = stmt.order_by(search_rank(Product, *self.search_weights), Product.id)
+            stmt = stmt.offset((page - 1) * count)
+        else:
+            # Применяем пагинацию: курсор `after` имеет приоритет над номером страницы
+            stmt = apply_keyset(stmt, self.cursor_columns, after)
+            if not after:
+                stmt = stmt.offset((page - 1) * count)
+        stmt = stmt.limit(count)
         
         result = await session.execute(stmt)
         return result.scalars().all()
     
+    async def count_by_filter(self, session: AsyncSession, **kwargs) -> Tuple[int, bool]:
+        """Число продуктов по фильтрам get_by_filter и признак точности.
+
+        Без фильтров - точное число из таблицы счётчиков; с фильтрами -
+        COUNT(*) через кэш итогов.
+        """
+        filters = {key: value for key, value in kwargs.items() if value is not None and value != ''}
+        if not filters:
+            return await counter_value(session, TableRowCount, TableRowCount.row_count, TableRowCount.table_name == 'products'), True
+        key = ('products', tuple(sorted(filters.items())))
+        return await cached_count(session, self.count_cache, self.versions, key, self._filter_stmt(**filters))
+    
+    def next_cursor(self, items: List[Product], count: int) -> Optional[str]:
+        """Курсор на следующую страницу или None, если страница неполная"""
+        if len(items) < count:
+            return None
+        return encode_cursor(items[-1], self.cursor_columns)
+    
+    async def stream_by_filter(self, session: AsyncSession, batch_size: int = 1000, **kwargs) -> AsyncIterator[List[Product]]:
+        """Потоково выдавать продукты по фильтрам пачками по batch_size строк"""
+        stmt = self._filter_stmt(**kwargs).order_by(*self.cursor_columns)
+        result = await session.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+    
     async def create(self, session: AsyncSession, name: str, price: float, description: Optional[str] = None, stock_quantity: int = 0) -> Product:
         """Создать новый продукт"""
         product = Product(
@@ -45,8 +124,40 @@ class ProductRepository:
         session.add(product)
         await session.flush()
         await session.refresh(product)
+        self._mark_written(session, product.id)
         return product
     
+    async def upsert_many(self, session: AsyncSession, rows: List[dict]) -> Tuple[int, int]:
+        """Вставить или обновить пачку продуктов по уникальному имени.
+
+        Пишет одним INSERT ... ON CONFLICT(name) DO UPDATE через executemany.
+        Возвращает пару (вставлено, обновлено).
+        """
+        if not rows:
+            return 0, 0
+        
+        # Какие имена уже есть в каталоге - эти строки будут обновлены
+        stmt = select(Product.id).where(Product.name.in_([row['name'] for row in rows]))
+        updated_ids = (await session.execute(stmt)).scalars().all()
+        for product_id in updated_ids:
+            self._mark_written(session, product_id)
+        updated = len(updated_ids)
+        
+        stmt = sqlite_insert(Product.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.name],
+            set_={
+                'price': stmt.excluded.price,
+                'description': stmt.excluded.description,
+                'stock_quantity': stmt.excluded.stock_quantity,
+            }
+        )
+        await session.execute(stmt, rows)
+        if len(rows) > updated:
+            # Новые строки меняют коллекцию, хотя их id заранее неизвестны
+            bump_after_commit(session, self.versions)
+        return len(rows) - updated, updated
+    
     async def update(self, session: AsyncSession, product_id: uuid.UUID, **kwargs) -> Product:
         """Обновить продукт"""
         # Собираем только те поля, которые были переданы
@@ -67,6 +178,7 @@ class ProductRepository:
                 raise ValueError(f"Product with id {product_id} not found")
             return product
         
+        self._mark_written(session, product_id)
         stmt = update(Product).where(Product.id == product_id).values(**update_data)
         await session.execute(stmt)
         
@@ -82,6 +194,26 @@ class ProductRepository:
         if not product:
             return False
             
+        # Позиции с продуктом удаляются каскадом в БД - заказы с ними меняются
+        order_ids = await session.execute(select(OrderItem.order_id).where(OrderItem.product_id == product_id))
+        for order_id in order_ids.scalars():
+            invalidate_after_commit(session, self.order_cache, order_id)
+            bump_after_commit(session, order_versions, order_id)
+        
         stmt = delete(Product).where(Product.id == product_id)
         await session.execute(stmt)
-        return True
\ No newline at end of file
+        self._mark_written(session, product_id)
+        return True
+    
+    async def delete_items_batch(self, session: AsyncSession, product_id: uuid.UUID, limit: int) -> int:
+        """Удалить до limit позиций заказов с продуктом; возвращает число удалённых"""
+        result = await session.execute(select(OrderItem.order_id).where(OrderItem.product_id == product_id).limit(limit))
+        order_ids = result.scalars().all()
+        for order_id in order_ids:
+            invalidate_after_commit(session, self.order_cache, order_id)
+            bump_after_commit(session, order_versions, order_id)
+        if order_ids:
+            await session.execute(
+                delete(OrderItem).where(OrderItem.product_id == product_id, OrderItem.order_id.in_(order_ids))
+            )
+        return len(order_ids)
\ No newline at end of file
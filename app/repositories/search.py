@@ -0,0 +1,34 @@
+import re
+from typing import Type
+
+from sqlalchemy import ColumnElement, Select, column, false, func, literal_column, table
+
+# Слова запроса; внутри кавычек FTS5 дополнительно разбивает их своим токенизатором
+_TERM_RE = re.compile(r"\w+")
+
+
+def fts_query(text: str) -> str:
+    """Превратить пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки (операторы и синтаксис FTS5 из ввода
+    не исполняются) и ищется по префиксу; все слова должны встретиться.
+    """
+    return " ".join(f'"{term}"*' for term in _TERM_RE.findall(text))
+
+
+def apply_search(stmt: Select, model: Type, text: str) -> Select:
+    """Ограничить выборку строками, найденными полнотекстовым индексом модели"""
+    query = fts_query(text)
+    if not query:
+        return stmt.where(false())
+    name = model.__tablename__
+    fts = table(f"{name}_fts", column("rowid"))
+    return (
+        stmt.join(fts, fts.c.rowid == literal_column(f"{name}.rowid"))
+        .where(literal_column(f"{name}_fts").op("MATCH")(query))
+    )
+
+
+def search_rank(model: Type, *weights: float) -> ColumnElement:
+    """Ранг bm25 для ORDER BY (меньше - релевантнее); веса по столбцам индекса"""
+    return func.bm25(literal_column(f"{model.__tablename__}_fts"), *weights)
@@ -1,37 +1,115 @@
 import uuid
-from typing import List, Optional
-from sqlalchemy import select, update, delete
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import Select, select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import User
+from src.models import Order, TableRowCount, User
+from app.repositories.cache import LRUCache, cached_get, count_cache, invalidate_after_commit, user_cache
+from app.repositories.cache import order_cache as default_order_cache
+from app.repositories.counts import cached_count, counter_value
+from app.repositories.pagination import apply_keyset, encode_cursor
+from app.repositories.search import apply_search, search_rank
+from app.repositories.versions import bump_after_commit, order_versions, user_versions
 from app.schemas.user import UserCreate, UserUpdate
 
 class UserRepository:
     """Репозиторий для работы с пользователями"""
+
+    # Ключ сортировки для курсорной пагинации; id в конце делает ключ уникальным
+    cursor_columns = (User.username, User.id)
+    
+    # Веса столбцов полнотекстового индекса для ранжирования bm25
+    search_weights = (10.0, 5.0)
+    
+    # Версии таблицы и строк для ETag
+    versions = user_versions
+    
+    def __init__(self, *, cache: Optional[LRUCache] = None, order_cache: Optional[LRUCache] = None):
+        self.cache = cache if cache is not None else user_cache
+        self.count_cache = count_cache
+        self.order_cache = order_cache if order_cache is not None else default_order_cache
+    
+    def _mark_written(self, session: AsyncSession, user_id: uuid.UUID) -> None:
+        """После commit сбросить запись в кэше и поднять её версию для ETag"""
+        invalidate_after_commit(session, self.cache, user_id)
+        bump_after_commit(session, self.versions, user_id)
     
     async def get_by_id(self, session: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
-        """Получить пользователя по ID"""
+        """Получить пользователя по ID (через кэш)"""
+        return await cached_get(session, self.cache, User, user_id, lambda: self._load_by_id(session, user_id))
+    
+    async def _load_by_id(self, session: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
         stmt = select(User).where(User.id == user_id)
         result = await session.execute(stmt)
         return result.scalar_one_or_none()
     
-    async def get_by_filter(self, session: AsyncSession, count: int, page: int, **kwargs) -> List[User]:
-        """Получить пользователей по фильтрам с пагинацией"""
+    async def get_by_ids(self, session: AsyncSession, user_ids: List[uuid.UUID]) -> List[User]:
+        """Получить пользователей по списку ID одним запросом"""
+        if not user_ids:
+            return []
+        stmt = select(User).where(User.id.in_(user_ids))
+        result = await session.execute(stmt)
+        return result.scalars().all()
+    
+    def _filter_stmt(self, **kwargs) -> Select:
+        """Выборка с применёнными фильтрами get_by_filter"""
         stmt = select(User)
         
-        # Применяем фильтры
+        # Применяем фильтры: q - полнотекстовый поиск по индексу FTS5,
+        # username и email - поиск подстроки (полный просмотр таблицы, но находит части слов)
+        if kwargs.get('q'):
+            stmt = apply_search(stmt, User, kwargs['q'])
         if 'username' in kwargs and kwargs['username']:
             stmt = stmt.where(User.username.ilike(f"%{kwargs['username']}%"))
         if 'email' in kwargs and kwargs['email']:
             stmt = stmt.where(User.email.ilike(f"%{kwargs['email']}%"))
+        return stmt
+    
+    async def get_by_filter(self, session: AsyncSession, count: int, page: int, after: Optional[str] = None, **kwargs) -> List[User]:
+        """Получить пользователей по фильтрам с пагинацией"""
+        stmt = self._filter_stmt(**kwargs)
         
-        # Применяем пагинацию
-        offset = (page - 1) * count
-        stmt = stmt.offset(offset).limit(count)
+        if kwargs.get('q'):
+            # Результаты поиска упорядочены по релевантности - только постраничная пагинация
+            if after:
+                raise ValueError("Invalid cursor: cursor pagination is not supported with q")
+            stmt = stmt.order_by(search_rank(User, *self.search_weights), User.id)
+            stmt = stmt.offset((page - 1) * count)
+        else:
+            # Применяем пагинацию: курсор `after` имеет приоритет над номером страницы
+            stmt = apply_keyset(stmt, self.cursor_columns, after)
+            if not after:
+                stmt = stmt.offset((page - 1) * count)
+        stmt = stmt.limit(count)
         
         result = await session.execute(stmt)
         return result.scalars().all()
     
+    async def count_by_filter(self, session: AsyncSession, **kwargs) -> Tuple[int, bool]:
+        """Число пользователей по фильтрам get_by_filter и признак точности.
+
+        Без фильтров - точное число из таблицы счётчиков; с фильтрами -
+        COUNT(*) через кэш итогов.
+        """
+        filters = {key: value for key, value in kwargs.items() if value is not None and value != ''}
+        if not filters:
+            return await counter_value(session, TableRowCount, TableRowCount.row_count, TableRowCount.table_name == 'users'), True
+        key = ('users', tuple(sorted(filters.items())))
+        return await cached_count(session, self.count_cache, self.versions, key, self._filter_stmt(**filters))
+    
+    def next_cursor(self, items: List[User], count: int) -> Optional[str]:
+        """Курсор на следующую страницу или None, если страница неполная"""
+        if len(items) < count:
+            return None
+        return encode_cursor(items[-1], self.cursor_columns)
+    
+    async def stream_by_filter(self, session: AsyncSession, batch_size: int = 1000, **kwargs) -> AsyncIterator[List[User]]:
+        """Потоково выдавать пользователей по фильтрам пачками по batch_size строк"""
+        stmt = self._filter_stmt(**kwargs).order_by(*self.cursor_columns)
+        result = await session.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+    
     async def create(self, session: AsyncSession, user_data: UserCreate) -> User:
         """Создать нового пользователя"""
         user = User(
@@ -41,6 +119,7 @@ class UserRepository:
         session.add(user)
         await session.flush()
         await session.refresh(user)
+        self._mark_written(session, user.id)
         return user
     
     async def update(self, session: AsyncSession, user_id: uuid.UUID, user_data: UserUpdate) -> User:
@@ -59,6 +138,7 @@ class UserRepository:
                 raise ValueError(f"User with id {user_id} not found")
             return user
         
+        self._mark_written(session, user_id)
         stmt = update(User).where(User.id == user_id).values(**update_data)
         await session.execute(stmt)
         
@@ -74,6 +154,24 @@ class UserRepository:
         if not user:
             return False
             
+        # Заказы и адреса пользователя удаляются каскадом в БД - заказы тоже убираем из кэша
+        order_ids = await session.execute(select(Order.id).where(Order.user_id == user_id))
+        for order_id in order_ids.scalars():
+            invalidate_after_commit(session, self.order_cache, order_id)
+            bump_after_commit(session, order_versions, order_id)
+        
         stmt = delete(User).where(User.id == user_id)
         await session.execute(stmt)
+        self._mark_written(session, user_id)
         return True
+    
+    async def delete_orders_batch(self, session: AsyncSession, user_id: uuid.UUID, limit: int) -> int:
+        """Удалить до limit заказов пользователя; возвращает число удалённых"""
+        result = await session.execute(select(Order.id).where(Order.user_id == user_id).limit(limit))
+        order_ids = result.scalars().all()
+        for order_id in order_ids:
+            invalidate_after_commit(session, self.order_cache, order_id)
+            bump_after_commit(session, order_versions, order_id)
+        if order_ids:
+            await session.execute(delete(Order).where(Order.id.in_(order_ids)))
+        return len(order_ids)
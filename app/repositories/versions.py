@@ -0,0 +1,137 @@
+import uuid
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.after_commit import defer, deferred, on_commit
+
+# Сколько версий отдельных строк помнить на одну таблицу
+MAX_TRACKED_ROWS = 100_000
+
+# Идентификатор запуска процесса: после рестарта счётчики начинаются заново,
+# и старые ETag не должны совпасть с новыми
+BOOT_ID = uuid.uuid4().hex[:12]
+
+# Ключ в session.info со списком версий, которые нужно поднять после commit
+_PENDING_KEY = "version_pending_bumps"
+
+# Ключ для bump_after_commit: сменить версии всех строк таблицы
+ALL_ROWS = object()
+
+
+class VersionTracker:
+    """Счётчики изменений таблицы и её строк в памяти процесса для ETag.
+
+    Версия таблицы растёт при каждой записи. Версия строки - значение счётчика
+    таблицы при её последней записи; для строк, которых нет в ограниченном
+    журнале, берётся нижняя граница, которая поднимается при вытеснении.
+    Поэтому версия строки меняется при каждой её записи, а лишняя смена
+    (после вытеснения) приводит лишь к повторной загрузке, но не к устаревшему 304.
+    """
+
+    def __init__(self, name: str, max_rows: int = MAX_TRACKED_ROWS):
+        self.name = name
+        self.max_rows = max_rows
+        self.table_version = 0
+        self._rows: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._floor = 0
+
+    def bump(self, key: Optional[Hashable] = None) -> int:
+        """Отметить запись в таблицу и, если передан ключ, в конкретную строку; возвращает новую версию"""
+        self.table_version += 1
+        if key is None:
+            return self.table_version
+        self._rows[key] = self.table_version
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.max_rows:
+            _, evicted = self._rows.popitem(last=False)
+            self._floor = max(self._floor, evicted)
+        return self.table_version
+
+    def bump_all(self) -> int:
+        """Сменить версии всех строк сразу - для каскадных изменений с неизвестными ключами"""
+        self.table_version += 1
+        self._rows.clear()
+        self._floor = self.table_version
+        return self.table_version
+
+    def row_version(self, key: Hashable) -> int:
+        return self._rows.get(key, self._floor)
+
+    def row_etag(self, key: Hashable) -> str:
+        """Сильный ETag строки"""
+        return self.etag_at(key, self.row_version(key))
+
+    def etag_at(self, key: Hashable, version: int) -> str:
+        """ETag строки в версии version"""
+        return f'"{BOOT_ID}-{self.name}-{key}-{version}"'
+
+    def table_etag(self) -> str:
+        """Сильный ETag коллекции (URL с параметрами различает сами выборки)"""
+        return f'"{BOOT_ID}-{self.name}-t{self.table_version}"'
+
+
+product_versions = VersionTracker("products")
+user_versions = VersionTracker("users")
+order_versions = VersionTracker("orders")
+
+
+class PendingBump:
+    """Подъём версии, отложенный до commit; после него version - версия, полученная этой записью"""
+
+    def __init__(self, versions: VersionTracker, key: Optional[Hashable]):
+        self.versions = versions
+        self.key = key
+        self.version: Optional[int] = None
+
+
+def bump_after_commit(session: AsyncSession, versions: VersionTracker, key: Optional[Hashable] = None) -> PendingBump:
+    """Поднять версию таблицы (и строки) после commit внешней транзакции (не RELEASE SAVEPOINT)"""
+    bump = PendingBump(versions, key)
+    defer(session, _PENDING_KEY, bump)
+    return bump
+
+
+def _apply_bump(bump: PendingBump) -> None:
+    if bump.key is ALL_ROWS:
+        bump.version = bump.versions.bump_all()
+    else:
+        bump.version = bump.versions.bump(bump.key)
+
+
+def pending_bump(session: AsyncSession, versions: VersionTracker, key: Hashable) -> Optional[PendingBump]:
+    """Последний ещё не зафиксированный подъём версии строки key в транзакции сессии"""
+    for bump in reversed(deferred(session, _PENDING_KEY)):
+        if bump.versions is versions and (bump.key is ALL_ROWS or (bump.key is not None and bump.key == key)):
+            return bump
+    return None
+
+
+def row_etag_for_write(session: AsyncSession, versions: VersionTracker, key: Hashable) -> Optional[str]:
+    """ETag строки для проверки If-Match внутри работы задачи записи.
+
+    Работы выполняются задачей записи по очереди, но версии, поднятые
+    предыдущими работами той же пачки, появятся только после общего commit.
+    Если строка уже изменена в этой транзакции, совпадающего тега нет - None.
+    """
+    if pending_bump(session, versions, key) is not None:
+        return None
+    return versions.row_etag(key)
+
+
+def written_etag(session: AsyncSession, versions: VersionTracker, key: Hashable) -> Callable[[], str]:
+    """ETag строки, полученный записью этой транзакции; вызывать после commit.
+
+    Это версия от самой записи, а не текущий общий счётчик: запись, успевшая
+    после неё, не подменит тег в ответе.
+    """
+    bump = pending_bump(session, versions, key)
+    if bump is None:
+        # Запись ничего не изменила: тег - тот, что был внутри работы
+        etag = versions.row_etag(key)
+        return lambda: etag
+    return lambda: versions.etag_at(key, bump.version)
+
+
+on_commit(_PENDING_KEY, _apply_bump)
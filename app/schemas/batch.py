@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from typing import List
+import uuid
+
+# Сколько id принимает один пакетный запрос (GET ?ids= и POST /lookup);
+# с запасом меньше лимита SQLite на число параметров запроса
+MAX_BATCH_IDS = 500
+
+
+class BatchIds(BaseModel):
+    ids: List[uuid.UUID] = Field(min_length=1, max_length=MAX_BATCH_IDS)
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict
+
+from app.jobs import JOB_MAX_ATTEMPTS
+
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+    max_attempts: int = Field(default=JOB_MAX_ATTEMPTS, ge=1, le=20)
@@ -12,6 +12,9 @@ class OrderItemBase(BaseModel):
 class OrderItemResponse(OrderItemBase):
     price_at_order: float
 
+    class Config:
+        from_attributes = True
+
 
 class OrderBase(BaseModel):
     user_id: uuid.UUID
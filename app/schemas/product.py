@@ -1,7 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
 import uuid
-from datetime import datetime
 
 
 class ProductBase(BaseModel):
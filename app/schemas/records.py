@@ -0,0 +1,118 @@
+"""Быстрые схемы ответов для строк, прочитанных из нашей же БД.
+
+Pydantic-схемы *Response при model_validate заново проверяют каждое поле
+каждой строки (для пользователей - ещё и EmailStr), хотя данные уже прошли
+проверку при записи. Структуры msgspec ниже повторяют их поля и порядок,
+заполняются из атрибутов ORM-объектов одним вызовом msgspec.convert
+и кодируются Litestar в JSON без промежуточных словарей.
+
+Тела запросов по-прежнему принимаются pydantic-схемами: это недоверенный
+ввод, и проверки вроде EmailStr там нужны.
+"""
+import uuid
+from datetime import date, datetime
+from typing import Any, Iterable, List, Optional, Type, TypeVar
+
+import msgspec
+
+T = TypeVar("T")
+
+
+class UserRecord(msgspec.Struct):
+    username: str
+    email: str
+    id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
+
+
+class ProductRecord(msgspec.Struct):
+    name: str
+    price: float
+    description: Optional[str]
+    stock_quantity: int
+    id: uuid.UUID
+
+
+class OrderItemRecord(msgspec.Struct):
+    product_id: uuid.UUID
+    quantity: int
+    price_at_order: float
+
+
+class OrderRecord(msgspec.Struct):
+    user_id: uuid.UUID
+    address_id: Optional[uuid.UUID]
+    items: List[OrderItemRecord]
+    total_price: float
+    status: str
+    id: uuid.UUID
+    order_date: datetime
+
+
+# Ответы пакетного чтения по списку id: items - в порядке запроса, null на месте
+# ненайденного id; missing - ненайденные id
+class UserBatchRecord(msgspec.Struct):
+    items: List[Optional[UserRecord]]
+    missing: List[uuid.UUID]
+
+
+class ProductBatchRecord(msgspec.Struct):
+    items: List[Optional[ProductRecord]]
+    missing: List[uuid.UUID]
+
+
+class OrderBatchRecord(msgspec.Struct):
+    items: List[Optional[OrderRecord]]
+    missing: List[uuid.UUID]
+
+
+class DailyRevenueRecord(msgspec.Struct):
+    day: date
+    order_count: int
+    revenue: float
+
+
+class StatusRevenueRecord(msgspec.Struct):
+    status: str
+    order_count: int
+    revenue: float
+
+
+class ProductSalesRecord(msgspec.Struct):
+    product_id: uuid.UUID
+    name: str
+    order_count: int
+    quantity: int
+    revenue: float
+
+
+class ProductDailySalesRecord(msgspec.Struct):
+    day: date
+    order_count: int
+    quantity: int
+    revenue: float
+
+
+class JobRecord(msgspec.Struct):
+    id: uuid.UUID
+    kind: str
+    status: str
+    params: dict
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    result: Any
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+def to_record(row: Any, record_type: Type[T]) -> T:
+    """Структура ответа из ORM-объекта или строки результата"""
+    return msgspec.convert(row, record_type, from_attributes=True)
+
+
+def to_records(rows: Iterable[Any], record_type: Type[T]) -> List[T]:
+    """Список структур ответа из строк выборки - один вызов на всю страницу"""
+    return msgspec.convert(list(rows), List[record_type], from_attributes=True)
@@ -0,0 +1,79 @@
+import uuid
+from datetime import date, timedelta
+from typing import List, Optional
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.writer import GroupCommitWriter
+
+# Сколько дней пересчитывать в одной транзакции
+REBUILD_BATCH_DAYS = 30
+
+
+class AnalyticsService:
+    """Отчёты по агрегатам продаж."""
+
+    def __init__(self, analytics_repository: AnalyticsRepository):
+        self.analytics_repository = analytics_repository
+
+    async def revenue_by_day(
+        self,
+        session: AsyncSession,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        status: Optional[str] = None,
+    ) -> List[Row]:
+        """Заказы и выручка по дням за период."""
+        return await self.analytics_repository.revenue_by_day(session, date_from, date_to, status)
+
+    async def revenue_by_status(
+        self,
+        session: AsyncSession,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Row]:
+        """Заказы и выручка по статусам за период."""
+        return await self.analytics_repository.revenue_by_status(session, date_from, date_to)
+
+    async def top_products(
+        self,
+        session: AsyncSession,
+        limit: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Row]:
+        """Самые продаваемые по выручке продукты за период."""
+        return await self.analytics_repository.top_products(session, limit, date_from, date_to)
+
+    async def product_by_day(
+        self,
+        session: AsyncSession,
+        product_id: uuid.UUID,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Row]:
+        """Продажи продукта по дням за период."""
+        return await self.analytics_repository.product_by_day(session, product_id, date_from, date_to)
+
+    async def rebuild(self, writer: GroupCommitWriter, batch_days: int = REBUILD_BATCH_DAYS) -> int:
+        """Пересчитать все агрегаты из заказов, по batch_days дней в транзакции.
+
+        Каждая пачка - отдельная работа задачи записи, поэтому пересчёт не
+        держит блокировку записи на всё время и чередуется с обычными запросами.
+        Возвращает число пересчитанных пачек.
+        """
+        first, last = await writer.submit(self.analytics_repository.day_bounds)
+        if first is None:
+            return 0
+
+        batches = 0
+        day_from = first
+        while day_from <= last:
+            day_to = min(day_from + timedelta(days=batch_days - 1), last)
+            await writer.submit(
+                lambda session, day_from=day_from, day_to=day_to: self.analytics_repository.rebuild_days(session, day_from, day_to)
+            )
+            batches += 1
+            day_from = day_to + timedelta(days=1)
+        return batches
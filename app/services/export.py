@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Callable, Type
+
+import msgspec
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.records import to_records
+
+# Поддерживаемые форматы выгрузки и их media type
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _csv_line(values: list) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode()
+
+
+async def encode_rows(
+    session_factory: Callable[[], AsyncSession],
+    stream_rows: Callable[..., AsyncIterator[list]],
+    record_type: Type[msgspec.Struct],
+    export_format: str,
+    **filters,
+) -> AsyncIterator[bytes]:
+    """Потоково закодировать строки выборки в NDJSON или CSV.
+
+    Сессия открывается внутри генератора: тело ответа отдаётся уже после
+    того, как сессия из зависимостей обработчика закрыта. Каждая пачка
+    строк кодируется по мере получения и сразу отправляется клиенту.
+    """
+    columns = list(record_type.__struct_fields__)
+    encoder = msgspec.json.Encoder()
+    async with session_factory() as session:
+        if export_format == "csv":
+            yield _csv_line(columns)
+
+        async for batch in stream_rows(session, **filters):
+            chunk = []
+            for item in to_records(batch, record_type):
+                if export_format == "csv":
+                    values = msgspec.to_builtins(item)
+                    chunk.append(_csv_line([
+                        json.dumps(values[column]) if isinstance(values[column], (list, dict)) else values[column]
+                        for column in columns
+                    ]))
+                else:
+                    chunk.append(encoder.encode(item) + b"\n")
+            yield b"".join(chunk)
+
+
+async def write_export(chunks: AsyncIterator[bytes], path: str) -> int:
+    """Записать выгрузку в файл для фоновой задачи; возвращает размер в байтах.
+
+    Пишется во временный файл рядом и переименовывается в конце, поэтому
+    прерванная попытка не оставляет по пути path обрезанную выгрузку.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = f"{path}.partial"
+    size = 0
+    try:
+        with open(partial, "wb") as file:
+            async for chunk in chunks:
+                file.write(chunk)
+                size += len(chunk)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return size
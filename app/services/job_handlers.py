@@ -0,0 +1,63 @@
+"""Обработчики фоновых задач: тяжёлые операции сервисов, вынесенные из запросов.
+
+Вид задачи                       Параметры                      Результат
+users.delete / products.delete   user_id / product_id           сколько снято заказов / позиций
+users.export / products.export   format, filters                файл выгрузки, media type, размер
+orders.export
+rollups.rebuild                  batch_days                     число пересчитанных пачек
+"""
+import os
+import uuid
+from typing import Any, Dict
+
+from app.jobs import JobRunner
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.services.analytics_service import REBUILD_BATCH_DAYS, AnalyticsService
+from app.services.export import EXPORT_MEDIA_TYPES
+from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
+
+# Каталог файлов выгрузок, сделанных фоновыми задачами; файл называется по id задачи
+EXPORT_DIR = os.environ.get("APP_EXPORT_DIR", "./exports")
+
+
+def register_jobs(jobs: JobRunner, export_dir: str = EXPORT_DIR) -> None:
+    """Зарегистрировать обработчики задач; записи идут через задачу записи исполнителя"""
+    writer, session_factory = jobs.writer, jobs.session_factory
+    user_service = UserService(UserRepository())
+    product_service = ProductService(ProductRepository())
+    order_service = OrderService(OrderRepository(), UserRepository(), ProductRepository())
+    analytics_service = AnalyticsService(AnalyticsRepository())
+
+    async def delete_user(job_id: uuid.UUID, params: Dict[str, Any]) -> dict:
+        return await user_service.delete_in_batches(writer, uuid.UUID(params["user_id"]))
+
+    async def delete_product(job_id: uuid.UUID, params: Dict[str, Any]) -> dict:
+        return await product_service.delete_in_batches(writer, uuid.UUID(params["product_id"]))
+
+    def export(service) -> Any:
+        async def handler(job_id: uuid.UUID, params: Dict[str, Any]) -> dict:
+            export_format = params.get("format", "ndjson")
+            if export_format not in EXPORT_MEDIA_TYPES:
+                raise ValueError(f"Unsupported export format: {export_format}")
+            path = os.path.join(export_dir, f"{job_id}.{export_format}")
+            size = await service.export_to_file(session_factory, path, export_format, **params.get("filters", {}))
+            return {"file": path, "media_type": EXPORT_MEDIA_TYPES[export_format], "bytes": size}
+        return handler
+
+    async def rebuild_rollups(job_id: uuid.UUID, params: Dict[str, Any]) -> dict:
+        batch_days = int(params.get("batch_days", REBUILD_BATCH_DAYS))
+        if batch_days < 1:
+            raise ValueError("batch_days must be positive")
+        return {"batches": await analytics_service.rebuild(writer, batch_days)}
+
+    jobs.register("users.delete", delete_user)
+    jobs.register("products.delete", delete_product)
+    jobs.register("users.export", export(user_service))
+    jobs.register("products.export", export(product_service))
+    jobs.register("orders.export", export(order_service))
+    jobs.register("rollups.rebuild", rebuild_rollups)
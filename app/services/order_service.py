@@ -1,21 +1,28 @@
 import uuid
-from typing import List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.order_repository import OrderRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.user_repository import UserRepository
 from app.schemas.order import OrderCreate, OrderUpdate
-from src.models import Order
+from app.schemas.records import OrderRecord, to_record, to_records
+from app.jobs import JobRunner
+from app.services.export import encode_rows, write_export
+from app.repositories.versions import row_etag_for_write, written_etag
+from app.services.single_flight import SingleFlight, order_reads
+from src.models import Job, Order
 
 
 class OrderService:
     """Бизнес-логика управления заказами."""
 
-    def __init__(self, order_repository: OrderRepository, user_repository: UserRepository, product_repository: ProductRepository):
+    def __init__(self, order_repository: OrderRepository, user_repository: UserRepository, product_repository: ProductRepository, reads: Optional[SingleFlight] = None):
         self.order_repository = order_repository
         self.user_repository = user_repository
         self.product_repository = product_repository
+        # Одновременные одинаковые чтения для ответов API - одним запросом, см. app/services/single_flight.py
+        self.reads = reads if reads is not None else order_reads
 
     async def get_by_id(
         self,
@@ -30,36 +37,136 @@ class OrderService:
         session: AsyncSession,
         count: int,
         page: int,
+        after: Optional[str] = None,
         **kwargs,
     ) -> List[Order]:
         """Получить заказы по фильтрам с пагинацией."""
-        return await self.order_repository.get_by_filter(session, count, page, **kwargs)
+        return await self.order_repository.get_by_filter(session, count, page, after, **kwargs)
+
+    async def count_by_filter(self, session: AsyncSession, **kwargs) -> Tuple[int, bool]:
+        """Число заказов по фильтрам и признак его точности (для include_total)."""
+        return await self.order_repository.count_by_filter(session, **kwargs)
+
+    def next_cursor(self, items: List[Order], count: int) -> Optional[str]:
+        """Курсор для продолжения выборки после последнего элемента страницы."""
+        return self.order_repository.next_cursor(items, count)
+
+    async def get_record(self, session: AsyncSession, order_id: uuid.UUID) -> Optional[OrderRecord]:
+        """Получить заказ по UUID структурой ответа; одновременные запросы одного id разделяют одно чтение."""
+        key = ("id", order_id, self.order_repository.versions.row_version(order_id))
+        return await self.reads.do(key, lambda: self._load_record(session, order_id))
+
+    async def _load_record(self, session: AsyncSession, order_id: uuid.UUID) -> Optional[OrderRecord]:
+        order = await self.get_by_id(session, order_id)
+        return to_record(order, OrderRecord) if order else None
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        count: int,
+        page: int,
+        after: Optional[str] = None,
+        **kwargs,
+    ) -> Tuple[List[OrderRecord], Optional[str]]:
+        """Страница заказов структурами ответа и курсор следующей; одинаковые одновременные запросы разделяют одно чтение."""
+        key = ("page", count, page, after, tuple(sorted(kwargs.items())), self.order_repository.versions.table_version)
+        return await self.reads.do(key, lambda: self._load_page(session, count, page, after, **kwargs))
+
+    async def _load_page(
+        self, session: AsyncSession, count: int, page: int, after: Optional[str], **kwargs
+    ) -> Tuple[List[OrderRecord], Optional[str]]:
+        items = await self.get_by_filter(session, count, page, after, **kwargs)
+        return to_records(items, OrderRecord), self.next_cursor(items, count)
+
+    async def get_records_by_ids(self, session: AsyncSession, order_ids: List[uuid.UUID]) -> List[Optional[OrderRecord]]:
+        """Получить заказы по списку UUID одним запросом; результат в порядке запроса, None - не найден."""
+        # Повторы id - один раз в запросе, но на каждой своей позиции в ответе
+        rows = await self.order_repository.get_by_ids(session, list(dict.fromkeys(order_ids)))
+        records = {record.id: record for record in to_records(rows, OrderRecord)}
+        return [records.get(order_id) for order_id in order_ids]
+
+    def etag(self, order_id: uuid.UUID) -> str:
+        """ETag заказа по счётчику версий, без обращения к БД."""
+        return self.order_repository.versions.row_etag(order_id)
+
+    def etag_for_write(self, session: AsyncSession, order_id: uuid.UUID) -> Optional[str]:
+        """ETag заказа для If-Match внутри работы задачи записи, с учётом незафиксированных записей пачки."""
+        return row_etag_for_write(session, self.order_repository.versions, order_id)
+
+    def written_etag(self, session: AsyncSession, order_id: uuid.UUID) -> Callable[[], str]:
+        """ETag заказа, полученный записью этой сессии; вызывать после commit."""
+        return written_etag(session, self.order_repository.versions, order_id)
+
+    def collection_etag(self) -> str:
+        """ETag списка заказов по счётчику версий таблицы, без обращения к БД."""
+        return self.order_repository.versions.table_etag()
+
+    def export(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        export_format: str,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """Потоково выгрузить заказы по фильтрам в NDJSON или CSV."""
+        return encode_rows(
+            session_factory, self.order_repository.stream_by_filter, OrderRecord, export_format, **kwargs
+        )
+
+    async def export_to_file(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        path: str,
+        export_format: str,
+        **kwargs,
+    ) -> int:
+        """Выгрузить заказы по фильтрам в файл; возвращает его размер."""
+        return await write_export(self.export(session_factory, export_format, **kwargs), path)
+
+    async def schedule_export(self, jobs: JobRunner, export_format: str, **kwargs) -> Job:
+        """Поставить выгрузку в файл в очередь фоновых задач."""
+        # Параметры задачи хранятся в JSON: UUID фильтра - строкой
+        filters = {key: str(value) if isinstance(value, uuid.UUID) else value for key, value in kwargs.items()}
+        return await jobs.enqueue("orders.export", {"format": export_format, "filters": filters})
 
     async def create_order(
         self,
         session: AsyncSession,
         order_data: OrderCreate,
     ) -> Order:
-        """Создать новый заказ."""
+        """Создать новый заказ.
+
+        Пользователь и все продукты заказа читаются двумя запросами независимо
+        от числа позиций; повторяющиеся позиции одного продукта объединяются.
+        """
         # Проверяем, что пользователь существует
         user = await self.user_repository.get_by_id(session, order_data.user_id)
         if not user:
             raise ValueError(f"User with id {order_data.user_id} not found")
         
-        # Проверяем, что все продукты существуют и доступны в нужном количестве
+        quantities: Dict[uuid.UUID, int] = {}
         for item in order_data.items:
-            product = await self.product_repository.get_by_id(session, item.product_id)
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        
+        # Проверяем, что все продукты существуют и доступны в нужном количестве
+        products = {
+            product.id: product
+            for product in await self.product_repository.get_by_ids(session, list(quantities))
+        }
+        items = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
             if not product:
-                raise ValueError(f"Product with id {item.product_id} not found")
-            if product.stock_quantity < item.quantity:
-                raise ValueError(f"Insufficient stock for product {item.product_id}. Available: {product.stock_quantity}, Requested: {item.quantity}")
+                raise ValueError(f"Product with id {product_id} not found")
+            if product.stock_quantity < quantity:
+                raise ValueError(f"Insufficient stock for product {product_id}. Available: {product.stock_quantity}, Requested: {quantity}")
+            items.append({"product_id": product_id, "quantity": quantity, "price_at_order": product.price})
         
         # Создаем заказ
         order = await self.order_repository.create(
             session,
             user_id=order_data.user_id,
             address_id=order_data.address_id,
-            items=[{"product_id": item.product_id, "quantity": item.quantity} for item in order_data.items],
+            items=items,
             total_price=order_data.total_price,
             status=order_data.status
         )
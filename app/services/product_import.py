@@ -0,0 +1,135 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.product import ProductCreate
+
+# Поддерживаемые форматы потока импорта
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Предел длины CSV-записи в символах: непарная кавычка иначе склеила бы остаток файла в одну запись
+MAX_CSV_RECORD_SIZE = 1_000_000
+
+# Предел длины физической строки потока в символах (NDJSON-запись - одна строка)
+MAX_LINE_SIZE = 1_000_000
+
+
+class LineTooLongError(ValueError):
+    """Строка потока длиннее предела: тело отклоняется, а не копится в памяти"""
+
+    def __init__(self, line_no: int, max_line_size: int):
+        super().__init__(f"Line {line_no} exceeds {max_line_size} characters")
+        self.line_no = line_no
+        # Отчёт о пачках, записанных до этой строки (заполняет импорт)
+        self.report: Optional[dict] = None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_size: int = MAX_LINE_SIZE) -> AsyncIterator[str]:
+    """Разрезать поток байтов на строки, не накапливая тело запроса целиком.
+
+    Перевод строки ищется только в новых данных, а незаконченная строка
+    хранится частями, поэтому разбор линейный. Строка длиннее max_line_size
+    символов (или тело без переводов строки) - LineTooLongError.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parts: List[str] = []
+    pending_size = 0
+    line_no = 0
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        start = 0
+        end = text.find("\n")
+        while end >= 0:
+            line_no += 1
+            if pending_size + end - start > max_line_size:
+                raise LineTooLongError(line_no, max_line_size)
+            parts.append(text[start:end])
+            yield "".join(parts).rstrip("\r")
+            parts, pending_size = [], 0
+            start = end + 1
+            end = text.find("\n", start)
+        if start < len(text):
+            parts.append(text[start:])
+            pending_size += len(text) - start
+            if pending_size > max_line_size:
+                raise LineTooLongError(line_no + 1, max_line_size)
+    parts.append(decoder.decode(b"", final=True))
+    tail = "".join(parts)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+async def iter_records(
+    lines: AsyncIterator[str], import_format: str, max_record_size: int = MAX_CSV_RECORD_SIZE
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Разобрать строки в записи (номер строки, запись, ошибка разбора).
+
+    Для CSV первая запись - заголовок; поля в кавычках с переводами строк
+    собираются из нескольких физических строк. Запись длиннее max_record_size
+    символов отбрасывается с ошибкой, и разбор продолжается со следующей строки.
+    """
+    if import_format == "ndjson":
+        line_no = 0
+        async for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_no, None, f"Invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "Expected a JSON object"
+                continue
+            yield line_no, record, None
+        return
+
+    header = None
+    pending = []
+    pending_size = 0
+    # Чётность числа кавычек в pending: считается по каждой строке один раз
+    open_quote = False
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        pending.append(line)
+        pending_size += len(line) + 1
+        if line.count('"') % 2:
+            open_quote = not open_quote
+        if open_quote:
+            # Нечётное число кавычек - запись продолжается на следующей строке
+            if pending_size > max_record_size:
+                yield line_no - len(pending) + 1, None, f"Record exceeds {max_record_size} characters (unbalanced quote?)"
+                pending, pending_size, open_quote = [], 0, False
+            continue
+        record_line = line_no - len(pending) + 1
+        text = "\n".join(pending)
+        pending, pending_size = [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Пустые ячейки считаем отсутствующими, чтобы сработали значения по умолчанию
+        yield record_line, {key: value for key, value in zip(header, values) if value != ""}, None
+    if pending:
+        yield line_no - len(pending) + 1, None, "Unterminated quoted field"
+
+
+def validate_record(record: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """Проверить запись схемой ProductCreate и вернуть строку для upsert"""
+    try:
+        product = ProductCreate.model_validate(record)
+    except ValidationError as exc:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+        )
+    return product.model_dump(), None
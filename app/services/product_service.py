@@ -1,17 +1,33 @@
 import uuid
-from typing import List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.product_repository import ProductRepository
+from app.services.product_import import LineTooLongError, iter_lines, iter_records, validate_record
 from app.schemas.product import ProductCreate, ProductUpdate
-from src.models import Product
+from app.schemas.records import ProductRecord, to_record, to_records
+from app.jobs import JobRunner
+from app.services.export import encode_rows, write_export
+from app.repositories.versions import row_etag_for_write, written_etag
+from app.services.single_flight import SingleFlight, product_reads
+from app.writer import GroupCommitWriter
+from src.models import Job, Product
+
+# Сколько построчных ошибок возвращать в отчёте импорта (счётчик errors учитывает все)
+MAX_REPORTED_ERRORS = 100
+
+# Сколько позиций заказов с удаляемым продуктом снимать в одной транзакции фоновой задачи
+DELETE_BATCH_SIZE = 500
 
 
 class ProductService:
     """Бизнес-логика управления продуктами."""
 
-    def __init__(self, product_repository: ProductRepository):
+    def __init__(self, product_repository: ProductRepository, reads: Optional[SingleFlight] = None):
         self.product_repository = product_repository
+        # Одновременные одинаковые чтения для ответов API - одним запросом, см. app/services/single_flight.py
+        self.reads = reads if reads is not None else product_reads
 
     async def get_by_id(
         self,
@@ -26,10 +42,94 @@ class ProductService:
         session: AsyncSession,
         count: int,
         page: int,
+        after: Optional[str] = None,
         **kwargs,
     ) -> List[Product]:
         """Получить продукты по фильтрам с пагинацией."""
-        return await self.product_repository.get_by_filter(session, count, page, **kwargs)
+        return await self.product_repository.get_by_filter(session, count, page, after, **kwargs)
+
+    async def count_by_filter(self, session: AsyncSession, **kwargs) -> Tuple[int, bool]:
+        """Число продуктов по фильтрам и признак его точности (для include_total)."""
+        return await self.product_repository.count_by_filter(session, **kwargs)
+
+    def next_cursor(self, items: List[Product], count: int) -> Optional[str]:
+        """Курсор для продолжения выборки после последнего элемента страницы."""
+        return self.product_repository.next_cursor(items, count)
+
+    async def get_record(self, session: AsyncSession, product_id: uuid.UUID) -> Optional[ProductRecord]:
+        """Получить продукт по UUID структурой ответа; одновременные запросы одного id разделяют одно чтение."""
+        key = ("id", product_id, self.product_repository.versions.row_version(product_id))
+        return await self.reads.do(key, lambda: self._load_record(session, product_id))
+
+    async def _load_record(self, session: AsyncSession, product_id: uuid.UUID) -> Optional[ProductRecord]:
+        product = await self.get_by_id(session, product_id)
+        return to_record(product, ProductRecord) if product else None
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        count: int,
+        page: int,
+        after: Optional[str] = None,
+        **kwargs,
+    ) -> Tuple[List[ProductRecord], Optional[str]]:
+        """Страница продуктов структурами ответа и курсор следующей; одинаковые одновременные запросы разделяют одно чтение."""
+        key = ("page", count, page, after, tuple(sorted(kwargs.items())), self.product_repository.versions.table_version)
+        return await self.reads.do(key, lambda: self._load_page(session, count, page, after, **kwargs))
+
+    async def _load_page(
+        self, session: AsyncSession, count: int, page: int, after: Optional[str], **kwargs
+    ) -> Tuple[List[ProductRecord], Optional[str]]:
+        items = await self.get_by_filter(session, count, page, after, **kwargs)
+        return to_records(items, ProductRecord), self.next_cursor(items, count)
+
+    async def get_records_by_ids(self, session: AsyncSession, product_ids: List[uuid.UUID]) -> List[Optional[ProductRecord]]:
+        """Получить продукты по списку UUID одним запросом; результат в порядке запроса, None - не найден."""
+        # Повторы id - один раз в запросе, но на каждой своей позиции в ответе
+        rows = await self.product_repository.get_by_ids(session, list(dict.fromkeys(product_ids)))
+        records = {record.id: record for record in to_records(rows, ProductRecord)}
+        return [records.get(product_id) for product_id in product_ids]
+
+    def etag(self, product_id: uuid.UUID) -> str:
+        """ETag продукта по счётчику версий, без обращения к БД."""
+        return self.product_repository.versions.row_etag(product_id)
+
+    def etag_for_write(self, session: AsyncSession, product_id: uuid.UUID) -> Optional[str]:
+        """ETag продукта для If-Match внутри работы задачи записи, с учётом незафиксированных записей пачки."""
+        return row_etag_for_write(session, self.product_repository.versions, product_id)
+
+    def written_etag(self, session: AsyncSession, product_id: uuid.UUID) -> Callable[[], str]:
+        """ETag продукта, полученный записью этой сессии; вызывать после commit."""
+        return written_etag(session, self.product_repository.versions, product_id)
+
+    def collection_etag(self) -> str:
+        """ETag списка продуктов по счётчику версий таблицы, без обращения к БД."""
+        return self.product_repository.versions.table_etag()
+
+    def export(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        export_format: str,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """Потоково выгрузить продукты по фильтрам в NDJSON или CSV."""
+        return encode_rows(
+            session_factory, self.product_repository.stream_by_filter, ProductRecord, export_format, **kwargs
+        )
+
+    async def export_to_file(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        path: str,
+        export_format: str,
+        **kwargs,
+    ) -> int:
+        """Выгрузить продукты по фильтрам в файл; возвращает его размер."""
+        return await write_export(self.export(session_factory, export_format, **kwargs), path)
+
+    async def schedule_export(self, jobs: JobRunner, export_format: str, **kwargs) -> Job:
+        """Поставить выгрузку в файл в очередь фоновых задач."""
+        return await jobs.enqueue("products.export", {"format": export_format, "filters": kwargs})
 
     async def create(
         self,
@@ -45,6 +145,67 @@ class ProductService:
             stock_quantity=product_data.stock_quantity
         )
 
+    async def import_products(
+        self,
+        writer: GroupCommitWriter,
+        chunks: AsyncIterator[bytes],
+        import_format: str,
+        chunk_size: int = 1000,
+    ) -> dict:
+        """Потоково импортировать продукты из NDJSON или CSV с upsert по имени.
+
+        Поток разбирается построчно и пишется пачками по chunk_size строк;
+        каждая пачка - отдельная работа задачи записи, поэтому память,
+        размер транзакции и размер отчёта (итоги и первые MAX_REPORTED_ERRORS
+        ошибок) не зависят от размера файла. Строка длиннее предела прерывает
+        импорт с LineTooLongError; пачки до неё остаются записанными, и отчёт
+        о них передаётся в исключении.
+        """
+        report = {"inserted": 0, "updated": 0, "errors": 0, "chunks": 0, "error_details": []}
+        rows: Dict[str, dict] = {}
+        errors: List[dict] = []
+
+        async def flush_chunk() -> None:
+            report["chunks"] += 1
+            batch = list(rows.values())
+            try:
+                inserted, updated = await writer.submit(
+                    lambda session: self.product_repository.upsert_many(session, batch)
+                )
+            except SQLAlchemyError as exc:
+                inserted = updated = 0
+                errors.append({"line": None, "error": f"Chunk rejected: {exc.__class__.__name__}"})
+            report["inserted"] += inserted
+            report["updated"] += updated
+            report["errors"] += len(errors)
+            room = MAX_REPORTED_ERRORS - len(report["error_details"])
+            report["error_details"].extend({"chunk": report["chunks"], **error} for error in errors[:room])
+            rows.clear()
+            errors.clear()
+
+        try:
+            async for line_no, record, error in iter_records(iter_lines(chunks), import_format):
+                if record is not None:
+                    row, error = validate_record(record)
+                if error:
+                    errors.append({"line": line_no, "error": error})
+                else:
+                    # Повтор имени внутри пачки: побеждает последняя строка, как и при upsert
+                    rows.pop(row["name"], None)
+                    rows[row["name"]] = row
+                if len(rows) + len(errors) >= chunk_size:
+                    await flush_chunk()
+        except LineTooLongError as exc:
+            # Строки до слишком длинной записываются, как и при обычном завершении потока
+            if rows or errors:
+                await flush_chunk()
+            exc.report = report
+            raise
+
+        if rows or errors:
+            await flush_chunk()
+        return report
+
     async def update(
         self,
         session: AsyncSession,
@@ -74,4 +235,27 @@ class ProductService:
         product_id: uuid.UUID,
     ) -> bool:
         """Удалить продукт по его UUID."""
-        return await self.product_repository.delete(session, product_id)
\ No newline at end of file
+        return await self.product_repository.delete(session, product_id)
+
+    async def delete_in_batches(
+        self,
+        writer: GroupCommitWriter,
+        product_id: uuid.UUID,
+        batch_size: int = DELETE_BATCH_SIZE,
+    ) -> dict:
+        """Удалить продукт, сначала снимая позиции заказов с ним пачками по batch_size."""
+        items_deleted = 0
+        while True:
+            deleted = await writer.submit(
+                lambda session: self.product_repository.delete_items_batch(session, product_id, batch_size)
+            )
+            items_deleted += deleted
+            if deleted < batch_size:
+                break
+        if not await writer.submit(lambda session: self.product_repository.delete(session, product_id)):
+            raise ValueError(f"Product with id {product_id} not found")
+        return {"order_items_deleted": items_deleted}
+
+    async def schedule_delete(self, jobs: JobRunner, product_id: uuid.UUID) -> Job:
+        """Поставить удаление продукта с позициями заказов в очередь фоновых задач."""
+        return await jobs.enqueue("products.delete", {"product_id": str(product_id)})
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.metrics import SINGLE_FLIGHT_CALLS
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых чтений в одно.
+
+    Первый вызов с ключом (ведущий) выполняет load в своей сессии, остальные
+    вызовы с тем же ключом, пришедшие до его завершения, ждут тот же
+    результат вместо своего запроса к БД. Результат не хранится: следующий
+    вызов после завершения снова идёт в БД (для этого есть кэши репозиториев).
+
+    Результат общий для всех ожидающих, поэтому load должен возвращать
+    неизменяемые структуры ответа, а не ORM-объекты сессии ведущего. Ключ
+    включает версию строки или таблицы: чтение, начатое до записи, не
+    достанется запросу, который уже видит её новый ETag.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнить load или дождаться уже идущего чтения с тем же ключом"""
+        future = self._inflight.get(key)
+        if future is None:
+            self.leaders += 1
+            SINGLE_FLIGHT_CALLS.inc(name=self.name, role="leader")
+            future = self._inflight[key] = asyncio.ensure_future(load())
+            future.add_done_callback(lambda done: self._forget(key, done))
+            # Отмена ведущего (клиент ушёл) отменяет и чтение в его сессии
+            return await future
+
+        self.followers += 1
+        SINGLE_FLIGHT_CALLS.inc(name=self.name, role="follower")
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+        # Ведущего отменили, а этот вызов - нет: читаем сами
+        return await self.do(key, load)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики объединения: доля вызовов, обслуженных чужим запросом"""
+        calls = self.leaders + self.followers
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalesced_ratio": self.followers / calls if calls else 0.0,
+        }
+
+
+# Общие на процесс, как и кэши: сервисы создаются на каждый запрос
+product_reads = SingleFlight("products")
+user_reads = SingleFlight("users")
+order_reads = SingleFlight("orders")
+
+FLIGHTS = {
+    "products": product_reads,
+    "users": user_reads,
+    "orders": order_reads,
+}
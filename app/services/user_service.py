@@ -1,17 +1,28 @@
 import uuid
-from typing import List, Optional
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.user_repository import UserRepository
 from app.schemas.user import UserCreate, UserUpdate
-from src.models import User
+from app.schemas.records import UserRecord, to_record, to_records
+from app.jobs import JobRunner
+from app.services.export import encode_rows, write_export
+from app.repositories.versions import row_etag_for_write, written_etag
+from app.services.single_flight import SingleFlight, user_reads
+from app.writer import GroupCommitWriter
+from src.models import Job, User
+
+# Сколько заказов удаляемого пользователя снимать в одной транзакции фоновой задачи
+DELETE_BATCH_SIZE = 500
 
 
 class UserService:
     """Бизнес‑логика управления пользователями."""
 
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: UserRepository, reads: Optional[SingleFlight] = None):
         self.user_repository = user_repository
+        # Одновременные одинаковые чтения для ответов API - одним запросом, см. app/services/single_flight.py
+        self.reads = reads if reads is not None else user_reads
 
     async def get_by_id(
         self,
@@ -26,10 +37,94 @@ class UserService:
         session: AsyncSession,
         count: int,
         page: int,
+        after: Optional[str] = None,
         **kwargs,
     ) -> List[User]:
         """Получить пользователей по фильтрам с пагинацией."""
-        return await self.user_repository.get_by_filter(session, count, page, **kwargs)
+        return await self.user_repository.get_by_filter(session, count, page, after, **kwargs)
+
+    async def count_by_filter(self, session: AsyncSession, **kwargs) -> Tuple[int, bool]:
+        """Число пользователей по фильтрам и признак его точности (для include_total)."""
+        return await self.user_repository.count_by_filter(session, **kwargs)
+
+    def next_cursor(self, items: List[User], count: int) -> Optional[str]:
+        """Курсор для продолжения выборки после последнего элемента страницы."""
+        return self.user_repository.next_cursor(items, count)
+
+    async def get_record(self, session: AsyncSession, user_id: uuid.UUID) -> Optional[UserRecord]:
+        """Получить пользователя по UUID структурой ответа; одновременные запросы одного id разделяют одно чтение."""
+        key = ("id", user_id, self.user_repository.versions.row_version(user_id))
+        return await self.reads.do(key, lambda: self._load_record(session, user_id))
+
+    async def _load_record(self, session: AsyncSession, user_id: uuid.UUID) -> Optional[UserRecord]:
+        user = await self.get_by_id(session, user_id)
+        return to_record(user, UserRecord) if user else None
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        count: int,
+        page: int,
+        after: Optional[str] = None,
+        **kwargs,
+    ) -> Tuple[List[UserRecord], Optional[str]]:
+        """Страница пользователей структурами ответа и курсор следующей; одинаковые одновременные запросы разделяют одно чтение."""
+        key = ("page", count, page, after, tuple(sorted(kwargs.items())), self.user_repository.versions.table_version)
+        return await self.reads.do(key, lambda: self._load_page(session, count, page, after, **kwargs))
+
+    async def _load_page(
+        self, session: AsyncSession, count: int, page: int, after: Optional[str], **kwargs
+    ) -> Tuple[List[UserRecord], Optional[str]]:
+        items = await self.get_by_filter(session, count, page, after, **kwargs)
+        return to_records(items, UserRecord), self.next_cursor(items, count)
+
+    async def get_records_by_ids(self, session: AsyncSession, user_ids: List[uuid.UUID]) -> List[Optional[UserRecord]]:
+        """Получить пользователей по списку UUID одним запросом; результат в порядке запроса, None - не найден."""
+        # Повторы id - один раз в запросе, но на каждой своей позиции в ответе
+        rows = await self.user_repository.get_by_ids(session, list(dict.fromkeys(user_ids)))
+        records = {record.id: record for record in to_records(rows, UserRecord)}
+        return [records.get(user_id) for user_id in user_ids]
+
+    def etag(self, user_id: uuid.UUID) -> str:
+        """ETag пользователя по счётчику версий, без обращения к БД."""
+        return self.user_repository.versions.row_etag(user_id)
+
+    def etag_for_write(self, session: AsyncSession, user_id: uuid.UUID) -> Optional[str]:
+        """ETag пользователя для If-Match внутри работы задачи записи, с учётом незафиксированных записей пачки."""
+        return row_etag_for_write(session, self.user_repository.versions, user_id)
+
+    def written_etag(self, session: AsyncSession, user_id: uuid.UUID) -> Callable[[], str]:
+        """ETag пользователя, полученный записью этой сессии; вызывать после commit."""
+        return written_etag(session, self.user_repository.versions, user_id)
+
+    def collection_etag(self) -> str:
+        """ETag списка пользователей по счётчику версий таблицы, без обращения к БД."""
+        return self.user_repository.versions.table_etag()
+
+    def export(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        export_format: str,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """Потоково выгрузить пользователей по фильтрам в NDJSON или CSV."""
+        return encode_rows(
+            session_factory, self.user_repository.stream_by_filter, UserRecord, export_format, **kwargs
+        )
+
+    async def export_to_file(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        path: str,
+        export_format: str,
+        **kwargs,
+    ) -> int:
+        """Выгрузить пользователей по фильтрам в файл; возвращает его размер."""
+        return await write_export(self.export(session_factory, export_format, **kwargs), path)
+
+    async def schedule_export(self, jobs: JobRunner, export_format: str, **kwargs) -> Job:
+        """Поставить выгрузку в файл в очередь фоновых задач."""
+        return await jobs.enqueue("users.export", {"format": export_format, "filters": kwargs})
 
     async def create(
         self,
@@ -58,3 +153,31 @@ class UserService:
     ) -> bool:
         """Удалить пользователя по его UUID."""
         return await self.user_repository.delete(session, user_id)
+
+    async def delete_in_batches(
+        self,
+        writer: GroupCommitWriter,
+        user_id: uuid.UUID,
+        batch_size: int = DELETE_BATCH_SIZE,
+    ) -> dict:
+        """Удалить пользователя, сначала снимая его заказы пачками по batch_size.
+
+        Каскад одного DELETE удалил бы все заказы и пересчитал агрегаты в одной
+        транзакции, на всё это время заняв задачу записи; пачки чередуются
+        с обычными запросами.
+        """
+        orders_deleted = 0
+        while True:
+            deleted = await writer.submit(
+                lambda session: self.user_repository.delete_orders_batch(session, user_id, batch_size)
+            )
+            orders_deleted += deleted
+            if deleted < batch_size:
+                break
+        if not await writer.submit(lambda session: self.user_repository.delete(session, user_id)):
+            raise ValueError(f"User with id {user_id} not found")
+        return {"orders_deleted": orders_deleted}
+
+    async def schedule_delete(self, jobs: JobRunner, user_id: uuid.UUID) -> Job:
+        """Поставить удаление пользователя с его заказами в очередь фоновых задач."""
+        return await jobs.enqueue("users.delete", {"user_id": str(user_id)})
@@ -0,0 +1,153 @@
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+T = TypeVar("T")
+
+# Сколько запросов записи объединять в одну транзакцию и сколько ждать пополнения пачки.
+# При нулевой задержке пачку составляют запросы, накопившиеся за время предыдущего
+# commit: под нагрузкой пачки растут сами, а одиночный запрос не ждёт попутчиков.
+WRITER_MAX_BATCH = 100
+WRITER_MAX_DELAY = 0.0
+
+Work = Callable[[AsyncSession], Awaitable[T]]
+
+
+class GroupCommitWriter:
+    """Единственная задача записи с групповым commit.
+
+    Изменяющие запросы ставят работу (функцию от сессии) в очередь через
+    submit. Задача записи забирает накопившиеся работы пачкой - не больше
+    max_batch и не дольше max_delay после первой - и выполняет их в одной
+    транзакции, каждую в своей точке сохранения (SAVEPOINT). Ошибка одной
+    работы откатывает только её точку сохранения и возвращается её
+    вызывающему; остальные фиксируются общим commit, то есть одним fsync
+    на пачку вместо одного на запрос.
+
+    Работа выполняется с контекстными переменными вызывающего (например,
+    маршрутом запроса для журнала SQL), хотя и в задаче записи.
+
+    Результат работы возвращается после commit, поэтому вызывающий не увидит
+    успеха, который потом не был зафиксирован. Объекты из результата
+    отсоединены от закрытой сессии: всё, что нужно для ответа, работа должна
+    загрузить сама.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        max_batch: int = WRITER_MAX_BATCH,
+        max_delay: float = WRITER_MAX_DELAY,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.submitted = 0
+
+    def _ensure_running(self) -> asyncio.Queue:
+        # Задача запускается лениво в цикле событий вызывающего (у тестовых клиентов он свой)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def submit(self, work: Work) -> T:
+        """Выполнить работу в общей транзакции записи и вернуть её результат после commit"""
+        queue = self._ensure_running()
+        future = self._loop.create_future()
+        self.submitted += 1
+        await queue.put((work, future, contextvars.copy_context()))
+        return await future
+
+    async def stop(self) -> None:
+        """Дописать уже поставленные работы и остановить задачу записи"""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.put(None)
+        await self._task
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await queue.get()
+            if first is None:
+                return
+            # Дать выполниться уже готовым обработчикам запросов, чтобы их работы попали в эту пачку
+            await asyncio.sleep(0)
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._commit_batch(batch)
+            if stopping:
+                return
+
+    async def _commit_batch(self, batch: List[Tuple[Work, asyncio.Future, contextvars.Context]]) -> None:
+        # Вызывающий уже отменил ожидание - его работу не выполняем
+        pending = [item for item in batch if not item[1].done()]
+        if not pending:
+            return
+        self.batches += 1
+        # Единственной работе точка сохранения не нужна: её изолирует сама транзакция
+        isolated = len(pending) > 1
+        outcomes = []
+        try:
+            async with self.session_factory() as session:
+                for work, future, context in pending:
+                    tokens = [(var, var.set(value)) for var, value in context.items()]
+                    try:
+                        if isolated:
+                            async with session.begin_nested():
+                                result = await work(session)
+                                # flush внутри точки сохранения: ошибки ограничений достаются этой работе
+                                await session.flush()
+                        else:
+                            result = await work(session)
+                            await session.flush()
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+                    else:
+                        outcomes.append((future, result, None))
+                    finally:
+                        for var, token in reversed(tokens):
+                            var.reset(token)
+                if any(error is None for _, _, error in outcomes):
+                    await session.commit()
+                else:
+                    await session.rollback()
+        except Exception as exc:
+            # Общий commit не удался: ни одна работа пачки не зафиксирована
+            own_errors = {id(future): error for future, _, error in outcomes if error is not None}
+            outcomes = [(future, None, own_errors.get(id(future), exc)) for _, future, _ in pending]
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,73 @@
+"""Заказы в секунду: commit на каждый запрос против группового commit задачи записи.
+
+Запуск: python -m benchmarks.group_commit_benchmark --concurrency 1 8 32 128 --seconds 5
+Заказы размещаются через OrderService на движке записи ReadWriteDatabase
+с профилем durable (fsync на каждый commit).
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.database import ReadWriteDatabase
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderCreate, OrderItemBase
+from app.services.order_service import OrderService
+from app.writer import GroupCommitWriter
+from benchmarks.sqlite_profiles_benchmark import seed
+
+
+async def run(path: str, mode: str, concurrency: int, seconds: float, product_ids: list, user_ids: list) -> tuple:
+    database = ReadWriteDatabase(f"sqlite+aiosqlite:///{path}", read_pool_size=1, write_profile="durable")
+    writer = GroupCommitWriter(database.write_sessions)
+    service = OrderService(
+        OrderRepository(cache=LRUCache(maxsize=0), product_cache=LRUCache(maxsize=0)),
+        UserRepository(cache=LRUCache(maxsize=0)),
+        ProductRepository(cache=LRUCache(maxsize=0)),
+    )
+    deadline = time.perf_counter() + seconds
+    placed = 0
+
+    async def client(seed_value: int) -> None:
+        nonlocal placed
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            order = OrderCreate(
+                user_id=rng.choice(user_ids),
+                items=[OrderItemBase(product_id=rng.choice(product_ids), quantity=1)],
+            )
+            if mode == "writer":
+                await writer.submit(lambda session: service.create_order(session, order))
+            else:
+                async with database.session("POST") as session:
+                    await service.create_order(session, order)
+                    await session.commit()
+            placed += 1
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    await writer.stop()
+    await database.dispose()
+    return placed / seconds, writer.batches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--db", default="group_commit_benchmark.db")
+    args = parser.parse_args()
+
+    product_ids, user_ids = seed(args.db)
+    print(f"{'clients':<9}{'commit/request':>16}{'group commit':>14}{'orders/batch':>14}")
+    for concurrency in args.concurrency:
+        per_request, _ = asyncio.run(run(args.db, "per-request", concurrency, args.seconds, product_ids, user_ids))
+        grouped, batches = asyncio.run(run(args.db, "writer", concurrency, args.seconds, product_ids, user_ids))
+        per_batch = grouped * args.seconds / batches if batches else 0.0
+        print(f"{concurrency:<9}{per_request:>16.1f}{grouped:>14.1f}{per_batch:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
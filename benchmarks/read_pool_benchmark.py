@@ -0,0 +1,78 @@
+"""Пропускная способность чтения в зависимости от размера пула чтения.
+
+Запуск: python -m benchmarks.read_pool_benchmark --sizes 1 2 4 8 --seconds 5
+Воркеры читают продукты и списки заказов через ReadWriteDatabase.session("GET"),
+пока один фоновый писатель размещает заказы через движок записи.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from app.database import ReadWriteDatabase
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderCreate, OrderItemBase
+from app.services.order_service import OrderService
+from benchmarks.sqlite_profiles_benchmark import seed
+
+
+async def run(path: str, pool_size: int, seconds: float, workers: int, product_ids: list, user_ids: list) -> dict:
+    database = ReadWriteDatabase(f"sqlite+aiosqlite:///{path}", read_pool_size=pool_size, write_profile="throughput")
+    product_repository = ProductRepository(cache=LRUCache(maxsize=0))
+    order_repository = OrderRepository(cache=LRUCache(maxsize=0), product_cache=LRUCache(maxsize=0))
+    service = OrderService(order_repository, UserRepository(cache=LRUCache(maxsize=0)), product_repository)
+    deadline = time.perf_counter() + seconds
+    reads = writes = 0
+
+    async def reader(seed_value: int) -> None:
+        nonlocal reads
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            async with database.session("GET") as session:
+                await product_repository.get_by_filter(session, 50, 1, min_price=float(rng.randint(1, 90)))
+                await order_repository.get_by_filter(session, 20, 1, user_id=rng.choice(user_ids))
+            reads += 1
+
+    async def writer() -> None:
+        nonlocal writes
+        rng = random.Random(0)
+        while time.perf_counter() < deadline:
+            async with database.session("POST") as session:
+                items = [OrderItemBase(product_id=rng.choice(product_ids), quantity=1)]
+                await service.create_order(session, OrderCreate(user_id=rng.choice(user_ids), items=items))
+                await session.commit()
+            writes += 1
+
+    await asyncio.gather(writer(), *(reader(i) for i in range(workers)))
+    stats = database.stats()
+    await database.dispose()
+    return {
+        "reads/s": reads / seconds,
+        "writes/s": writes / seconds,
+        "read wait avg ms": stats["read"]["wait_avg_ms"],
+        "read wait max ms": stats["read"]["wait_max_ms"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--db", default="read_pool_benchmark.db")
+    args = parser.parse_args()
+
+    product_ids, user_ids = seed(args.db)
+    print(f"cpu cores: {os.cpu_count()}")
+    print(f"{'pool':<6}{'reads/s':>10}{'writes/s':>10}{'wait avg ms':>14}{'wait max ms':>14}")
+    for size in args.sizes:
+        result = asyncio.run(run(args.db, size, args.seconds, args.workers, product_ids, user_ids))
+        print(f"{size:<6}" + "".join(f"{value:>{width}.1f}" for value, width in zip(result.values(), (10, 10, 14, 14))))
+
+
+if __name__ == "__main__":
+    main()
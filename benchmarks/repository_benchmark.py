@@ -0,0 +1,409 @@
+"""Микробенчмарки методов репозиториев и сервисов с проверкой регрессий.
+
+Запуск: python -m benchmarks.repository_benchmark --sizes 1000 100000 1000000
+Для каждого размера N создаётся (или переиспользуется) база с N пользователей,
+N продуктов и N заказов по две позиции; затем каждый публичный метод
+UserRepository, ProductRepository, OrderRepository, AnalyticsRepository и
+сервисов над ними вызывается --repeat раз. Для метода записываются медиана
+и минимум времени вызова и число SQL-запросов (app.query_budget).
+
+Результат сохраняется в JSON (--output) и сравнивается с базовой линией
+(--baseline): процесс завершается с кодом 1, если медиана метода выросла
+больше чем на --threshold процентов (и больше чем на --min-delta-ms, чтобы
+шум быстрых методов не ронял проверку) или метод стал выполнять больше
+запросов. --update-baseline записывает текущий прогон как новую базовую линию.
+
+Порог по времени должен быть больше разброса между двумя прогонами на той же
+машине: на общей виртуальной машине он доходит до 50%, поэтому порог по
+умолчанию такой же. Число запросов детерминировано и сравнивается точно.
+
+Кэши репозиториев отключены: измеряются запросы к БД, а не попадания в память.
+Потоковые методы (stream_by_filter, export) читаются на первые STREAM_BATCHES пачек.
+Изменяющие методы выполняются в транзакции, которая затем откатывается, поэтому
+база не меняется между повторами и прогонами; методы, работающие через задачу
+записи (импорт, пересчёт агрегатов), идемпотентны на этих данных.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import ReadWriteDatabase
+from app.query_budget import count_queries
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderCreate, OrderItemBase, OrderUpdate
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.schemas.user import UserCreate, UserUpdate
+from app.services.analytics_service import AnalyticsService
+from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
+from app.writer import GroupCommitWriter
+from src.models import Base, Order, Product, User, order_items
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "repository_baseline.json")
+
+# Строк в одной вставке при заполнении базы
+SEED_CHUNK = 50_000
+
+# Период, по которому распределены даты заказов
+SEED_DAYS = 365
+SEED_START = datetime(2025, 1, 1)
+
+PAGE_SIZE = 20
+
+# Потоковые методы читаются на столько пачек (по 1000 строк): полная выгрузка миллиона
+# строк на каждый повтор заняла бы весь прогон, а стоимость пачки от этого не меняется
+STREAM_BATCHES = 10
+
+Call = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def seed_ids(kind: str, size: int) -> List[uuid.UUID]:
+    """Детерминированные UUID: повторный прогон на той же базе находит те же строки"""
+    return [uuid.uuid5(uuid.NAMESPACE_OID, f"{kind}-{i}") for i in range(size)]
+
+
+def database_path(directory: str, size: int) -> str:
+    return os.path.join(directory, f"repository_benchmark_{size}.db")
+
+
+def seed(path: str, size: int) -> None:
+    """Создать базу из N пользователей, продуктов и заказов; размер хранится в user_version"""
+    if os.path.exists(path):
+        with sqlite3.connect(path) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] == size:
+                return
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    user_ids, product_ids, order_ids = seed_ids("user", size), seed_ids("product", size), seed_ids("order", size)
+    step = timedelta(seconds=SEED_DAYS * 86400 / size)
+    statuses = ("pending", "paid", "shipped", "delivered")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, size, SEED_CHUNK):
+            chunk = range(start, min(start + SEED_CHUNK, size))
+            conn.execute(User.__table__.insert(), [
+                {"id": user_ids[i], "username": f"user{i}", "email": f"user{i}@example.com",
+                 "created_at": SEED_START, "updated_at": SEED_START}
+                for i in chunk
+            ])
+            conn.execute(Product.__table__.insert(), [
+                {"id": product_ids[i], "name": f"Product {i}", "price": 1.0 + i % 100,
+                 "description": f"Description of product {i}", "stock_quantity": 1_000_000}
+                for i in chunk
+            ])
+            conn.execute(Order.__table__.insert(), [
+                {"id": order_ids[i], "user_id": user_ids[i * 7 % size], "total_price": 3.0 + 2 * (i % 100),
+                 "status": statuses[i % len(statuses)], "order_date": SEED_START + step * i}
+                for i in chunk
+            ])
+            conn.execute(order_items.insert(), [
+                {"order_id": order_ids[i], "product_id": product_ids[(i + k) % size], "quantity": 1,
+                 "price_at_order": 1.0 + (i + k) % size % 100}
+                for i in chunk for k in range(min(2, size))
+            ])
+        conn.execute(text(f"PRAGMA user_version = {size}"))
+    engine.dispose()
+
+
+class Bench:
+    """Репозитории и сервисы с отключёнными кэшами поверх одной базы"""
+
+    def __init__(self, database: ReadWriteDatabase, writer: GroupCommitWriter):
+        self.database = database
+        self.writer = writer
+        self.users = UserRepository(cache=LRUCache(maxsize=0), order_cache=LRUCache(maxsize=0))
+        self.products = ProductRepository(cache=LRUCache(maxsize=0), order_cache=LRUCache(maxsize=0))
+        self.orders = OrderRepository(cache=LRUCache(maxsize=0), product_cache=LRUCache(maxsize=0))
+        self.analytics = AnalyticsRepository()
+        self.user_service = UserService(self.users)
+        self.product_service = ProductService(self.products)
+        self.order_service = OrderService(self.orders, self.users, self.products)
+        self.analytics_service = AnalyticsService(self.analytics)
+
+
+async def drain(stream) -> int:
+    """Прочитать первые STREAM_BATCHES пачек потока (строк или кусков выгрузки) и закрыть его"""
+    batches = 0
+    try:
+        async for _ in stream:
+            batches += 1
+            if batches >= STREAM_BATCHES:
+                break
+    finally:
+        await stream.aclose()
+    return batches
+
+
+async def import_lines(lines: List[bytes]):
+    for line in lines:
+        yield line
+
+
+def cases(bench: Bench, size: int) -> List[Tuple[str, str, Call]]:
+    """Замеряемые вызовы: (метод, вид, вызов).
+
+    Вид read - вызов в сессии чтения, write - в транзакции записи, которая
+    откатывается, own - метод сам открывает сессии или работает через задачу записи.
+    """
+    user_ids, product_ids, order_ids = seed_ids("user", size), seed_ids("product", size), seed_ids("order", size)
+    middle = size // 2
+    user_id, product_id, order_id = user_ids[middle], product_ids[middle], order_ids[middle]
+    page_after = {}
+    day_from, day_to = SEED_START.date(), SEED_START.date() + timedelta(days=30)
+    new_item = [{"product_id": product_ids[0], "quantity": 1}, {"product_id": product_ids[1 % size], "quantity": 1}]
+    order_create = OrderCreate(user_id=user_id, items=[OrderItemBase(**item) for item in new_item])
+    import_body = [
+        json.dumps({"name": f"Product {i}", "price": 1.0 + i % 100, "description": f"Description of product {i}",
+                    "stock_quantity": 1_000_000}).encode() + b"\n"
+        for i in range(min(100, size))
+    ]
+    users, products, orders = bench.users, bench.products, bench.orders
+
+    async def cursor_page(session: AsyncSession, repository, name: str):
+        # Курсор второй страницы вычисляется один раз, вне замеров
+        if name not in page_after:
+            first = await repository.get_by_filter(session, PAGE_SIZE, 1)
+            page_after[name] = repository.next_cursor(first, PAGE_SIZE)
+        return await repository.get_by_filter(session, PAGE_SIZE, 1, page_after[name])
+
+    return [
+        # --- UserRepository
+        ("UserRepository.get_by_id", "read", lambda s: users.get_by_id(s, user_id)),
+        ("UserRepository.get_by_filter", "read", lambda s: users.get_by_filter(s, PAGE_SIZE, 1)),
+        ("UserRepository.get_by_filter[deep_page]", "read", lambda s: users.get_by_filter(s, PAGE_SIZE, 50)),
+        ("UserRepository.get_by_filter[cursor]", "read", lambda s: cursor_page(s, users, "users")),
+        ("UserRepository.get_by_filter[username]", "read", lambda s: users.get_by_filter(s, PAGE_SIZE, 1, username="user12")),
+        ("UserRepository.get_by_filter[q]", "read", lambda s: users.get_by_filter(s, PAGE_SIZE, 1, q=f"user{middle}")),
+        ("UserRepository.stream_by_filter", "read", lambda s: drain(users.stream_by_filter(s))),
+        ("UserRepository.create", "write", lambda s: users.create(s, UserCreate(username="bench", email="bench@example.com"))),
+        ("UserRepository.update", "write", lambda s: users.update(s, user_id, UserUpdate(username="bench"))),
+        ("UserRepository.delete", "write", lambda s: users.delete(s, user_id)),
+        # --- ProductRepository
+        ("ProductRepository.get_by_id", "read", lambda s: products.get_by_id(s, product_id)),
+        ("ProductRepository.get_by_ids", "read", lambda s: products.get_by_ids(s, product_ids[:PAGE_SIZE])),
+        ("ProductRepository.get_by_filter", "read", lambda s: products.get_by_filter(s, PAGE_SIZE, 1)),
+        ("ProductRepository.get_by_filter[deep_page]", "read", lambda s: products.get_by_filter(s, PAGE_SIZE, 50)),
+        ("ProductRepository.get_by_filter[cursor]", "read", lambda s: cursor_page(s, products, "products")),
+        ("ProductRepository.get_by_filter[price]", "read", lambda s: products.get_by_filter(s, PAGE_SIZE, 1, min_price=10, max_price=20)),
+        ("ProductRepository.get_by_filter[q]", "read", lambda s: products.get_by_filter(s, PAGE_SIZE, 1, q="description")),
+        ("ProductRepository.stream_by_filter", "read", lambda s: drain(products.stream_by_filter(s))),
+        ("ProductRepository.create", "write", lambda s: products.create(s, "Bench product", 9.99, "bench", 10)),
+        ("ProductRepository.upsert_many", "write", lambda s: products.upsert_many(s, [
+            {"name": f"Product {i}", "price": 2.0, "description": None, "stock_quantity": 5} for i in range(min(100, size))
+        ])),
+        ("ProductRepository.update", "write", lambda s: products.update(s, product_id, price=2.5)),
+        ("ProductRepository.delete", "write", lambda s: products.delete(s, product_id)),
+        # --- OrderRepository
+        ("OrderRepository.get_by_id", "read", lambda s: orders.get_by_id(s, order_id)),
+        ("OrderRepository.get_by_filter", "read", lambda s: orders.get_by_filter(s, PAGE_SIZE, 1)),
+        ("OrderRepository.get_by_filter[deep_page]", "read", lambda s: orders.get_by_filter(s, PAGE_SIZE, 50)),
+        ("OrderRepository.get_by_filter[cursor]", "read", lambda s: cursor_page(s, orders, "orders")),
+        ("OrderRepository.get_by_filter[status]", "read", lambda s: orders.get_by_filter(s, PAGE_SIZE, 1, status="paid")),
+        ("OrderRepository.get_by_filter[user_id]", "read", lambda s: orders.get_by_filter(s, PAGE_SIZE, 1, user_id=user_id)),
+        ("OrderRepository.stream_by_filter", "read", lambda s: drain(orders.stream_by_filter(s))),
+        ("OrderRepository.create", "write", lambda s: orders.create(s, user_id, items=new_item)),
+        ("OrderRepository.update", "write", lambda s: orders.update(s, order_id, status="shipped")),
+        ("OrderRepository.delete", "write", lambda s: orders.delete(s, order_id)),
+        # --- AnalyticsRepository
+        ("AnalyticsRepository.revenue_by_day", "read", lambda s: bench.analytics.revenue_by_day(s, day_from, day_to)),
+        ("AnalyticsRepository.revenue_by_status", "read", lambda s: bench.analytics.revenue_by_status(s, day_from, day_to)),
+        ("AnalyticsRepository.top_products", "read", lambda s: bench.analytics.top_products(s, 10, day_from, day_to)),
+        ("AnalyticsRepository.product_by_day", "read", lambda s: bench.analytics.product_by_day(s, product_id)),
+        ("AnalyticsRepository.day_bounds", "read", lambda s: bench.analytics.day_bounds(s)),
+        ("AnalyticsRepository.rebuild_days", "write", lambda s: bench.analytics.rebuild_days(s, day_from, day_to)),
+        # --- UserService
+        ("UserService.get_by_id", "read", lambda s: bench.user_service.get_by_id(s, user_id)),
+        ("UserService.get_by_filter", "read", lambda s: bench.user_service.get_by_filter(s, PAGE_SIZE, 1)),
+        ("UserService.export", "own", lambda s: drain(bench.user_service.export(bench.database.read_sessions, "ndjson"))),
+        ("UserService.create", "write", lambda s: bench.user_service.create(s, UserCreate(username="bench", email="bench@example.com"))),
+        ("UserService.update", "write", lambda s: bench.user_service.update(s, user_id, UserUpdate(email="bench@example.com"))),
+        ("UserService.delete", "write", lambda s: bench.user_service.delete(s, user_id)),
+        # --- ProductService
+        ("ProductService.get_by_id", "read", lambda s: bench.product_service.get_by_id(s, product_id)),
+        ("ProductService.get_by_filter", "read", lambda s: bench.product_service.get_by_filter(s, PAGE_SIZE, 1)),
+        ("ProductService.export", "own", lambda s: drain(bench.product_service.export(bench.database.read_sessions, "ndjson"))),
+        ("ProductService.create", "write", lambda s: bench.product_service.create(s, ProductCreate(name="Bench product", price=9.99))),
+        ("ProductService.import_products", "own", lambda s: bench.product_service.import_products(
+            bench.writer, import_lines(import_body), "ndjson")),
+        ("ProductService.update", "write", lambda s: bench.product_service.update(s, product_id, ProductUpdate(price=2.5))),
+        ("ProductService.delete", "write", lambda s: bench.product_service.delete(s, product_id)),
+        # --- OrderService
+        ("OrderService.get_by_id", "read", lambda s: bench.order_service.get_by_id(s, order_id)),
+        ("OrderService.get_by_filter", "read", lambda s: bench.order_service.get_by_filter(s, PAGE_SIZE, 1)),
+        ("OrderService.export", "own", lambda s: drain(bench.order_service.export(bench.database.read_sessions, "ndjson"))),
+        ("OrderService.create_order", "write", lambda s: bench.order_service.create_order(s, order_create)),
+        ("OrderService.update", "write", lambda s: bench.order_service.update(s, order_id, OrderUpdate(status="shipped"))),
+        ("OrderService.delete", "write", lambda s: bench.order_service.delete(s, order_id)),
+        # --- AnalyticsService
+        ("AnalyticsService.revenue_by_day", "read", lambda s: bench.analytics_service.revenue_by_day(s, day_from, day_to)),
+        ("AnalyticsService.revenue_by_status", "read", lambda s: bench.analytics_service.revenue_by_status(s, day_from, day_to)),
+        ("AnalyticsService.top_products", "read", lambda s: bench.analytics_service.top_products(s, 10, day_from, day_to)),
+        ("AnalyticsService.product_by_day", "read", lambda s: bench.analytics_service.product_by_day(s, product_id)),
+        ("AnalyticsService.rebuild", "own", lambda s: bench.analytics_service.rebuild(bench.writer)),
+    ]
+
+
+async def measure(bench: Bench, kind: str, call: Call, repeat: int) -> Dict[str, Any]:
+    """Медиана и минимум времени вызова (мс) и число SQL-запросов последнего повтора"""
+    timings = []
+    queries = 0
+    # Первый вызов прогревает кэш страниц SQLite и подготовленные выражения
+    for attempt in range(repeat + 1):
+        if kind == "own":
+            session = None
+        elif kind == "write":
+            session = bench.database.write_sessions()
+        else:
+            session = bench.database.read_sessions()
+        # Как в timeit: сборка мусора, начатая чужими аллокациями, не попадает в замер метода
+        gc.collect()
+        gc.disable()
+        try:
+            with count_queries() as counter:
+                started = time.perf_counter()
+                await call(session)
+                elapsed = time.perf_counter() - started
+        finally:
+            gc.enable()
+            if session is not None:
+                await session.rollback()
+                await session.close()
+        if attempt:
+            timings.append(elapsed * 1000)
+            queries = counter.count
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+        "queries": queries,
+    }
+
+
+async def run_size(path: str, size: int, repeat: int, only: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    database = ReadWriteDatabase(f"sqlite+aiosqlite:///{path}", read_pool_size=1)
+    writer = GroupCommitWriter(database.write_sessions)
+    bench = Bench(database, writer)
+    results = {}
+    try:
+        for name, kind, call in cases(bench, size):
+            if only and only not in name:
+                continue
+            results[name] = await measure(bench, kind, call, repeat)
+            print(f"  {name:<45} {results[name]['median_ms']:>10.3f} ms {results[name]['queries']:>4} q", flush=True)
+    finally:
+        await writer.stop()
+        await database.dispose()
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> List[str]:
+    """Регрессии текущего прогона относительно базовой линии: рост медианы или числа запросов"""
+    regressions = []
+    for size, methods in current["results"].items():
+        base_methods = baseline.get("results", {}).get(size, {})
+        for name, result in methods.items():
+            base = base_methods.get(name)
+            if base is None:
+                continue
+            if result["queries"] > base["queries"]:
+                regressions.append(f"{name} @ {size}: {base['queries']} -> {result['queries']} queries")
+            limit = base["median_ms"] * (1 + threshold / 100)
+            if result["median_ms"] > limit and result["median_ms"] - base["median_ms"] > min_delta_ms:
+                change = (result["median_ms"] / base["median_ms"] - 1) * 100 if base["median_ms"] else float("inf")
+                regressions.append(
+                    f"{name} @ {size}: {base['median_ms']:.3f} -> {result['median_ms']:.3f} ms (+{change:.0f}%)"
+                )
+    return regressions
+
+
+def merge_baseline(baseline: dict, current: dict) -> dict:
+    """Новая базовая линия: размеры из текущего прогона заменяются, остальные сохраняются"""
+    merged = {"meta": current["meta"], "results": dict(baseline.get("results", {}))}
+    for size, methods in current["results"].items():
+        merged["results"][size] = {**merged["results"].get(size, {}), **methods}
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Микробенчмарки репозиториев и сервисов")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="строк в каждой таблице")
+    parser.add_argument("--repeat", type=int, default=5, help="замеров на метод (после прогрева)")
+    parser.add_argument("--output", default="repository_benchmark.json", help="куда записать результаты")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="базовая линия для сравнения")
+    parser.add_argument("--threshold", type=float, default=50.0, help="допустимый рост медианы, %%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.2, help="рост меньше этого не считается регрессией")
+    parser.add_argument("--update-baseline", action="store_true", help="записать прогон как базовую линию")
+    parser.add_argument("--only", help="запускать только методы, содержащие эту подстроку")
+    parser.add_argument("--data-dir", default=".", help="каталог для баз с данными")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be positive")
+
+    current = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        path = database_path(args.data_dir, size)
+        print(f"size {size}: seeding {path}", flush=True)
+        started = time.perf_counter()
+        seed(path, size)
+        print(f"size {size}: data ready in {time.perf_counter() - started:.1f} s", flush=True)
+        current["results"][str(size)] = asyncio.run(run_size(path, size, args.repeat, args.only))
+
+    with open(args.output, "w") as file:
+        json.dump(current, file, indent=2, sort_keys=True)
+    print(f"results written to {args.output}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(merge_baseline(baseline, current), file, indent=2, sort_keys=True)
+        print(f"baseline updated: {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0f}%:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nno regressions over {args.threshold:.0f}% against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
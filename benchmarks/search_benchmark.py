@@ -0,0 +1,109 @@
+"""Сравнение поиска подстроки (ilike) и полнотекстового поиска FTS5 (q=).
+
+Запуск: python -m benchmarks.search_benchmark --rows 1000000
+Создаёт отдельную базу (по умолчанию ./search_benchmark.db), заполняет её
+синтетическими продуктами и замеряет get_by_filter репозитория в обоих режимах.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.cache import LRUCache
+from app.repositories.product_repository import ProductRepository
+from src.models import Base, uuid7
+
+WORDS = (
+    "lamp desk chair table oak steel glass cable phone laptop monitor keyboard mouse "
+    "bottle kettle mug plate fork knife spoon pillow blanket sofa shelf mirror clock "
+    "brush towel soap candle vase frame rug curtain basket hammer drill wrench saw"
+).split()
+
+# Редкие слова (бренды, артикулы): каждое встречается примерно в сотне строк
+RARE_WORDS = [f"{a}{b}{c}" for a in "bcdfgk" for b in ("ar", "el", "is", "on", "ux", "ya") for c in range(600)]
+
+# (описание, запрос): частые слова совпадают с сотнями тысяч строк, редкие - с сотнями, последний - ни с одной
+QUERIES = [
+    ("common", "lamp"),
+    ("common x2", "oak table"),
+    ("rare", RARE_WORDS[123]),
+    ("rare+common", f"{RARE_WORDS[4567]} lamp"),
+    ("missing", "zzqxv"),
+]
+
+
+def populate(path: str, rows: int, batch: int = 50_000) -> None:
+    """Создать схему и заполнить таблицу продуктов; индекс FTS5 наполняется триггерами"""
+    if os.path.exists(path):
+        os.remove(path)
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO products (id, name, price, description, stock_quantity) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    uuid7().bytes,
+                    f"{' '.join(rng.sample(WORDS, 2))} {rng.choice(RARE_WORDS)} {i}",
+                    round(rng.uniform(1, 1000), 2),
+                    " ".join(rng.choices(WORDS, k=10) + rng.choices(RARE_WORDS, k=2)),
+                    rng.randint(0, 100),
+                )
+                for i in range(start, min(start + batch, rows))
+            ),
+        )
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def measure(path: str, repeats: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    # Кэш get_by_id не участвует в поиске, отдельный экземпляр не мешает приложению
+    repository = ProductRepository(cache=LRUCache(maxsize=0))
+
+    print(f"{'query':<14}{'text':<16}{'mode':<6}{'median ms':>11}{'p95 ms':>10}{'rows':>6}")
+    async with session_factory() as session:
+        for label, query in QUERIES:
+            for mode in ("name", "q"):
+                timings = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    found = await repository.get_by_filter(session, 20, 1, **{mode: query})
+                    timings.append((time.perf_counter() - started) * 1000)
+                    session.expunge_all()
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                print(f"{label:<14}{query:<16}{mode:<6}{statistics.median(timings):>11.2f}{p95:>10.2f}{len(found):>6}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--db", default="search_benchmark.db")
+    parser.add_argument("--reuse", action="store_true", help="не пересоздавать базу, если она уже есть")
+    args = parser.parse_args()
+
+    if not (args.reuse and os.path.exists(args.db)):
+        started = time.perf_counter()
+        populate(args.db, args.rows)
+        print(f"populated {args.rows} rows in {time.perf_counter() - started:.1f}s")
+    asyncio.run(measure(args.db, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
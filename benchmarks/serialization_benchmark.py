@@ -0,0 +1,104 @@
+"""CPU-время на ответ списка из 100 строк: pydantic model_validate против структур msgspec.
+
+Запуск: python -m benchmarks.serialization_benchmark --rows 100 --requests 300
+Строки - ORM-объекты в памяти (без БД), чтобы сравнивать только построение
+и кодирование ответа. Для каждой сущности считается CPU-время одного
+запроса через Litestar (TestClient) и отдельно - только сериализации.
+"""
+import argparse
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, List
+
+from litestar import Litestar, get
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+from litestar.testing import TestClient
+
+from app.schemas.order import OrderResponse
+from app.schemas.product import ProductResponse
+from app.schemas.records import OrderRecord, ProductRecord, UserRecord, to_records
+from app.schemas.user import UserResponse
+from src.models import Order, OrderItem, Product, User
+
+
+def make_rows(rows: int) -> dict:
+    now = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    users = [
+        User(id=uuid.uuid4(), username=f"user_{i}", email=f"user_{i}@example.com",
+             created_at=now, updated_at=now + timedelta(seconds=i))
+        for i in range(rows)
+    ]
+    products = [
+        Product(id=uuid.uuid4(), name=f"Product {i}", price=10.0 + i, description=f"Description of product {i}",
+                stock_quantity=i)
+        for i in range(rows)
+    ]
+    orders = [
+        Order(id=uuid.uuid4(), user_id=users[i].id, address_id=None, total_price=30.0, status="pending",
+              order_date=now, items=[OrderItem(product_id=products[(i + k) % rows].id, quantity=k + 1, price_at_order=5.0)
+                                     for k in range(3)])
+        for i in range(rows)
+    ]
+    return {"users": (users, UserResponse, UserRecord), "products": (products, ProductResponse, ProductRecord),
+            "orders": (orders, OrderResponse, OrderRecord)}
+
+
+# Кодировщик с теми же обработчиками pydantic-моделей, что подключает Litestar
+SERIALIZER = get_serializer(PydanticInitPlugin.encoders())
+
+
+def cpu_per_call(call: Callable[[], Any], repeat: int) -> float:
+    call()
+    started = time.process_time()
+    for _ in range(repeat):
+        call()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def measure(rows: List[Any], schema, record_type, requests: int) -> dict:
+    def pydantic_body() -> List[Any]:
+        return [schema.model_validate(row) for row in rows]
+
+    def records_body() -> List[Any]:
+        return to_records(rows, record_type)
+
+    @get("/pydantic", sync_to_thread=False)
+    def pydantic_handler() -> List[schema]:
+        return pydantic_body()
+
+    @get("/records", sync_to_thread=False)
+    def records_handler() -> List[record_type]:
+        return records_body()
+
+    result = {
+        "serialize pydantic ms": cpu_per_call(lambda: encode_json(pydantic_body(), SERIALIZER), requests),
+        "serialize records ms": cpu_per_call(lambda: encode_json(records_body(), SERIALIZER), requests),
+    }
+    with TestClient(app=Litestar(route_handlers=[pydantic_handler, records_handler])) as client:
+        assert client.get("/pydantic").json() == client.get("/records").json()
+        result["request pydantic ms"] = cpu_per_call(lambda: client.get("/pydantic"), requests)
+        result["request records ms"] = cpu_per_call(lambda: client.get("/records"), requests)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    # Журнал каждого запроса тестового клиента искажает замер
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"CPU ms per call, {args.rows} rows per response")
+    print(f"{'entity':<10}{'ser pyd':>10}{'ser rec':>10}{'req pyd':>10}{'req rec':>10}{'speedup':>10}")
+    for entity, (rows, schema, record_type) in make_rows(args.rows).items():
+        result = measure(rows, schema, record_type, args.requests)
+        speedup = result["request pydantic ms"] / result["request records ms"]
+        print(f"{entity:<10}" + "".join(f"{value:>10.3f}" for value in result.values()) + f"{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
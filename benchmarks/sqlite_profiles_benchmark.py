@@ -0,0 +1,132 @@
+"""Сравнение профилей соединений SQLite на смешанной нагрузке чтения и записи.
+
+Запуск: python -m benchmarks.sqlite_profiles_benchmark --seconds 10 --workers 16
+Для каждой пары (профиль чтения, профиль записи) создаётся свежая база,
+после чего воркеры в течение заданного времени выполняют чтения продуктов
+и списков заказов и размещают заказы через OrderService.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import configure_sqlite
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderCreate, OrderItemBase
+from app.services.order_service import OrderService
+from src.models import Base, Product, User
+
+# (профиль чтения, профиль записи)
+RUNS = [("durable", "durable"), ("throughput", "throughput"), ("readonly", "throughput")]
+
+PRODUCTS = 10_000
+USERS = 1_000
+
+
+def seed(path: str) -> tuple:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    product_ids = [uuid.uuid4() for _ in range(PRODUCTS)]
+    user_ids = [uuid.uuid4() for _ in range(USERS)]
+    with engine.begin() as conn:
+        conn.execute(Product.__table__.insert(), [
+            {"id": pid, "name": f"Product {i}", "price": 1.0 + i % 100, "stock_quantity": 1_000_000}
+            for i, pid in enumerate(product_ids)
+        ])
+        conn.execute(User.__table__.insert(), [
+            {"id": uid, "username": f"user{i}", "email": f"user{i}@example.com"}
+            for i, uid in enumerate(user_ids)
+        ])
+    engine.dispose()
+    return product_ids, user_ids
+
+
+async def run(path: str, read_profile: str, write_profile: str, seconds: float, workers: int, write_ratio: float) -> dict:
+    product_ids, user_ids = seed(path)
+    read_engine = configure_sqlite(create_async_engine(f"sqlite+aiosqlite:///{path}"), read_profile)
+    write_engine = configure_sqlite(create_async_engine(f"sqlite+aiosqlite:///{path}"), write_profile)
+    read_sessions = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    write_sessions = sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False)
+
+    # Кэши отключены: сравниваются соединения, а не попадания в память процесса
+    product_repository = ProductRepository(cache=LRUCache(maxsize=0))
+    order_repository = OrderRepository(cache=LRUCache(maxsize=0), product_cache=LRUCache(maxsize=0))
+    service = OrderService(order_repository, UserRepository(cache=LRUCache(maxsize=0)), product_repository)
+
+    latencies = {"read": [], "write": []}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(seed_value: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    kind = "write"
+                    items = [OrderItemBase(product_id=pid, quantity=1) for pid in rng.sample(product_ids, rng.randint(1, 3))]
+                    async with write_sessions() as session:
+                        await service.create_order(session, OrderCreate(user_id=rng.choice(user_ids), items=items))
+                        await session.commit()
+                else:
+                    kind = "read"
+                    async with read_sessions() as session:
+                        if rng.random() < 0.5:
+                            await product_repository.get_by_id(session, rng.choice(product_ids))
+                        else:
+                            await order_repository.get_by_filter(session, 20, 1, user_id=rng.choice(user_ids))
+            except Exception:
+                errors += 1
+                continue
+            latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker(i) for i in range(workers)))
+    await read_engine.dispose()
+    await write_engine.dispose()
+
+    def p95(values: list) -> float:
+        return sorted(values)[int(len(values) * 0.95)] if values else 0.0
+
+    return {
+        "reads/s": len(latencies["read"]) / seconds,
+        "writes/s": len(latencies["write"]) / seconds,
+        "read p50": statistics.median(latencies["read"]) if latencies["read"] else 0.0,
+        "read p95": p95(latencies["read"]),
+        "write p50": statistics.median(latencies["write"]) if latencies["write"] else 0.0,
+        "write p95": p95(latencies["write"]),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--db", default="profiles_benchmark.db")
+    args = parser.parse_args()
+
+    header = ["read/write", "reads/s", "writes/s", "read p50", "read p95", "write p50", "write p95", "errors"]
+    print("".join(f"{column:>12}" if i else f"{column:<22}" for i, column in enumerate(header)))
+    for read_profile, write_profile in RUNS:
+        result = asyncio.run(run(args.db, read_profile, write_profile, args.seconds, args.workers, args.write_ratio))
+        values = "".join(f"{value:>12.1f}" if isinstance(value, float) else f"{value:>12}" for value in result.values())
+        print(f"{read_profile + '/' + write_profile:<22}{values}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Ключи uuid4 в CHAR(32) против UUIDv7 в BLOB(16): вставка, размер индексов, диапазоны.
+
+Запуск: python -m benchmarks.uuid_keys_benchmark --orders 1000000
+Для каждого варианта ключа создаётся своя база с таблицами orders и order_items
+той же формы, что и в приложении (первичный ключ, внешние ключи, составные
+индексы с id), и в неё вставляются заказы по две позиции пачками по --batch
+заказов в транзакции - как их пишет задача группового commit.
+
+Замеряются скорость вставки (в начале и в конце, когда индексы уже больше
+кэша страниц), размер каждой таблицы и индекса (dbstat) и чтение диапазона
+ключей с загрузкой строк. Промежуточные варианты (uuid4 в BLOB, UUIDv7 в
+тексте) разделяют вклад формата хранения и порядка ключей.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import sqlalchemy as sa
+from sqlalchemy import create_engine, event
+
+from src.models import BinaryUUID, uuid7
+
+# (название, тип столбца ключа, генератор ключей)
+VARIANTS = [
+    ("uuid4 CHAR(32)", sa.Uuid, uuid.uuid4),
+    ("uuid4 BLOB(16)", BinaryUUID, uuid.uuid4),
+    ("uuid7 CHAR(32)", sa.Uuid, uuid7),
+    ("uuid7 BLOB(16)", BinaryUUID, uuid7),
+]
+
+USERS = 10_000
+PRODUCTS = 10_000
+
+
+def schema(key_type: Callable[[], sa.types.TypeEngine]) -> sa.MetaData:
+    metadata = sa.MetaData()
+    sa.Table(
+        "orders", metadata,
+        sa.Column("id", key_type(), primary_key=True),
+        sa.Column("user_id", key_type(), nullable=False),
+        sa.Column("total_price", sa.Float, nullable=False),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("order_date", sa.DateTime, nullable=False),
+        sa.Index("ix_orders_order_date_id", "order_date", "id"),
+        sa.Index("ix_orders_user_id_order_date_id", "user_id", "order_date", "id"),
+    )
+    sa.Table(
+        "order_items", metadata,
+        sa.Column("order_id", key_type(), sa.ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("product_id", key_type(), primary_key=True),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("price_at_order", sa.Float, nullable=False),
+        sa.Index("ix_order_items_product_id", "product_id"),
+    )
+    return metadata
+
+
+def run(path: str, key_type, new_key, orders: int, batch: int, cache_mb: int) -> Dict[str, object]:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{cache_mb * 1024}")
+        cursor.close()
+
+    metadata = schema(key_type)
+    metadata.create_all(engine)
+    orders_table, items_table = metadata.tables["orders"], metadata.tables["order_items"]
+    rng = random.Random(7)
+    user_ids = [uuid.uuid4() for _ in range(USERS)]
+    product_ids = [uuid.uuid4() for _ in range(PRODUCTS)]
+    started_at = datetime(2026, 1, 1)
+
+    # Скорость вставки по пачкам: первая десятая часть и последняя
+    rates: List[float] = []
+    keys: List[uuid.UUID] = []
+    for start in range(0, orders, batch):
+        rows, items = [], []
+        for index in range(start, min(start + batch, orders)):
+            order_id = new_key()
+            keys.append(order_id)
+            rows.append({"id": order_id, "user_id": rng.choice(user_ids), "total_price": 10.0, "status": "pending",
+                         "order_date": started_at + timedelta(seconds=index)})
+            for product_id in rng.sample(product_ids, 2):
+                items.append({"order_id": order_id, "product_id": product_id, "quantity": 1, "price_at_order": 5.0})
+        began = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(orders_table.insert(), rows)
+            conn.execute(items_table.insert(), items)
+        rates.append(len(rows) / (time.perf_counter() - began))
+
+    tenth = max(1, len(rates) // 10)
+    with engine.connect() as conn:
+        sizes = dict(conn.exec_driver_sql("SELECT name, sum(pgsize) FROM dbstat GROUP BY name").all())
+
+        # Диапазон ключей в 1% строк посередине: первичный ключ находит их, строки читаются из таблицы
+        ordered = sorted(keys)
+        low, high = ordered[len(ordered) // 2], ordered[len(ordered) // 2 + len(ordered) // 100]
+        range_stmt = (
+            sa.select(orders_table.c.id, orders_table.c.total_price, orders_table.c.order_date)
+            .where(orders_table.c.id >= low, orders_table.c.id < high)
+        )
+        # Позиции страницы последних заказов: поиск по order_id в первичном ключе order_items
+        items_stmt = sa.select(items_table).where(items_table.c.order_id.in_(keys[-20:]))
+        timings = {"range": [], "items": []}
+        for _ in range(10):
+            for name, stmt in (("range", range_stmt), ("items", items_stmt)):
+                began = time.perf_counter()
+                conn.execute(stmt).all()
+                timings[name].append((time.perf_counter() - began) * 1000)
+    engine.dispose()
+    return {
+        "insert_first": statistics.median(rates[:tenth]),
+        "insert_last": statistics.median(rates[-tenth:]),
+        "file_mb": os.path.getsize(path) / 2**20,
+        "sizes": sizes,
+        "range_ms": statistics.median(timings["range"]),
+        "items_ms": statistics.median(timings["items"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=1_000, help="заказов в одной транзакции")
+    parser.add_argument("--cache-mb", type=int, default=8, help="кэш страниц SQLite, МБ")
+    parser.add_argument("--db", default="uuid_keys_benchmark.db")
+    args = parser.parse_args()
+
+    results = {}
+    for name, key_type, new_key in VARIANTS:
+        results[name] = run(args.db, key_type, new_key, args.orders, args.batch, args.cache_mb)
+        print(f"{name}: done", flush=True)
+
+    print(f"\n{'variant':<16}{'ins/s first':>12}{'ins/s last':>12}{'file MB':>9}{'range ms':>10}{'items ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['insert_first']:>12.0f}{result['insert_last']:>12.0f}{result['file_mb']:>9.1f}"
+              f"{result['range_ms']:>10.2f}{result['items_ms']:>10.3f}")
+
+    objects = sorted({key for result in results.values() for key in result["sizes"] if not key.startswith("sqlite_schema")})
+    print(f"\n{'table / index (MB)':<36}" + "".join(f"{name:>16}" for name in results))
+    for key in objects:
+        print(f"{key:<36}" + "".join(f"{result['sizes'].get(key, 0) / 2**20:>16.1f}" for result in results.values()))
+
+
+if __name__ == "__main__":
+    main()
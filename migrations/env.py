@@ -8,7 +8,7 @@ from alembic import context
 # Добавляем путь к проекту
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from src.models import Base
+from src.models import Base, FTS_COLUMNS
 
 config = context.config
 
@@ -17,6 +17,13 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+
+def include_name(name, type_, parent_names) -> bool:
+    """Не сравнивать с моделями таблицы FTS5 и их служебные таблицы - они создаются миграцией вручную"""
+    if type_ == "table":
+        return not any(name.startswith(f"{table}_fts") for table in FTS_COLUMNS)
+    return True
+
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
@@ -40,6 +47,7 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection, 
             target_metadata=target_metadata,
+            include_name=include_name,
             render_as_batch=True  # Важно для SQLite
         )
 
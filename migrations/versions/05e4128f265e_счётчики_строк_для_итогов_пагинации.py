@@ -0,0 +1,113 @@
+"""счётчики строк для итогов пагинации
+
+Revision ID: 05e4128f265e
+Revises: e852d20ee256
+Create Date: 2026-10-18 07:31:07.738235
+
+Точные итоги для include_total без COUNT(*) по таблице: число строк users,
+products и orders и число заказов по статусу и по пользователю. Счётчики
+поддерживаются триггерами и заполняются из существующих строк. Миграции,
+пересоздающие эти таблицы через batch_alter_table, удаляют триггеры - после
+них триггеры нужно создать заново и заполнить счётчики повторно.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '05e4128f265e'
+down_revision: Union[str, Sequence[str], None] = 'e852d20ee256'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Снимок триггеров на момент миграции (не импортируется из src.models, чтобы миграция не менялась вместе с моделями)
+def _count_change(table: str, key_column: str, key: str, delta: int, count_column: str) -> str:
+    if delta > 0:
+        return (
+            f"INSERT INTO {table} ({key_column}, {count_column}) VALUES ({key}, 1) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET {count_column} = {count_column} + 1;"
+        )
+    return (
+        f"UPDATE {table} SET {count_column} = {count_column} - 1 WHERE {key_column} = {key}; "
+        f"DELETE FROM {table} WHERE {key_column} = {key} AND {count_column} <= 0;"
+    )
+
+
+COUNT_TRIGGERS = []
+for _table in ('users', 'products', 'orders'):
+    _inserted = [_count_change('table_row_counts', 'table_name', f"'{_table}'", 1, 'row_count')]
+    _deleted = [_count_change('table_row_counts', 'table_name', f"'{_table}'", -1, 'row_count')]
+    if _table == 'orders':
+        _inserted += [
+            _count_change('status_order_counts', 'status', 'new.status', 1, 'order_count'),
+            _count_change('user_order_counts', 'user_id', 'new.user_id', 1, 'order_count'),
+        ]
+        _deleted += [
+            _count_change('status_order_counts', 'status', 'old.status', -1, 'order_count'),
+            _count_change('user_order_counts', 'user_id', 'old.user_id', -1, 'order_count'),
+        ]
+    COUNT_TRIGGERS += [
+        f"CREATE TRIGGER {_table}_count_ai AFTER INSERT ON {_table} BEGIN {' '.join(_inserted)} END",
+        f"CREATE TRIGGER {_table}_count_ad AFTER DELETE ON {_table} BEGIN {' '.join(_deleted)} END",
+    ]
+COUNT_TRIGGERS += [
+    "CREATE TRIGGER orders_count_au_status AFTER UPDATE OF status ON orders WHEN old.status IS NOT new.status BEGIN "
+    f"{_count_change('status_order_counts', 'status', 'old.status', -1, 'order_count')} "
+    f"{_count_change('status_order_counts', 'status', 'new.status', 1, 'order_count')} END",
+    "CREATE TRIGGER orders_count_au_user AFTER UPDATE OF user_id ON orders WHEN old.user_id IS NOT new.user_id BEGIN "
+    f"{_count_change('user_order_counts', 'user_id', 'old.user_id', -1, 'order_count')} "
+    f"{_count_change('user_order_counts', 'user_id', 'new.user_id', 1, 'order_count')} END",
+]
+
+COUNT_TRIGGER_NAMES = [
+    'users_count_ai', 'users_count_ad', 'products_count_ai', 'products_count_ad',
+    'orders_count_ai', 'orders_count_ad', 'orders_count_au_status', 'orders_count_au_user',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('status_order_counts',
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('status')
+    )
+    op.create_table('table_row_counts',
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.create_table('user_order_counts',
+    sa.Column('user_id', sa.LargeBinary(length=16), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # ### end Alembic commands ###
+
+    # Заполнить счётчики по существующим строкам, затем подключить триггеры
+    op.execute(
+        "INSERT INTO table_row_counts (table_name, row_count) "
+        "SELECT 'users', count(*) FROM users UNION ALL "
+        "SELECT 'products', count(*) FROM products UNION ALL "
+        "SELECT 'orders', count(*) FROM orders"
+    )
+    op.execute("DELETE FROM table_row_counts WHERE row_count = 0")
+    op.execute("INSERT INTO status_order_counts (status, order_count) SELECT status, count(*) FROM orders GROUP BY status")
+    op.execute("INSERT INTO user_order_counts (user_id, order_count) SELECT user_id, count(*) FROM orders GROUP BY user_id")
+    for statement in COUNT_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in COUNT_TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('user_order_counts')
+    op.drop_table('table_row_counts')
+    op.drop_table('status_order_counts')
+    # ### end Alembic commands ###
@@ -0,0 +1,172 @@
+"""ключи UUID в 16-байтовых BLOB
+
+Revision ID: 1412cd7d5f74
+Revises: 68ee3504652d
+Create Date: 2026-10-18 06:34:58.853265
+
+Столбцы UUID (CHAR(32) с шестнадцатеричным текстом) становятся BLOB(16):
+значения переводятся UPDATE-ами пачками по BATCH_ROWS строк по rowid,
+затем таблицы пересоздаются с новым типом через batch_alter_table. Существующие ключи не
+меняются (они видны клиентам в URL и ETag), только их хранение; новые
+строки получают UUIDv7 из src.models.uuid7.
+
+Пересоздание удаляет триггеры FTS и агрегатов и меняет rowid users и
+products, поэтому триггеры удаляются заранее, создаются заново в конце,
+а индексы FTS перестраиваются.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1412cd7d5f74'
+down_revision: Union[str, Sequence[str], None] = '68ee3504652d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Строк в одном UPDATE перевода значений
+BATCH_ROWS = 50_000
+
+# Снимок схемы на момент миграции (не импортируется из src.models, чтобы миграция не менялась вместе с моделями)
+UUID_COLUMNS = {
+    'users': ('id',),
+    'addresses': ('id', 'user_id'),
+    'products': ('id',),
+    'orders': ('id', 'user_id', 'address_id'),
+    'order_items': ('order_id', 'product_id'),
+    'daily_product_sales': ('product_id',),
+}
+
+FTS_COLUMNS = {
+    'products': ('name', 'description'),
+    'users': ('username', 'email'),
+}
+
+# Снимок триггеров агрегатов из 68ee3504652d
+_ADD_STATUS = (
+    "INSERT INTO daily_status_orders (day, status, order_count, revenue) "
+    "VALUES (date(new.order_date), new.status, 1, new.total_price) "
+    "ON CONFLICT (day, status) DO UPDATE SET order_count = order_count + 1, revenue = revenue + excluded.revenue;"
+)
+_SUB_STATUS = (
+    "UPDATE daily_status_orders SET order_count = order_count - 1, revenue = revenue - old.total_price "
+    "WHERE day = date(old.order_date) AND status = old.status; "
+    "DELETE FROM daily_status_orders WHERE day = date(old.order_date) AND status = old.status AND order_count <= 0;"
+)
+_ADD_ORDER_ITEMS = (
+    "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+    "SELECT date(new.order_date), product_id, 1, quantity, quantity * price_at_order FROM order_items WHERE order_id = new.id "
+    "ON CONFLICT (day, product_id) DO UPDATE SET order_count = order_count + 1, "
+    "quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue;"
+)
+_SUB_ORDER_ITEMS = (
+    "UPDATE daily_product_sales SET order_count = order_count - 1, "
+    "quantity = quantity - (SELECT i.quantity FROM order_items i WHERE i.order_id = old.id AND i.product_id = daily_product_sales.product_id), "
+    "revenue = revenue - (SELECT i.quantity * i.price_at_order FROM order_items i WHERE i.order_id = old.id AND i.product_id = daily_product_sales.product_id) "
+    "WHERE day = date(old.order_date) AND product_id IN (SELECT product_id FROM order_items WHERE order_id = old.id); "
+    "DELETE FROM daily_product_sales WHERE day = date(old.order_date) AND order_count <= 0;"
+)
+
+ROLLUP_TRIGGERS = [
+    f"CREATE TRIGGER orders_rollup_ai AFTER INSERT ON orders BEGIN {_ADD_STATUS} END",
+    f"CREATE TRIGGER orders_rollup_au AFTER UPDATE OF status, total_price, order_date ON orders BEGIN {_SUB_STATUS} {_ADD_STATUS} END",
+    f"CREATE TRIGGER orders_rollup_au_day AFTER UPDATE OF order_date ON orders "
+    f"WHEN date(old.order_date) IS NOT date(new.order_date) BEGIN {_SUB_ORDER_ITEMS} {_ADD_ORDER_ITEMS} END",
+    f"CREATE TRIGGER orders_rollup_bd BEFORE DELETE ON orders BEGIN {_SUB_STATUS} {_SUB_ORDER_ITEMS} END",
+    "CREATE TRIGGER order_items_rollup_ai AFTER INSERT ON order_items BEGIN "
+    "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+    "SELECT date(order_date), new.product_id, 1, new.quantity, new.quantity * new.price_at_order FROM orders WHERE id = new.order_id "
+    "ON CONFLICT (day, product_id) DO UPDATE SET order_count = order_count + 1, "
+    "quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue; END",
+    "CREATE TRIGGER order_items_rollup_ad AFTER DELETE ON order_items BEGIN "
+    "UPDATE daily_product_sales SET order_count = order_count - 1, quantity = quantity - old.quantity, "
+    "revenue = revenue - old.quantity * old.price_at_order "
+    "WHERE product_id = old.product_id AND day = (SELECT date(order_date) FROM orders WHERE id = old.order_id); "
+    "DELETE FROM daily_product_sales WHERE product_id = old.product_id AND order_count <= 0; END",
+]
+
+ROLLUP_TRIGGER_NAMES = [
+    'orders_rollup_ai', 'orders_rollup_au', 'orders_rollup_au_day', 'orders_rollup_bd',
+    'order_items_rollup_ai', 'order_items_rollup_ad',
+]
+
+
+def _fts_triggers(table: str, columns: Sequence[str]) -> list:
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.rowid, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.rowid, {new_values});"
+    return [
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _to_blob(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value.replace('-', ''))
+    return value
+
+
+def _to_text(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _drop_triggers() -> None:
+    for name in ROLLUP_TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for table in FTS_COLUMNS:
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+
+
+def _create_triggers() -> None:
+    for table, columns in FTS_COLUMNS.items():
+        for statement in _fts_triggers(table, columns):
+            op.execute(statement)
+        # rowid пересозданной таблицы могли поменяться
+        op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+    for statement in ROLLUP_TRIGGERS:
+        op.execute(statement)
+
+
+def _retype(type_from: sa.types.TypeEngine, type_to: sa.types.TypeEngine, function: str) -> None:
+    bind = op.get_bind()
+    driver_connection = bind.connection.driver_connection
+    driver_connection.create_function("uuid_to_blob", 1, _to_blob, deterministic=True)
+    driver_connection.create_function("uuid_to_text", 1, _to_text, deterministic=True)
+
+    _drop_triggers()
+    for table, columns in UUID_COLUMNS.items():
+        # Сначала значения, потом тип: при пересоздании таблица копируется через CAST,
+        # а CAST между текстом и BLOB не переводит hex в байты и обратно
+        assignments = ", ".join(f"{column} = {function}({column})" for column in columns)
+        last = bind.execute(sa.text(f"SELECT max(rowid) FROM {table}")).scalar() or 0
+        for start in range(0, last, BATCH_ROWS):
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {assignments} WHERE rowid > :start AND rowid <= :end"),
+                {"start": start, "end": start + BATCH_ROWS},
+            )
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=type_from, type_=type_to)
+    _create_triggers()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _retype(sa.Uuid(), sa.LargeBinary(length=16), "uuid_to_blob")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _retype(sa.LargeBinary(length=16), sa.Uuid(), "uuid_to_text")
@@ -0,0 +1,121 @@
+"""агрегаты продаж по дням
+
+Revision ID: 68ee3504652d
+Revises: 41d531f11576
+Create Date: 2026-10-18 05:41:48.627931
+
+Агрегаты поддерживаются триггерами на orders и order_items и заполняются
+из уже существующих заказов. Миграции, пересоздающие orders или order_items
+через batch_alter_table, удаляют триггеры - после них триггеры нужно
+создать заново и выполнить python -m app.rebuild_rollups.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '68ee3504652d'
+down_revision: Union[str, Sequence[str], None] = '41d531f11576'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Снимок триггеров на момент миграции (не импортируется из src.models, чтобы миграция не менялась вместе с моделями)
+_ADD_STATUS = (
+    "INSERT INTO daily_status_orders (day, status, order_count, revenue) "
+    "VALUES (date(new.order_date), new.status, 1, new.total_price) "
+    "ON CONFLICT (day, status) DO UPDATE SET order_count = order_count + 1, revenue = revenue + excluded.revenue;"
+)
+_SUB_STATUS = (
+    "UPDATE daily_status_orders SET order_count = order_count - 1, revenue = revenue - old.total_price "
+    "WHERE day = date(old.order_date) AND status = old.status; "
+    "DELETE FROM daily_status_orders WHERE day = date(old.order_date) AND status = old.status AND order_count <= 0;"
+)
+_ADD_ORDER_ITEMS = (
+    "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+    "SELECT date(new.order_date), product_id, 1, quantity, quantity * price_at_order FROM order_items WHERE order_id = new.id "
+    "ON CONFLICT (day, product_id) DO UPDATE SET order_count = order_count + 1, "
+    "quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue;"
+)
+_SUB_ORDER_ITEMS = (
+    "UPDATE daily_product_sales SET order_count = order_count - 1, "
+    "quantity = quantity - (SELECT i.quantity FROM order_items i WHERE i.order_id = old.id AND i.product_id = daily_product_sales.product_id), "
+    "revenue = revenue - (SELECT i.quantity * i.price_at_order FROM order_items i WHERE i.order_id = old.id AND i.product_id = daily_product_sales.product_id) "
+    "WHERE day = date(old.order_date) AND product_id IN (SELECT product_id FROM order_items WHERE order_id = old.id); "
+    "DELETE FROM daily_product_sales WHERE day = date(old.order_date) AND order_count <= 0;"
+)
+
+ROLLUP_TRIGGERS = [
+    f"CREATE TRIGGER orders_rollup_ai AFTER INSERT ON orders BEGIN {_ADD_STATUS} END",
+    f"CREATE TRIGGER orders_rollup_au AFTER UPDATE OF status, total_price, order_date ON orders BEGIN {_SUB_STATUS} {_ADD_STATUS} END",
+    f"CREATE TRIGGER orders_rollup_au_day AFTER UPDATE OF order_date ON orders "
+    f"WHEN date(old.order_date) IS NOT date(new.order_date) BEGIN {_SUB_ORDER_ITEMS} {_ADD_ORDER_ITEMS} END",
+    f"CREATE TRIGGER orders_rollup_bd BEFORE DELETE ON orders BEGIN {_SUB_STATUS} {_SUB_ORDER_ITEMS} END",
+    "CREATE TRIGGER order_items_rollup_ai AFTER INSERT ON order_items BEGIN "
+    "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+    "SELECT date(order_date), new.product_id, 1, new.quantity, new.quantity * new.price_at_order FROM orders WHERE id = new.order_id "
+    "ON CONFLICT (day, product_id) DO UPDATE SET order_count = order_count + 1, "
+    "quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue; END",
+    "CREATE TRIGGER order_items_rollup_ad AFTER DELETE ON order_items BEGIN "
+    "UPDATE daily_product_sales SET order_count = order_count - 1, quantity = quantity - old.quantity, "
+    "revenue = revenue - old.quantity * old.price_at_order "
+    "WHERE product_id = old.product_id AND day = (SELECT date(order_date) FROM orders WHERE id = old.order_id); "
+    "DELETE FROM daily_product_sales WHERE product_id = old.product_id AND order_count <= 0; END",
+]
+
+ROLLUP_TRIGGER_NAMES = [
+    'orders_rollup_ai', 'orders_rollup_au', 'orders_rollup_au_day', 'orders_rollup_bd',
+    'order_items_rollup_ai', 'order_items_rollup_ad',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('daily_product_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Uuid(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+    with op.batch_alter_table('daily_product_sales', schema=None) as batch_op:
+        batch_op.create_index('ix_daily_product_sales_product_id_day', ['product_id', 'day'], unique=False)
+
+    op.create_table('daily_status_orders',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+    # ### end Alembic commands ###
+
+    # Заполнить агрегаты по уже существующим заказам, затем подключить триггеры
+    op.execute(
+        "INSERT INTO daily_status_orders (day, status, order_count, revenue) "
+        "SELECT date(order_date), status, count(*), sum(total_price) FROM orders GROUP BY date(order_date), status"
+    )
+    op.execute(
+        "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+        "SELECT date(o.order_date), i.product_id, count(*), sum(i.quantity), sum(i.quantity * i.price_at_order) "
+        "FROM order_items i JOIN orders o ON o.id = i.order_id GROUP BY date(o.order_date), i.product_id"
+    )
+    for statement in ROLLUP_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ROLLUP_TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('daily_status_orders')
+    with op.batch_alter_table('daily_product_sales', schema=None) as batch_op:
+        batch_op.drop_index('ix_daily_product_sales_product_id_day')
+
+    op.drop_table('daily_product_sales')
+    # ### end Alembic commands ###
@@ -0,0 +1,82 @@
+"""единый формат order_date для курсоров
+
+Revision ID: 73ca137beafc
+Revises: 05e4128f265e
+Create Date: 2026-10-18 07:52:33.793234
+
+Курсор (order_date, id) сравнивает order_date как текст. Старые строки и
+строки со значением server_default (CURRENT_TIMESTAMP) хранятся с точностью
+до секунды, новые - с микросекундами, и на границе страниц такие строки
+пропускались или повторялись. Миграция приводит существующие значения к
+формату SQLAlchemy 'YYYY-MM-DD HH:MM:SS.ffffff', а триггер - строки,
+вставленные в обход ORM. Триггер агрегатов orders_rollup_au пересоздаётся
+с условием: приведение формата в пределах дня агрегаты не меняет.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '73ca137beafc'
+down_revision: Union[str, Sequence[str], None] = '05e4128f265e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Снимок из src.models на момент миграции
+ORDER_DATE_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+
+
+# Снимок триггеров агрегатов из 1412cd7d5f74
+_ADD_STATUS = (
+    "INSERT INTO daily_status_orders (day, status, order_count, revenue) "
+    "VALUES (date(new.order_date), new.status, 1, new.total_price) "
+    "ON CONFLICT (day, status) DO UPDATE SET order_count = order_count + 1, revenue = revenue + excluded.revenue;"
+)
+_SUB_STATUS = (
+    "UPDATE daily_status_orders SET order_count = order_count - 1, revenue = revenue - old.total_price "
+    "WHERE day = date(old.order_date) AND status = old.status; "
+    "DELETE FROM daily_status_orders WHERE day = date(old.order_date) AND status = old.status AND order_count <= 0;"
+)
+ROLLUP_AU_BEFORE = (
+    f"CREATE TRIGGER orders_rollup_au AFTER UPDATE OF status, total_price, order_date ON orders BEGIN {_SUB_STATUS} {_ADD_STATUS} END"
+)
+ROLLUP_AU_AFTER = (
+    f"CREATE TRIGGER orders_rollup_au AFTER UPDATE OF status, total_price, order_date ON orders "
+    f"WHEN old.status IS NOT new.status OR old.total_price IS NOT new.total_price "
+    f"OR date(old.order_date) IS NOT date(new.order_date) BEGIN {_SUB_STATUS} {_ADD_STATUS} END"
+)
+
+
+def normalized_order_date(value: str) -> str:
+    return (
+        f"replace(substr({value}, 1, 19), 'T', ' ') || CASE WHEN substr({value}, 20, 1) = '.' "
+        f"THEN substr(substr({value}, 20) || '000000', 1, 7) ELSE '.000000' END"
+    )
+
+
+ORDER_DATE_TRIGGER = (
+    f"CREATE TRIGGER orders_order_date_format AFTER INSERT ON orders WHEN new.order_date NOT GLOB '{ORDER_DATE_GLOB}' "
+    f"BEGIN UPDATE orders SET order_date = {normalized_order_date('new.order_date')} WHERE id = new.id; END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS orders_rollup_au")
+    op.execute(ROLLUP_AU_AFTER)
+    # День значения не меняется: с новым условием триггеры агрегатов не срабатывают
+    op.execute(
+        f"UPDATE orders SET order_date = {normalized_order_date('order_date')} "
+        f"WHERE order_date NOT GLOB '{ORDER_DATE_GLOB}'"
+    )
+    op.execute(ORDER_DATE_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Приведённые значения остаются: прежний код читает оба формата
+    op.execute("DROP TRIGGER IF EXISTS orders_order_date_format")
+    op.execute("DROP TRIGGER IF EXISTS orders_rollup_au")
+    op.execute(ROLLUP_AU_BEFORE)
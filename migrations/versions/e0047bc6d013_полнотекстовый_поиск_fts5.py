@@ -0,0 +1,59 @@
+"""полнотекстовый поиск FTS5 по products и users
+
+Revision ID: e0047bc6d013
+Revises: 2fd469833155
+Create Date: 2026-10-18 09:12:41.530118
+
+Индексы хранят только токены (external content) и связаны с таблицами по
+rowid. Миграции, пересоздающие products или users через batch_alter_table,
+удаляют триггеры и меняют rowid - после них триггеры нужно создать заново
+и выполнить 'rebuild'.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0047bc6d013'
+down_revision: Union[str, Sequence[str], None] = '2fd469833155'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Снимок схемы на момент миграции (не импортируется из src.models, чтобы миграция не менялась вместе с моделями)
+FTS_COLUMNS = {
+    'products': ('name', 'description'),
+    'users': ('username', 'email'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in FTS_COLUMNS.items():
+        fts = f"{table}_fts"
+        names = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.rowid, {old_values});"
+        insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.rowid, {new_values});"
+
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='rowid', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END")
+        # Проиндексировать уже существующие строки
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in FTS_COLUMNS:
+        fts = f"{table}_fts"
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
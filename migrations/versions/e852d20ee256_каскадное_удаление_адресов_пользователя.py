@@ -0,0 +1,41 @@
+"""каскадное удаление адресов пользователя
+
+Revision ID: e852d20ee256
+Revises: 95a9c0a25b55
+Create Date: 2026-10-18 07:21:45.395355
+
+Внешний ключ addresses.user_id создан без ON DELETE, а PRAGMA foreign_keys
+включена: удаление пользователя с адресами падало на IntegrityError.
+Ключ безымянный, поэтому batch-пересоздание таблицы получает имя для него
+из naming_convention.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e852d20ee256'
+down_revision: Union[str, Sequence[str], None] = '95a9c0a25b55'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Имя, под которым batch_alter_table видит безымянный внешний ключ addresses.user_id
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+FK_NAME = 'fk_addresses_user_id_users'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('addresses', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(FK_NAME, type_='foreignkey')
+        batch_op.create_foreign_key(FK_NAME, 'users', ['user_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('addresses', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(FK_NAME, type_='foreignkey')
+        batch_op.create_foreign_key(FK_NAME, 'users', ['user_id'], ['id'])
@@ -0,0 +1,340 @@
+"""Генератор синтетических данных для нагрузочных тестов и бенчмарков.
+
+    python -m src.generate --database-url sqlite:///./load.db --users 1000000 \\
+        --products 100000 --orders 5000000 --workers 4 --reset
+
+Строит пользователей, адреса, продукты, заказы и позиции заказов с
+правдоподобными распределениями: популярность продуктов и активность
+пользователей - по Ципфу, число позиций в заказе убывает геометрически,
+заказы распределены по периоду с ростом к его концу и всплеском в выходные,
+статус заказа зависит от его возраста.
+
+Данные детерминированы: строки каждой пачки строятся своим генератором
+случайных чисел от (--seed, таблица, номер пачки), а UUID - хешем от номера
+строки, поэтому заказ ссылается на пользователя и продукты, не видя их пачек.
+С --workers > 1 пачки строят процессы, а вставляет их основной процесс
+по порядку (у SQLite один писатель) - результат тот же, что и без них.
+
+Вставка - Core executemany, по транзакции на пачку; триггеры поиска и
+агрегатов продаж срабатывают как при обычной записи.
+"""
+import argparse
+import bisect
+import hashlib
+import itertools
+import random
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import create_engine, event, func, inspect, select
+
+from src.models import Address, Base, Order, Product, User, order_items
+
+DEFAULT_DATABASE_URL = "sqlite:///./load.db"
+
+# Строк основной таблицы в одной пачке (и одной транзакции)
+CHUNK_SIZE = 50_000
+
+# Число позиций в заказе: 1 - половина заказов, дальше каждая следующая вдвое реже
+ITEM_COUNT_WEIGHTS = (0.5, 0.25, 0.125, 0.0625, 0.0625)
+QUANTITY_WEIGHTS = (0.7, 0.2, 0.1)
+
+# Сколько адресов у пользователя: доли 0, 1, 2 и 3 адресов
+ADDRESS_COUNT_WEIGHTS = (0.1, 0.6, 0.25, 0.05)
+MAX_ADDRESSES = len(ADDRESS_COUNT_WEIGHTS) - 1
+_ADDRESS_COUNT_BOUNDS = list(itertools.accumulate(ADDRESS_COUNT_WEIGHTS))
+
+CITIES = (
+    ("Moscow", "101000"), ("Saint Petersburg", "190000"), ("Novosibirsk", "630000"),
+    ("Yekaterinburg", "620000"), ("Kazan", "420000"), ("Nizhny Novgorod", "603000"),
+    ("Chelyabinsk", "454000"), ("Samara", "443000"), ("Omsk", "644000"), ("Rostov-on-Don", "344000"),
+)
+STREETS = ("Lenina", "Mira", "Sovetskaya", "Gagarina", "Pushkina", "Tsentralnaya", "Sadovaya", "Lesnaya")
+WORDS = (
+    "wireless", "steel", "compact", "organic", "premium", "portable", "classic", "smart", "eco", "pro",
+    "lamp", "kettle", "backpack", "headphones", "chair", "notebook", "blender", "jacket", "speaker", "mug",
+    "for", "home", "office", "travel", "kitchen", "outdoor", "kids", "sport", "garden", "winter",
+)
+
+
+class DatasetSpec:
+    """Размеры и параметры распределений набора данных"""
+
+    def __init__(
+        self,
+        users: int,
+        products: int,
+        orders: int,
+        seed: int = 1,
+        days: int = 365,
+        end_date: date = date(2026, 1, 1),
+        product_skew: float = 1.1,
+        user_skew: float = 0.6,
+        growth: float = 1.0,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.users = users
+        self.products = products
+        self.orders = orders
+        self.seed = seed
+        self.days = days
+        self.end_date = end_date
+        self.product_skew = product_skew
+        self.user_skew = user_skew
+        self.growth = growth
+        self.chunk_size = chunk_size
+
+    @property
+    def start(self) -> datetime:
+        return datetime.combine(self.end_date - timedelta(days=self.days), datetime.min.time())
+
+    def chunks(self, kind: str) -> int:
+        rows = {"users": self.users, "products": self.products, "orders": self.orders}[kind]
+        return -(-rows // self.chunk_size)
+
+
+def entity_id(seed: int, kind: str, index: int) -> uuid.UUID:
+    """UUID строки по её номеру: выглядит случайным, но одинаков в любом процессе"""
+    digest = hashlib.blake2b(f"{kind}:{index}".encode(), digest_size=16, key=str(seed).encode()).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def address_count(user_id: uuid.UUID) -> int:
+    """Число адресов пользователя - из его UUID, чтобы заказу не нужны были пачки адресов"""
+    return bisect.bisect(_ADDRESS_COUNT_BOUNDS, user_id.bytes[0] / 256)
+
+
+def address_id(seed: int, user_index: int, number: int) -> uuid.UUID:
+    return entity_id(seed, "address", user_index * (MAX_ADDRESSES + 1) + number)
+
+
+def pick(rng: random.Random, cum_weights: Sequence[float]) -> int:
+    """Номер, выбранный по накопленным весам (то же, что rng.choices, но без его накладных расходов)"""
+    return min(bisect.bisect(cum_weights, rng.random() * cum_weights[-1]), len(cum_weights) - 1)
+
+
+@lru_cache(maxsize=8)
+def zipf_weights(size: int, skew: float) -> List[float]:
+    """Накопленные веса Ципфа: строка с номером r выбирается с вероятностью ~ 1 / (r + 1) ** skew"""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(size)))
+
+
+@lru_cache(maxsize=4)
+def day_weights(days: int, growth: float, start: datetime) -> List[float]:
+    """Накопленные веса дней периода: линейный рост к концу и в полтора раза больше заказов в выходные"""
+    return list(itertools.accumulate(
+        (1 + growth * day / days) * (1.5 if (start + timedelta(days=day)).weekday() >= 5 else 1.0)
+        for day in range(days)
+    ))
+
+
+@lru_cache(maxsize=4)
+def product_prices(seed: int, products: int) -> List[float]:
+    """Цены продуктов (логнормальные, медиана ~20): нужны и пачкам продуктов, и пачкам заказов"""
+    rng = random.Random(f"{seed}:prices")
+    return [round(min(max(rng.lognormvariate(3.0, 1.0), 0.5), 5000.0), 2) for _ in range(products)]
+
+
+def _chunk_range(spec: DatasetSpec, chunk: int, total: int) -> range:
+    return range(chunk * spec.chunk_size, min((chunk + 1) * spec.chunk_size, total))
+
+
+def build_users(spec: DatasetSpec, chunk: int) -> Dict[str, List[dict]]:
+    rng = random.Random(f"{spec.seed}:users:{chunk}")
+    users, addresses = [], []
+    for index in _chunk_range(spec, chunk, spec.users):
+        user_id = entity_id(spec.seed, "user", index)
+        created_at = spec.start - timedelta(seconds=rng.randrange(365 * 86400))
+        users.append({
+            "id": user_id, "username": f"user{index}", "email": f"user{index}@example.com",
+            "created_at": created_at, "updated_at": created_at,
+        })
+        for number in range(address_count(user_id)):
+            city, zip_code = CITIES[min(int(rng.paretovariate(1.2)) - 1, len(CITIES) - 1)]
+            addresses.append({
+                "id": address_id(spec.seed, index, number), "user_id": user_id,
+                "street": f"{rng.randint(1, 200)} {rng.choice(STREETS)} St", "city": city, "state": "",
+                "zip_code": zip_code, "country": "Russia", "is_primary": number == 0,
+                "created_at": created_at, "updated_at": created_at,
+            })
+    return {"users": users, "addresses": addresses}
+
+
+def build_products(spec: DatasetSpec, chunk: int) -> Dict[str, List[dict]]:
+    rng = random.Random(f"{spec.seed}:products:{chunk}")
+    prices = product_prices(spec.seed, spec.products)
+    products = []
+    for index in _chunk_range(spec, chunk, spec.products):
+        products.append({
+            "id": entity_id(spec.seed, "product", index), "name": f"Product {index}", "price": prices[index],
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(5, 15))),
+            "stock_quantity": rng.randint(0, 1000),
+        })
+    return {"products": products}
+
+
+def order_status(rng: random.Random, age_days: float) -> str:
+    """Статус по возрасту заказа: свежие ещё не оплачены или не отправлены, старые доставлены"""
+    if rng.random() < 0.03:
+        return "cancelled"
+    if age_days < 1:
+        return rng.choice(("pending", "paid"))
+    if age_days < 5:
+        return rng.choice(("paid", "shipped"))
+    return "delivered" if age_days >= 10 or rng.random() < 0.5 else "shipped"
+
+
+def build_orders(spec: DatasetSpec, chunk: int) -> Dict[str, List[dict]]:
+    rng = random.Random(f"{spec.seed}:orders:{chunk}")
+    product_weights = zipf_weights(spec.products, spec.product_skew)
+    user_weights = zipf_weights(spec.users, spec.user_skew)
+    days = day_weights(spec.days, spec.growth, spec.start)
+    prices = product_prices(spec.seed, spec.products)
+    end = spec.start + timedelta(days=spec.days)
+    item_counts = list(itertools.accumulate(ITEM_COUNT_WEIGHTS[:min(len(ITEM_COUNT_WEIGHTS), spec.products)]))
+    quantities = list(itertools.accumulate(QUANTITY_WEIGHTS))
+    orders, items = [], []
+    for index in _chunk_range(spec, chunk, spec.orders):
+        order_id = entity_id(spec.seed, "order", index)
+        user_index = pick(rng, user_weights)
+        user_id = entity_id(spec.seed, "user", user_index)
+        addresses = address_count(user_id)
+        address = None
+        if addresses:
+            # Чаще всего заказ идёт на основной адрес
+            number = 0 if rng.random() < 0.8 else rng.randrange(addresses)
+            address = address_id(spec.seed, user_index, number)
+
+        day = pick(rng, days)
+        order_date = spec.start + timedelta(days=day, microseconds=rng.randrange(86400 * 10**6))
+
+        count = pick(rng, item_counts) + 1
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(pick(rng, product_weights))
+        total = 0.0
+        for product_index in sorted(chosen):
+            quantity = pick(rng, quantities) + 1
+            total += prices[product_index] * quantity
+            items.append({
+                "order_id": order_id, "product_id": entity_id(spec.seed, "product", product_index),
+                "quantity": quantity, "price_at_order": prices[product_index],
+            })
+        orders.append({
+            "id": order_id, "user_id": user_id, "address_id": address, "total_price": round(total, 2),
+            "status": order_status(rng, (end - order_date).total_seconds() / 86400), "order_date": order_date,
+        })
+    return {"orders": orders, "order_items": items}
+
+
+BUILDERS = {"users": build_users, "products": build_products, "orders": build_orders}
+TABLES = {
+    "users": User.__table__, "addresses": Address.__table__, "products": Product.__table__,
+    "orders": Order.__table__, "order_items": order_items,
+}
+
+
+def _build(task: tuple) -> Dict[str, List[dict]]:
+    spec, kind, chunk = task
+    return BUILDERS[kind](spec, chunk)
+
+
+def iter_chunks(spec: DatasetSpec, kind: str, pool: Optional[ProcessPoolExecutor], window: int) -> Iterator[Dict[str, List[dict]]]:
+    """Пачки таблицы по порядку; с пулом процессов вперёд строится не больше window пачек"""
+    tasks = ((spec, kind, chunk) for chunk in range(spec.chunks(kind)))
+    if pool is None:
+        yield from map(_build, tasks)
+        return
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(_build, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _fast_load_pragmas(dbapi_connection, connection_record) -> None:
+    # Набор данных можно построить заново, поэтому fsync на каждую пачку не нужен
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA cache_size=-262144")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def generate(database_url: str, spec: DatasetSpec, workers: int = 1, reset: bool = False,
+             progress: bool = False) -> Dict[str, int]:
+    """Записать набор данных в БД; возвращает число вставленных строк по таблицам"""
+    engine = create_engine(database_url)
+    event.listen(engine, "connect", _fast_load_pragmas)
+    if reset:
+        Base.metadata.drop_all(engine)
+    # Схему существующей БД (например, созданной миграциями) не трогаем
+    if not inspect(engine).has_table(User.__tablename__):
+        Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        filled = [table.name for table in TABLES.values() if conn.execute(select(func.count()).select_from(table)).scalar()]
+    if filled:
+        engine.dispose()
+        raise ValueError(f"Tables are not empty: {', '.join(filled)}; use --reset to rebuild the dataset")
+
+    counts = dict.fromkeys(TABLES, 0)
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for kind in ("users", "products", "orders"):
+            started = time.perf_counter()
+            for chunk in iter_chunks(spec, kind, pool, window=2 * workers):
+                with engine.begin() as conn:
+                    for name, rows in chunk.items():
+                        if rows:
+                            conn.execute(TABLES[name].insert(), rows)
+                        counts[name] += len(rows)
+            if progress:
+                print(f"{kind}: done in {time.perf_counter() - started:.1f} s", flush=True)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        engine.dispose()
+    return counts
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Синтетический набор данных для нагрузочных тестов")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1, help="один seed - один и тот же набор данных")
+    parser.add_argument("--days", type=int, default=365, help="период заказов в днях")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date(2026, 1, 1), help="конец периода заказов")
+    parser.add_argument("--product-skew", type=float, default=1.1, help="показатель Ципфа популярности продуктов")
+    parser.add_argument("--user-skew", type=float, default=0.6, help="показатель Ципфа активности пользователей")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="строк в пачке и транзакции")
+    parser.add_argument("--workers", type=int, default=1, help="процессов, строящих пачки")
+    parser.add_argument("--reset", action="store_true", help="пересоздать таблицы перед генерацией")
+    args = parser.parse_args(argv)
+    if min(args.users, args.products, args.days, args.chunk_size, args.workers) < 1 or args.orders < 0:
+        parser.error("sizes, --days, --chunk-size and --workers must be positive")
+
+    spec = DatasetSpec(
+        users=args.users, products=args.products, orders=args.orders, seed=args.seed, days=args.days,
+        end_date=args.end_date, product_skew=args.product_skew, user_skew=args.user_skew,
+        chunk_size=args.chunk_size,
+    )
+    started = time.perf_counter()
+    try:
+        counts = generate(args.database_url, spec, workers=args.workers, reset=args.reset, progress=True)
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(", ".join(f"{name}: {count}" for name, count in counts.items()), f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
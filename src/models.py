@@ -1,5 +1,8 @@
+import os
+import threading
+import time
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 
 import sqlalchemy as sa
@@ -13,14 +16,86 @@ from sqlalchemy.orm import (
     relationship,
 )
 
-Base = declarative_base()
+
+# -----------------------------------------------------------------
+# Ключи: UUIDv7 в 16-байтовом BLOB
+# -----------------------------------------------------------------
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)
+
+
+def uuid7() -> uuid.UUID:
+    """UUID версии 7 (RFC 9562): 48 бит миллисекунд Unix-времени, затем случайные биты.
+
+    Ключи растут со временем, поэтому новые строки дописываются в правый край
+    B-дерева первичного ключа и индексов с ним, а не разбрасываются по всему
+    дереву, как uuid4. Внутри одной миллисекунды 12 бит rand_a работают как
+    счётчик от случайного начала - ключи процесса строго возрастают.
+    """
+    global _uuid7_last
+    with _uuid7_lock:
+        millis = time.time_ns() // 1_000_000
+        last_millis, last_counter = _uuid7_last
+        if millis > last_millis:
+            counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            # Та же миллисекунда (или часы отстали): продолжаем последовательность
+            millis, counter = last_millis, last_counter + 1
+            if counter > 0xFFF:
+                millis, counter = millis + 1, 0
+        _uuid7_last = (millis, counter)
+    value = (millis & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | counter << 64
+    value |= 0b10 << 62 | int.from_bytes(os.urandom(8), "big") & 0x3FFF_FFFF_FFFF_FFFF
+    return uuid.UUID(int=value)
+
+
+class BinaryUUID(sa.types.TypeDecorator):
+    """UUID в 16-байтовом BLOB вместо 32-символьного CHAR(32) у sa.Uuid на SQLite.
+
+    Ключ и каждая ссылка на него вдвое короче, а порядок байтов совпадает с
+    порядком UUID, так что сортировка и диапазоны по ключу не меняются.
+    """
+
+    impl = sa.LargeBinary(16)
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return uuid.UUID
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return uuid.UUID(bytes=bytes(value))
+
+    def literal_processor(self, dialect):
+        # literal_binds (EXPLAIN в тестах, offline-миграции): BLOB-литерал X'...'
+        def process(value):
+            return "NULL" if value is None else f"X'{self.process_bind_param(value, dialect).hex()}'"
+        return process
+
+
+# Все Mapped[uuid.UUID] (ключи, внешние ключи, order_items через ForeignKey) хранятся как BinaryUUID
+Base = declarative_base(type_annotation_map={uuid.UUID: BinaryUUID})
+
+# Все связи по умолчанию lazy="raise": AsyncSession не умеет подгружать их
+# неявно при обращении к атрибуту, а N+1 по строкам страницы должен падать
+# сразу. Нужные связи репозитории загружают явно через selectinload.
 
 class User(Base):
     __tablename__ = 'users'
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
     username: Mapped[str] = mapped_column(nullable=False, unique=True)
     email: Mapped[str] = mapped_column(nullable=False, unique=True)
@@ -34,11 +109,13 @@ class User(Base):
     # -----------------------------------------------------------------
     orders: Mapped[List["Order"]] = relationship(
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="raise"
     )
     addresses: Mapped[List["Address"]] = relationship(
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="raise"
     )
 
 class Address(Base):
@@ -46,9 +123,9 @@ class Address(Base):
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('users.id'), nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     street: Mapped[str] = mapped_column(nullable=False)
     city: Mapped[str] = mapped_column(nullable=False)
     state: Mapped[str] = mapped_column()
@@ -62,10 +139,11 @@ class Address(Base):
     # -----------------------------------------------------------------
     # Связи
     # -----------------------------------------------------------------
-    user: Mapped["User"] = relationship(back_populates="addresses")
+    user: Mapped["User"] = relationship(back_populates="addresses", lazy="raise")
     orders: Mapped[List["Order"]] = relationship(
         back_populates="address",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="raise"
     )
 
 class Product(Base):
@@ -73,19 +151,23 @@ class Product(Base):
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
     name: Mapped[str] = mapped_column(nullable=False, unique=True)
-    price: Mapped[float] = mapped_column(nullable=False)
+    price: Mapped[float] = mapped_column(nullable=False, index=True)  # фильтры min_price / max_price
     description: Mapped[Optional[str]] = mapped_column(sa.Text, nullable=True)
     stock_quantity: Mapped[int] = mapped_column(nullable=False, default=0)
 
     # -----------------------------------------------------------------
     # Связи
     # -----------------------------------------------------------------
+    # Только для чтения: позиции заказа записываются через OrderItem
     orders: Mapped[List["Order"]] = relationship(
-        back_populates="product",
-        cascade="all, delete-orphan"
+        "Order",
+        secondary="order_items",
+        back_populates="products",
+        viewonly=True,
+        lazy="raise"
     )
 
 
@@ -96,23 +178,33 @@ order_items = sa.Table(
     sa.Column('order_id', sa.ForeignKey('orders.id', ondelete='CASCADE'), primary_key=True),
     sa.Column('product_id', sa.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True),
     sa.Column('quantity', sa.Integer, nullable=False, default=1),
-    sa.Column('price_at_order', sa.Float, nullable=False)  # цена продукта на момент заказа
+    sa.Column('price_at_order', sa.Float, nullable=False),  # цена продукта на момент заказа
+    # Первичный ключ начинается с order_id; для поиска заказов продукта и каскада при его удалении
+    sa.Index('ix_order_items_product_id', 'product_id'),
 )
 
 
 class Order(Base):
     __tablename__ = 'orders'
+    # Индексы повторяют запросы списка заказов: фильтр по равенству,
+    # затем ключ сортировки курсорной пагинации (order_date, id)
+    __table_args__ = (
+        sa.Index('ix_orders_order_date_id', 'order_date', 'id'),
+        sa.Index('ix_orders_user_id_order_date_id', 'user_id', 'order_date', 'id'),
+        sa.Index('ix_orders_status_order_date_id', 'status', 'order_date', 'id'),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
     user_id: Mapped[uuid.UUID] = mapped_column(
         sa.ForeignKey('users.id', ondelete='CASCADE')
     )
     address_id: Mapped[uuid.UUID] = mapped_column(
         sa.ForeignKey('addresses.id', ondelete='SET NULL'),
-        nullable=True   # адрес может быть удалён, но заказ останется
+        nullable=True,   # адрес может быть удалён, но заказ останется
+        index=True,
     )
 
     total_price: Mapped[float] = mapped_column(nullable=False, default=0.0)  # общая цена заказа
@@ -125,6 +217,7 @@ class Order(Base):
 
     order_date: Mapped[datetime] = mapped_column(
     sa.DateTime(),
+    default=datetime.now,           # единый формат с микросекундами - важно для курсоров
     server_default=sa.func.now(),   # автоматически ставит CURRENT_TIMESTAMP
     nullable=False
     )
@@ -132,10 +225,274 @@ class Order(Base):
     # -----------------------------------------------------------------
     # Связи
     # -----------------------------------------------------------------
-    user: Mapped["User"] = relationship(back_populates="orders")
-    address: Mapped[Optional["Address"]] = relationship(back_populates="orders")
+    user: Mapped["User"] = relationship(back_populates="orders", lazy="raise")
+    address: Mapped[Optional["Address"]] = relationship(back_populates="orders", lazy="raise")
+    # Позиции удаляются каскадом в БД (ON DELETE CASCADE), ORM их для этого не загружает
+    items: Mapped[List["OrderItem"]] = relationship(
+        back_populates="order",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise"
+    )
     products: Mapped[List["Product"]] = relationship(
         "Product",
         secondary="order_items",
-        back_populates="orders"
-    )
\ No newline at end of file
+        back_populates="orders",
+        viewonly=True,
+        lazy="raise"
+    )
+
+
+class OrderItem(Base):
+    """Позиция заказа - строка промежуточной таблицы order_items"""
+    __table__ = order_items
+
+    order: Mapped["Order"] = relationship(back_populates="items", lazy="raise")
+    product: Mapped["Product"] = relationship(lazy="raise")
+
+
+# -----------------------------------------------------------------
+# Агрегаты продаж для аналитики
+# -----------------------------------------------------------------
+class DailyProductSales(Base):
+    """Продажи продукта за день: заказы, штуки и выручка по позициям заказов"""
+    __tablename__ = 'daily_product_sales'
+    __table_args__ = (
+        sa.Index('ix_daily_product_sales_product_id_day', 'product_id', 'day'),
+    )
+
+    day: Mapped[date] = mapped_column(sa.Date, primary_key=True)
+    product_id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    order_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    quantity: Mapped[int] = mapped_column(nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(nullable=False, default=0.0)
+
+
+class DailyStatusOrders(Base):
+    """Заказы за день в разрезе статуса: количество и сумма total_price"""
+    __tablename__ = 'daily_status_orders'
+
+    day: Mapped[date] = mapped_column(sa.Date, primary_key=True)
+    status: Mapped[str] = mapped_column(sa.String(50), primary_key=True)
+    order_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(nullable=False, default=0.0)
+
+
+# -----------------------------------------------------------------
+# Счётчики строк для итогов пагинации (include_total)
+# -----------------------------------------------------------------
+class TableRowCount(Base):
+    """Число строк таблицы (users, products, orders)"""
+    __tablename__ = 'table_row_counts'
+
+    table_name: Mapped[str] = mapped_column(sa.String(50), primary_key=True)
+    row_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class StatusOrderCount(Base):
+    """Число заказов в статусе"""
+    __tablename__ = 'status_order_counts'
+
+    status: Mapped[str] = mapped_column(sa.String(50), primary_key=True)
+    order_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class UserOrderCount(Base):
+    """Число заказов пользователя; пользователя без заказов в таблице нет"""
+    __tablename__ = 'user_order_counts'
+
+    user_id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    order_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+# -----------------------------------------------------------------
+# Фоновые задачи
+# -----------------------------------------------------------------
+class Job(Base):
+    """Фоновая задача: вид, параметры, состояние выполнения и результат - см. app/jobs.py"""
+    __tablename__ = 'jobs'
+    # Выбор следующей задачи: queued с наступившим run_after, по порядку run_after
+    __table_args__ = (
+        sa.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True,
+        default=uuid7
+    )
+    kind: Mapped[str] = mapped_column(sa.String(100), nullable=False)
+    params: Mapped[dict] = mapped_column(sa.JSON, nullable=False, default=dict)
+    # queued -> running -> succeeded | failed; при повторе running -> queued с отложенным run_after
+    status: Mapped[str] = mapped_column(sa.String(20), nullable=False, default='queued')
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(nullable=False, default=5)
+    run_after: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now)
+    result: Mapped[Optional[dict]] = mapped_column(sa.JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(sa.Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+# Агрегаты поддерживаются триггерами в той же транзакции, что и изменение
+# заказа, включая каскадные удаления (пользователя, продукта). Порядок важен:
+# BEFORE DELETE на orders вычитает позиции, пока они ещё есть, а AFTER DELETE
+# на order_items срабатывает при каскаде уже без строки заказа и ничего не делает.
+_ADD_STATUS = (
+    "INSERT INTO daily_status_orders (day, status, order_count, revenue) "
+    "VALUES (date(new.order_date), new.status, 1, new.total_price) "
+    "ON CONFLICT (day, status) DO UPDATE SET order_count = order_count + 1, revenue = revenue + excluded.revenue;"
+)
+_SUB_STATUS = (
+    "UPDATE daily_status_orders SET order_count = order_count - 1, revenue = revenue - old.total_price "
+    "WHERE day = date(old.order_date) AND status = old.status; "
+    "DELETE FROM daily_status_orders WHERE day = date(old.order_date) AND status = old.status AND order_count <= 0;"
+)
+_ADD_ORDER_ITEMS = (
+    "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+    "SELECT date(new.order_date), product_id, 1, quantity, quantity * price_at_order FROM order_items WHERE order_id = new.id "
+    "ON CONFLICT (day, product_id) DO UPDATE SET order_count = order_count + 1, "
+    "quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue;"
+)
+_SUB_ORDER_ITEMS = (
+    "UPDATE daily_product_sales SET order_count = order_count - 1, "
+    "quantity = quantity - (SELECT i.quantity FROM order_items i WHERE i.order_id = old.id AND i.product_id = daily_product_sales.product_id), "
+    "revenue = revenue - (SELECT i.quantity * i.price_at_order FROM order_items i WHERE i.order_id = old.id AND i.product_id = daily_product_sales.product_id) "
+    "WHERE day = date(old.order_date) AND product_id IN (SELECT product_id FROM order_items WHERE order_id = old.id); "
+    "DELETE FROM daily_product_sales WHERE day = date(old.order_date) AND order_count <= 0;"
+)
+
+ROLLUP_TRIGGERS = [
+    f"CREATE TRIGGER orders_rollup_ai AFTER INSERT ON orders BEGIN {_ADD_STATUS} END",
+    # Смена order_date в пределах дня (приведение формата) агрегаты не трогает
+    f"CREATE TRIGGER orders_rollup_au AFTER UPDATE OF status, total_price, order_date ON orders "
+    f"WHEN old.status IS NOT new.status OR old.total_price IS NOT new.total_price "
+    f"OR date(old.order_date) IS NOT date(new.order_date) BEGIN {_SUB_STATUS} {_ADD_STATUS} END",
+    f"CREATE TRIGGER orders_rollup_au_day AFTER UPDATE OF order_date ON orders "
+    f"WHEN date(old.order_date) IS NOT date(new.order_date) BEGIN {_SUB_ORDER_ITEMS} {_ADD_ORDER_ITEMS} END",
+    f"CREATE TRIGGER orders_rollup_bd BEFORE DELETE ON orders BEGIN {_SUB_STATUS} {_SUB_ORDER_ITEMS} END",
+    "CREATE TRIGGER order_items_rollup_ai AFTER INSERT ON order_items BEGIN "
+    "INSERT INTO daily_product_sales (day, product_id, order_count, quantity, revenue) "
+    "SELECT date(order_date), new.product_id, 1, new.quantity, new.quantity * new.price_at_order FROM orders WHERE id = new.order_id "
+    "ON CONFLICT (day, product_id) DO UPDATE SET order_count = order_count + 1, "
+    "quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue; END",
+    "CREATE TRIGGER order_items_rollup_ad AFTER DELETE ON order_items BEGIN "
+    "UPDATE daily_product_sales SET order_count = order_count - 1, quantity = quantity - old.quantity, "
+    "revenue = revenue - old.quantity * old.price_at_order "
+    "WHERE product_id = old.product_id AND day = (SELECT date(order_date) FROM orders WHERE id = old.order_id); "
+    "DELETE FROM daily_product_sales WHERE product_id = old.product_id AND order_count <= 0; END",
+]
+
+for _statement in ROLLUP_TRIGGERS:
+    sa.event.listen(Base.metadata, 'after_create', sa.DDL(_statement).execute_if(dialect='sqlite'))
+
+# order_date хранится текстом в одном формате 'YYYY-MM-DD HH:MM:SS.ffffff' (так пишет
+# SQLAlchemy): курсор (order_date, id) сравнивает строки, и значение без микросекунд
+# из server_default (CURRENT_TIMESTAMP) встало бы не на своё место среди остальных.
+# Триггер приводит к этому формату строки, вставленные в обход ORM
+ORDER_DATE_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+
+
+def normalized_order_date(value: str) -> str:
+    """SQL-выражение: значение value в формате ORDER_DATE_GLOB (без микросекунд или с 'T' - дополняется)"""
+    return (
+        f"replace(substr({value}, 1, 19), 'T', ' ') || CASE WHEN substr({value}, 20, 1) = '.' "
+        f"THEN substr(substr({value}, 20) || '000000', 1, 7) ELSE '.000000' END"
+    )
+
+
+ORDER_DATE_TRIGGER = (
+    f"CREATE TRIGGER orders_order_date_format AFTER INSERT ON orders WHEN new.order_date NOT GLOB '{ORDER_DATE_GLOB}' "
+    f"BEGIN UPDATE orders SET order_date = {normalized_order_date('new.order_date')} WHERE id = new.id; END"
+)
+sa.event.listen(Base.metadata, 'after_create', sa.DDL(ORDER_DATE_TRIGGER).execute_if(dialect='sqlite'))
+
+# Счётчики тоже поддерживаются триггерами, в том числе при каскадных удалениях;
+# строка со счётчиком 0 удаляется, отсутствующая строка означает 0
+def _count_change(table: str, key_column: str, key: str, delta: int, count_column: str) -> str:
+    if delta > 0:
+        return (
+            f"INSERT INTO {table} ({key_column}, {count_column}) VALUES ({key}, 1) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET {count_column} = {count_column} + 1;"
+        )
+    return (
+        f"UPDATE {table} SET {count_column} = {count_column} - 1 WHERE {key_column} = {key}; "
+        f"DELETE FROM {table} WHERE {key_column} = {key} AND {count_column} <= 0;"
+    )
+
+
+def count_triggers() -> List[str]:
+    """Триггеры счётчиков table_row_counts, status_order_counts и user_order_counts"""
+    statements = []
+    for table in ('users', 'products', 'orders'):
+        row = f"'{table}'"
+        inserted = [_count_change('table_row_counts', 'table_name', row, 1, 'row_count')]
+        deleted = [_count_change('table_row_counts', 'table_name', row, -1, 'row_count')]
+        if table == 'orders':
+            inserted += [
+                _count_change('status_order_counts', 'status', 'new.status', 1, 'order_count'),
+                _count_change('user_order_counts', 'user_id', 'new.user_id', 1, 'order_count'),
+            ]
+            deleted += [
+                _count_change('status_order_counts', 'status', 'old.status', -1, 'order_count'),
+                _count_change('user_order_counts', 'user_id', 'old.user_id', -1, 'order_count'),
+            ]
+        statements += [
+            f"CREATE TRIGGER {table}_count_ai AFTER INSERT ON {table} BEGIN {' '.join(inserted)} END",
+            f"CREATE TRIGGER {table}_count_ad AFTER DELETE ON {table} BEGIN {' '.join(deleted)} END",
+        ]
+    statements += [
+        "CREATE TRIGGER orders_count_au_status AFTER UPDATE OF status ON orders WHEN old.status IS NOT new.status BEGIN "
+        f"{_count_change('status_order_counts', 'status', 'old.status', -1, 'order_count')} "
+        f"{_count_change('status_order_counts', 'status', 'new.status', 1, 'order_count')} END",
+        "CREATE TRIGGER orders_count_au_user AFTER UPDATE OF user_id ON orders WHEN old.user_id IS NOT new.user_id BEGIN "
+        f"{_count_change('user_order_counts', 'user_id', 'old.user_id', -1, 'order_count')} "
+        f"{_count_change('user_order_counts', 'user_id', 'new.user_id', 1, 'order_count')} END",
+    ]
+    return statements
+
+
+for _statement in count_triggers():
+    sa.event.listen(Base.metadata, 'after_create', sa.DDL(_statement).execute_if(dialect='sqlite'))
+
+# -----------------------------------------------------------------
+# Полнотекстовый поиск (SQLite FTS5)
+# -----------------------------------------------------------------
+# Таблица -> индексируемые столбцы. Индекс {table}_fts хранит только токены
+# (external content) и синхронизируется триггерами на вставку, удаление и
+# изменение индексируемых столбцов. Строки связаны по rowid, который SQLite
+# может перенумеровать при VACUUM, - после него индекс перестраивается через
+# INSERT INTO {table}_fts({table}_fts) VALUES('rebuild').
+FTS_COLUMNS = {
+    'products': ('name', 'description'),
+    'users': ('username', 'email'),
+}
+
+
+def fts_ddl(table: str, columns: tuple) -> List[str]:
+    """DDL виртуальной таблицы FTS5 и триггеров синхронизации для таблицы"""
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    delete_old = (
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.rowid, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.rowid, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        # Только при изменении индексируемых столбцов: списание остатков индекс не трогает
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+for _table, _columns in FTS_COLUMNS.items():
+    for _statement in fts_ddl(_table, _columns):
+        sa.event.listen(Base.metadata.tables[_table], 'after_create', sa.DDL(_statement).execute_if(dialect='sqlite'))
+    sa.event.listen(
+        Base.metadata.tables[_table],
+        'before_drop',
+        sa.DDL(f"DROP TABLE IF EXISTS {_table}_fts").execute_if(dialect='sqlite'),
+    )
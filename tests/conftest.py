@@ -1,9 +1,21 @@
+from contextlib import contextmanager
+from typing import Optional
+
 import pytest
-from litestar.testing import TestClient
+from litestar.di import Provide
+from litestar.testing import TestClient, create_test_client
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from src.models import Base
+from app.database import configure_sqlite
+from app.metrics import attach_statement_metrics
+from app.query_budget import REPEAT_THRESHOLD, count_queries
+from app.writer import GroupCommitWriter
 from app.main import app  # предполагаем, что у вас есть app в main.py
+from app.controllers.user_controller import UserController
+from app.controllers.product_controller import ProductController
+from app.controllers.order_controller import OrderController
 from app.repositories.user_repository import UserRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.order_repository import OrderRepository
@@ -15,7 +27,8 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 @pytest.fixture(scope="session")
 def engine():
-    return create_async_engine(TEST_DATABASE_URL, echo=True)
+    # Те же PRAGMA, что и в приложении (внешние ключи, WAL); fsync тестам не нужен
+    return configure_sqlite(create_async_engine(TEST_DATABASE_URL, echo=True), "throughput")
 
 
 @pytest.fixture(scope="session")
@@ -37,21 +50,91 @@ async def session(engine, tables):
         yield session
 
 
+@pytest.fixture
+def assert_max_queries():
+    """Бюджет запросов блока: with assert_max_queries(2): ...
+
+    Падает, если запросов к данным больше limit или один SELECT повторён
+    max_repeats+1 раз и больше (признак N+1); max_repeats=None отключает
+    проверку повторов. Учитываются запросы текущего контекста, поэтому
+    запросы приложения внутри TestClient (отдельный поток) не видны.
+    """
+    @contextmanager
+    def check(limit: int, max_repeats: Optional[int] = REPEAT_THRESHOLD - 1):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= limit, f"expected at most {limit} queries, got {counter.report()}"
+        if max_repeats is not None:
+            repeated = counter.repeated(max_repeats + 1)
+            assert not repeated, f"repeated statements (possible N+1): {repeated}\n{counter.report()}"
+
+    return check
+
+
 @pytest.fixture
 def user_repository(session):
-    return UserRepository(session)
+    return UserRepository()
 
 
 @pytest.fixture
 def product_repository(session):
-    return ProductRepository(session)
+    return ProductRepository()
 
 
 @pytest.fixture
 def order_repository(session):
-    return OrderRepository(session)
+    return OrderRepository()
 
 
 @pytest.fixture
 def client():
-    return TestClient(app=app)
\ No newline at end of file
+    return TestClient(app=app)
+
+
+@pytest.fixture
+def api_session_factory(tables):
+    """Фабрика сессий приложения на тестовой базе вместо data.db"""
+    # Явные BEGIN нужны задаче записи: она изолирует запросы точками сохранения
+    test_engine = configure_sqlite(
+        create_async_engine(TEST_DATABASE_URL, poolclass=NullPool), "throughput", begin="DEFERRED"
+    )
+    # Как и в приложении, запросы попадают в метрики /metrics
+    attach_statement_metrics(test_engine, "test")
+    return sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def api_writer(api_session_factory):
+    """Единственная задача записи тестового приложения"""
+    return GroupCommitWriter(api_session_factory)
+
+
+@pytest.fixture
+def api_dependencies(api_session_factory, api_writer):
+    """Зависимости приложения, где сессия БД указывает на тестовую базу вместо data.db"""
+    async def provide_test_db_session():
+        async with api_session_factory() as session:
+            yield session
+
+    async def provide_test_db_session_factory():
+        return api_session_factory
+
+    async def provide_test_writer():
+        return api_writer
+
+    return {
+        **app.dependencies,
+        "db_session": Provide(provide_test_db_session),
+        "db_session_factory": Provide(provide_test_db_session_factory),
+        "writer": Provide(provide_test_writer),
+    }
+
+
+@pytest.fixture
+def api_client(api_dependencies):
+    """Клиент приложения, работающий с тестовой базой"""
+    with create_test_client(
+        route_handlers=[UserController, ProductController, OrderController],
+        dependencies=api_dependencies,
+    ) as client:
+        yield client
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+from litestar.testing import create_test_client
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.controllers.analytics_controller import AnalyticsController
+from app.database import configure_sqlite
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.user import UserCreate
+from app.services.analytics_service import AnalyticsService
+from app.writer import GroupCommitWriter
+from src.models import DailyProductSales, DailyStatusOrders, Order
+
+
+async def _snapshot(session: AsyncSession) -> dict:
+    """Содержимое обеих таблиц агрегатов (выручка округлена: суммы с плавающей точкой)"""
+    statuses = await session.execute(select(DailyStatusOrders))
+    products = await session.execute(select(DailyProductSales))
+    return {
+        "statuses": sorted((r.day, r.status, r.order_count, round(r.revenue, 6)) for r in statuses.scalars()),
+        "products": sorted((r.day, str(r.product_id), r.order_count, r.quantity, round(r.revenue, 6)) for r in products.scalars()),
+    }
+
+
+async def _assert_matches_rebuild(session: AsyncSession) -> None:
+    """Агрегаты, обновлённые триггерами, совпадают с пересчётом с нуля"""
+    repository = AnalyticsRepository()
+    incremental = await _snapshot(session)
+    first, last = await repository.day_bounds(session)
+    if first is not None:
+        await repository.rebuild_days(session, first, last)
+    assert await _snapshot(session) == incremental
+
+
+@pytest.fixture
+async def writer(engine, tables):
+    writer_engine = configure_sqlite(create_async_engine(engine.url, poolclass=NullPool), "throughput", begin="DEFERRED")
+    writer = GroupCommitWriter(sessionmaker(writer_engine, class_=AsyncSession, expire_on_commit=False))
+    yield writer
+    await writer.stop()
+    await writer_engine.dispose()
+
+
+class TestSalesRollups:
+    @pytest.mark.asyncio
+    async def test_rollups_follow_order_changes(self, session):
+        """Тест агрегатов: создание, смена статуса и даты, удаление заказа и каскады продукта и пользователя"""
+        users, products, orders = UserRepository(), ProductRepository(), OrderRepository()
+        user = await users.create(session, UserCreate(username="rollup_user", email="rollup@example.com"))
+        keyboard = await products.create(session, name="Rollup Keyboard", price=50.0, stock_quantity=100)
+        mouse = await products.create(session, name="Rollup Mouse", price=20.0, stock_quantity=100)
+
+        first = await orders.create(session, user.id, items=[
+            {"product_id": keyboard.id, "quantity": 2},
+            {"product_id": mouse.id, "quantity": 1},
+        ])
+        second = await orders.create(session, user.id, items=[{"product_id": mouse.id, "quantity": 3}])
+        await _assert_matches_rebuild(session)
+
+        rows = await AnalyticsRepository().product_by_day(session, keyboard.id)
+        assert [(row.order_count, row.quantity, row.revenue) for row in rows] == [(1, 2, 100.0)]
+
+        await orders.update(session, first.id, status="shipped", total_price=115.0)
+        await session.execute(update(Order).where(Order.id == second.id).values(order_date=datetime(2020, 1, 1, 12)))
+        await _assert_matches_rebuild(session)
+
+        await products.delete(session, keyboard.id)
+        await _assert_matches_rebuild(session)
+        await orders.delete(session, second.id)
+        await _assert_matches_rebuild(session)
+        await users.delete(session, user.id)
+        await _assert_matches_rebuild(session)
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_rebuild_restores_rollups_in_batches(self, session, writer, api_dependencies):
+        """Тест пересчёта: агрегаты, потерянные целиком, восстанавливаются пачками по дням"""
+        user = await UserRepository().create(session, UserCreate(username="rebuild_user", email="rebuild@example.com"))
+        product = await ProductRepository().create(session, name="Rebuild Product", price=10.0, stock_quantity=10)
+        orders = OrderRepository()
+        for day in (1, 2, 5):
+            order = await orders.create(session, user.id, items=[{"product_id": product.id, "quantity": 1}])
+            await session.execute(update(Order).where(Order.id == order.id).values(order_date=datetime(2021, 3, day)))
+        await session.commit()
+        expected = await _snapshot(session)
+
+        await session.execute(DailyStatusOrders.__table__.delete())
+        await session.execute(DailyProductSales.__table__.delete())
+        await session.commit()
+
+        batches = await AnalyticsService(AnalyticsRepository()).rebuild(writer, batch_days=2)
+        assert batches >= 3
+        assert await _snapshot(session) == expected
+
+        with create_test_client(route_handlers=[AnalyticsController], dependencies=api_dependencies) as client:
+            response = client.get("/analytics/revenue", params={"date_from": "2021-03-01", "date_to": "2021-03-31"})
+        assert response.status_code == 200
+        assert [(row["day"], row["order_count"], row["revenue"]) for row in response.json()] == [
+            ("2021-03-01", 1, 10.0), ("2021-03-02", 1, 10.0), ("2021-03-05", 1, 10.0),
+        ]
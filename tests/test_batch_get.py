@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.batch import MAX_BATCH_IDS
+from app.schemas.user import UserCreate
+from app.services.order_service import OrderService
+
+
+class TestBatchGet:
+    @pytest.mark.asyncio
+    async def test_orders_by_ids_in_request_order(self, engine, tables, assert_max_queries):
+        """Тест: заказы по списку id - один SELECT заказов и один позиций, порядок запроса, None для ненайденных"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        order_service = OrderService(OrderRepository(), UserRepository(), ProductRepository())
+        async with session_factory() as session:
+            user = await UserRepository().create(session, UserCreate(username="batch_user", email="batch@example.com"))
+            pen = await ProductRepository().create(session, name="Batch Pen", price=2.0, stock_quantity=100)
+            orders = [
+                await OrderRepository().create(session, user.id, items=[{"product_id": pen.id, "quantity": n + 1}])
+                for n in range(3)
+            ]
+            await session.commit()
+
+        missing = uuid.uuid4()
+        requested = [orders[2].id, missing, orders[0].id, orders[2].id]
+        with assert_max_queries(2):
+            async with session_factory() as session:
+                records = await order_service.get_records_by_ids(session, requested)
+
+        assert [record and record.id for record in records] == [orders[2].id, None, orders[0].id, orders[2].id]
+        assert [item.quantity for item in records[0].items] == [3]
+
+
+def test_products_by_ids_api(api_client):
+    """Тест: GET /products?ids= и POST /products/lookup отдают продукты в порядке запроса и список ненайденных"""
+    ids = [api_client.post("/products", json={"name": f"Batch Api {n}", "price": 1.0}).json()["id"] for n in range(3)]
+    missing = str(uuid.uuid4())
+    requested = [ids[2], missing, ids[0]]
+
+    response = api_client.get("/products", params={"ids": ",".join(requested)})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item and item["id"] for item in body["items"]] == [ids[2], None, ids[0]]
+    assert body["missing"] == [missing]
+
+    response = api_client.post("/products/lookup", json={"ids": requested})
+    assert response.status_code == 200
+    assert response.json() == body
+
+    assert api_client.get("/products", params={"ids": f"{ids[0]},broken"}).status_code == 400
+    assert api_client.post("/products/lookup", json={"ids": [missing] * (MAX_BATCH_IDS + 1)}).status_code == 400
+
+
+def test_users_and_orders_by_ids_api(api_client):
+    """Тест: пакетное чтение пользователей и заказов через API"""
+    user = api_client.post("/users", json={"username": "batch_api_user", "email": "batch_api@example.com"}).json()
+    order = api_client.post("/orders", json={"user_id": user["id"], "items": []}).json()
+
+    body = api_client.get("/users", params={"ids": user["id"]}).json()
+    assert [item["username"] for item in body["items"]] == ["batch_api_user"]
+    body = api_client.post("/orders/lookup", json={"ids": [order["id"]]}).json()
+    assert ([item["user_id"] for item in body["items"]], body["missing"]) == ([user["id"]], [])
@@ -0,0 +1,173 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.database import configure_sqlite
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.repositories.versions import product_versions
+from app.schemas.user import UserCreate
+
+
+class TestLRUCache:
+    def test_eviction_and_counters(self):
+        """Тест вытеснения самого старого ключа и счётчиков"""
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1, cache.token())
+        cache.set("b", 2, cache.token())
+        assert cache.get("a") == 1
+        cache.set("c", 3, cache.token())
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_ttl_expiration(self):
+        """Тест истечения TTL"""
+        cache = LRUCache(maxsize=10, ttl=0)
+        cache.set("a", 1, cache.token())
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+
+    def test_stale_read_is_not_stored(self):
+        """Тест: значение, прочитанное до инвалидации, в кэш не попадает"""
+        cache = LRUCache()
+        token = cache.token()
+        cache.invalidate("a")
+        cache.set("a", "old", token)
+        assert cache.get("a") is None
+
+
+class TestRepositoryCache:
+    @pytest.mark.asyncio
+    async def test_hit_skips_query_and_invalidates_after_commit(self, engine, tables):
+        """Тест: попадание не ходит в БД, а update сбрасывает кэш только после commit"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        cache = LRUCache()
+        product_repository = ProductRepository(cache=cache)
+
+        async with session_factory() as session:
+            product = await product_repository.create(session, name="Cached Product", price=10.0)
+            await session.commit()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        try:
+            async with session_factory() as session:
+                await product_repository.get_by_id(session, product.id)
+            async with session_factory() as session:
+                cached = await product_repository.get_by_id(session, product.id)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+        assert cached.price == 10.0
+        assert len(statements) == 1
+        assert cache.hits == 1
+
+        async with session_factory() as writer, session_factory() as reader:
+            updated = await product_repository.update(writer, product.id, price=20.0)
+            assert updated.price == 20.0
+            # До commit другие сессии продолжают видеть закэшированное значение
+            assert (await product_repository.get_by_id(reader, product.id)).price == 10.0
+            await writer.commit()
+
+        async with session_factory() as session:
+            assert (await product_repository.get_by_id(session, product.id)).price == 20.0
+
+    @pytest.mark.asyncio
+    async def test_stock_decrement_invalidates_product(self, engine, tables):
+        """Тест: списание остатка при заказе сбрасывает кэш продукта"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        cache = LRUCache()
+        product_repository = ProductRepository(cache=cache)
+
+        async with session_factory() as session:
+            product = await product_repository.create(session, name="Cached Stock", price=1.0, stock_quantity=5)
+            user = await UserRepository().create(
+                session, UserCreate(username="cached_stock_user", email="cached_stock@example.com")
+            )
+            await session.commit()
+        async with session_factory() as session:
+            await product_repository.get_by_id(session, product.id)
+
+        async with session_factory() as session:
+            await OrderRepository(product_cache=cache).create(
+                session, user_id=user.id, items=[{"product_id": product.id, "quantity": 2}]
+            )
+            await session.rollback()
+        async with session_factory() as session:
+            assert (await product_repository.get_by_id(session, product.id)).stock_quantity == 5
+
+        async with session_factory() as session:
+            await OrderRepository(product_cache=cache).create(
+                session, user_id=user.id, items=[{"product_id": product.id, "quantity": 2}]
+            )
+            await session.commit()
+        async with session_factory() as session:
+            assert (await product_repository.get_by_id(session, product.id)).stock_quantity == 3
+
+    @pytest.mark.asyncio
+    async def test_savepoint_release_does_not_invalidate_before_commit(self, engine, tables):
+        """Тест: RELEASE SAVEPOINT не сбрасывает кэш и не меняет ETag - это делает только commit внешней транзакции"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        cache = LRUCache()
+        product_repository = ProductRepository(cache=cache)
+
+        async with session_factory() as session:
+            product = await product_repository.create(session, name="Savepoint Product", price=1.0)
+            await session.commit()
+        etag = product_versions.row_etag(product.id)
+
+        # Задача записи открывает транзакцию явным BEGIN - иначе RELEASE внешней точки сохранения и есть commit
+        writer_engine = configure_sqlite(create_async_engine(engine.url, poolclass=NullPool), "throughput", begin="DEFERRED")
+        writer_factory = sessionmaker(writer_engine, class_=AsyncSession, expire_on_commit=False)
+        async with writer_factory() as writer, session_factory() as reader:
+            await writer.begin()
+            async with writer.begin_nested():
+                await product_repository.update(writer, product.id, price=99.0)
+            # Точка сохранения отпущена, но commit ещё не было: чтение кэширует старую цену
+            assert product_versions.row_etag(product.id) == etag
+            assert (await product_repository.get_by_id(reader, product.id)).price == 1.0
+            await writer.commit()
+        await writer_engine.dispose()
+
+        assert product_versions.row_etag(product.id) != etag
+        async with session_factory() as session:
+            assert (await product_repository.get_by_id(session, product.id)).price == 99.0
+
+    @pytest.mark.asyncio
+    async def test_failed_savepoint_drops_only_its_invalidations(self, engine, tables):
+        """Тест: откат точки сохранения отбрасывает только её инвалидации, остальные применяются при commit"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        cache = LRUCache()
+        product_repository = ProductRepository(cache=cache)
+
+        async with session_factory() as session:
+            kept = await product_repository.create(session, name="Savepoint Kept", price=1.0)
+            failed = await product_repository.create(session, name="Savepoint Failed", price=1.0)
+            await session.commit()
+        etags = product_versions.row_etag(kept.id), product_versions.row_etag(failed.id)
+
+        async with session_factory() as writer:
+            await writer.begin()
+            async with writer.begin_nested():
+                await product_repository.update(writer, kept.id, price=2.0)
+            savepoint = await writer.begin_nested()
+            await product_repository.update(writer, failed.id, price=3.0)
+            await savepoint.rollback()
+            await writer.commit()
+
+        assert product_versions.row_etag(kept.id) != etags[0]
+        assert product_versions.row_etag(failed.id) == etags[1]
+        async with session_factory() as session:
+            assert (await product_repository.get_by_id(session, kept.id)).price == 2.0
+            assert (await product_repository.get_by_id(session, failed.id)).price == 1.0
@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+import pytest
+from litestar.testing import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import ReadWriteDatabase
+from app.main import app
+from src.models import Base, Product, uuid7
+
+
+@pytest.fixture
+async def database(tmp_path):
+    database = ReadWriteDatabase(f"sqlite+aiosqlite:///{tmp_path / 'rw.db'}", read_pool_size=2, write_profile="throughput")
+    async with database.write_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield database
+    await database.dispose()
+
+
+class TestUUIDKeys:
+    def test_uuid7_is_time_ordered(self):
+        """Тест: ключи UUIDv7 версии 7 и строго возрастают, в том числе внутри одной миллисекунды"""
+        keys = [uuid7() for _ in range(1000)]
+        assert all(key.version == 7 for key in keys)
+        assert keys == sorted(keys) and len(set(keys)) == len(keys)
+
+    @pytest.mark.asyncio
+    async def test_keys_stored_as_16_byte_blob(self, database):
+        """Тест: ключ хранится 16 байтами, старые ключи uuid4 читаются без изменений"""
+        legacy = uuid.uuid4()
+        async with database.session("POST") as session:
+            session.add_all([Product(id=legacy, name="Legacy", price=1.0), Product(name="New", price=1.0)])
+            await session.commit()
+
+        async with database.session("GET") as session:
+            rows = (await session.execute(text("SELECT typeof(id), length(id) FROM products"))).all()
+            assert rows == [("blob", 16), ("blob", 16)]
+            product = await session.get(Product, legacy)
+            assert product.name == "Legacy"
+            new_id = (await session.execute(select(Product.id).where(Product.name == "New"))).scalar_one()
+            assert new_id.version == 7
+
+
+class TestReadWriteDatabase:
+    @pytest.mark.asyncio
+    async def test_methods_routed_to_engines(self, database):
+        """Тест маршрутизации: GET читает через пул только для чтения, POST пишет через движок записи"""
+        async with database.session("POST") as session:
+            session.add(Product(name="Routed", price=1.0))
+            await session.commit()
+
+        async with database.session("GET") as session:
+            assert session.bind is database.read_engine
+            assert (await session.scalars(select(Product.name))).all() == ["Routed"]
+            with pytest.raises(OperationalError):
+                await session.execute(text("DELETE FROM products"))
+
+    @pytest.mark.asyncio
+    async def test_pool_metrics(self, database):
+        """Тест метрик пула: выдачи, возврат соединений и ожидание при занятом пуле"""
+        async def read() -> None:
+            async with database.session("GET") as session:
+                await session.execute(text("SELECT 1"))
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(*(read() for _ in range(4)))
+        stats = database.stats()["read"]
+        assert stats["size"] == 2
+        assert stats["checkouts"] >= 4
+        assert stats["checked_out"] == 0
+        # Четыре сессии на два соединения: половина ждала освобождения
+        assert stats["wait_max_ms"] >= 30
+
+
+def test_pool_stats_endpoint():
+    """Тест эндпоинта метрик пулов"""
+    with TestClient(app=app) as client:
+        response = client.get("/db/pool")
+    assert response.status_code == 200
+    assert set(response.json()) == {"read", "write"}
@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+
+import pytest
+from litestar.exceptions import HTTPException
+
+from app.controllers.conditional import etag_matches, write_if_match
+from app.repositories.product_repository import ProductRepository
+from app.repositories.versions import VersionTracker
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.product_service import ProductService
+from app.writer import GroupCommitWriter
+
+
+class TestVersionTracker:
+    def test_row_version_changes_on_write_and_eviction(self):
+        """Тест версий строк: запись меняет версию строки и таблицы, вытеснение не даёт старую версию"""
+        versions = VersionTracker("items", max_rows=2)
+        before = versions.row_etag("a")
+        table_before = versions.table_etag()
+        versions.bump("a")
+        assert versions.row_etag("a") != before
+        assert versions.table_etag() != table_before
+
+        version_a = versions.row_version("a")
+        versions.bump("b")
+        versions.bump("c")
+        # "a" вытеснена из журнала - её версия не может вернуться к значению до вытеснения
+        assert versions.row_version("a") >= version_a
+
+    def test_etag_matches(self):
+        """Тест сравнения ETag в If-None-Match (слабое) и If-Match (сильное)"""
+        assert etag_matches('"x", "y"', '"y"')
+        assert etag_matches("*", '"y"')
+        assert not etag_matches("*", '"y"', wildcard=False)
+        assert etag_matches('W/"y"', '"y"')
+        assert not etag_matches('W/"y"', '"y"', weak=False)
+        assert not etag_matches(None, '"y"')
+
+
+class TestGuardedWrite:
+    @pytest.mark.asyncio
+    async def test_same_if_match_in_one_batch(self, api_session_factory):
+        """Тест: из двух записей с одним If-Match в одной пачке проходит одна; ответ несёт тег своей записи"""
+        writer = GroupCommitWriter(api_session_factory)
+        service = ProductService(ProductRepository())
+        product = await writer.submit(lambda session: service.create(session, ProductCreate(name="Guarded Write", price=1.0)))
+        etag = service.etag(product.id)
+
+        def put(price):
+            return writer.submit(lambda session: write_if_match(
+                session, etag, service, product.id,
+                lambda session: service.update(session, product.id, ProductUpdate(price=price)),
+            ))
+
+        (updated, written), rejected = await asyncio.gather(put(2.0), put(3.0), return_exceptions=True)
+        assert writer.batches == 2
+        assert updated.price == 2.0
+        assert isinstance(rejected, HTTPException) and rejected.status_code == 412
+        assert written() == service.etag(product.id) != etag
+
+        # Следующая запись не подменяет тег уже выполненной
+        await writer.submit(lambda session: service.update(session, product.id, ProductUpdate(price=4.0)))
+        assert written() != service.etag(product.id)
+        await writer.stop()
+
+
+def test_conditional_get_product(api_client):
+    """Тест условного GET: 304 без тела по совпавшему ETag и новый ETag после изменения"""
+    product = api_client.post("/products", json={"name": "ETag Product", "price": 5.0}).json()
+    response = api_client.get(f"/products/{product['id']}")
+    etag = response.headers["etag"]
+
+    response = api_client.get(f"/products/{product['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    api_client.put(f"/products/{product['id']}", json={"price": 6.0})
+    response = api_client.get(f"/products/{product['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == 6.0
+    assert response.headers["etag"] != etag
+
+
+def test_if_none_match_star_requires_existing_resource(api_client):
+    """Тест: If-None-Match: * даёт 304 только для существующего ресурса, для отсутствующего - 404"""
+    product = api_client.post("/products", json={"name": "Star Product", "price": 5.0}).json()
+    assert api_client.get(f"/products/{product['id']}", headers={"If-None-Match": "*"}).status_code == 304
+    for path in ("/products", "/users", "/orders"):
+        assert api_client.get(f"{path}/{uuid.uuid4()}", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_conditional_list_and_stale_write(api_client):
+    """Тест ETag списка и отказа 412 для PUT с устаревшим If-Match"""
+    api_client.post("/users", json={"username": "etag_user", "email": "etag@example.com"})
+    response = api_client.get("/users", params={"username": "etag_user"})
+    list_etag = response.headers["etag"]
+    assert api_client.get(
+        "/users", params={"username": "etag_user"}, headers={"If-None-Match": list_etag}
+    ).status_code == 304
+
+    user = response.json()[0]
+    etag = api_client.get(f"/users/{user['id']}").headers["etag"]
+    response = api_client.put(f"/users/{user['id']}", json={"email": "new@example.com"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    response = api_client.put(f"/users/{user['id']}", json={"email": "old@example.com"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert api_client.get(f"/users/{user['id']}").json()["email"] == "new@example.com"
+    assert api_client.get("/users", params={"username": "etag_user"}, headers={"If-None-Match": list_etag}).status_code == 200
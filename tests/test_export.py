@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.repositories.product_repository import ProductRepository
+
+
+class TestStreamByFilter:
+    @pytest.mark.asyncio
+    async def test_rows_arrive_in_batches(self, session):
+        """Тест потоковой выборки: строки приходят пачками не больше batch_size"""
+        product_repository = ProductRepository()
+        for i in range(5):
+            await product_repository.create(session, name=f"Stream Product {i}", price=float(i))
+
+        batches = [
+            batch
+            async for batch in product_repository.stream_by_filter(session, batch_size=2, name="Stream Product")
+        ]
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [p.name for batch in batches for p in batch] == [f"Stream Product {i}" for i in range(5)]
+        await session.rollback()
+
+
+def test_export_products_ndjson_and_csv(api_client):
+    """Тест выгрузки продуктов в NDJSON и CSV с фильтрами списка"""
+    for i in range(4):
+        api_client.post("/products", json={"name": f"Export Product {i}", "price": 10.0 * i, "description": "a,b"})
+
+    response = api_client.get("/products/export", params={"name": "Export Product", "min_price": 10})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["Export Product 1", "Export Product 2", "Export Product 3"]
+
+    response = api_client.get("/products/export", params={"name": "Export Product", "format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 4
+    assert rows[0]["description"] == "a,b"
+    assert set(rows[0]) == {"id", "name", "price", "description", "stock_quantity"}
+
+
+def test_export_users_and_orders(api_client):
+    """Тест выгрузки пользователей и заказов пользователя"""
+    user = api_client.post("/users", json={"username": "export_user", "email": "export@example.com"}).json()
+    for _ in range(2):
+        api_client.post("/orders", json={"user_id": user["id"]})
+
+    users = api_client.get("/users/export", params={"username": "export_user"}).text.splitlines()
+    assert [json.loads(line)["email"] for line in users] == ["export@example.com"]
+
+    orders = api_client.get("/orders/export", params={"user_id": user["id"], "format": "csv"}).text
+    assert len(list(csv.DictReader(io.StringIO(orders)))) == 2
+
+    assert api_client.get("/orders/export", params={"format": "xml"}).status_code == 400
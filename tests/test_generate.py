@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from src.generate import DatasetSpec, generate
+
+SPEC = dict(users=200, products=50, orders=1000, chunk_size=300, days=30)
+
+
+def dump(path) -> dict:
+    with sqlite3.connect(path) as conn:
+        return {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+            for table in ("users", "addresses", "products", "orders", "order_items")
+        }
+
+
+class TestGenerate:
+    def test_dataset_is_consistent(self, tmp_path):
+        """Тест: размеры таблиц, ссылки заказов и суммы заказов согласованы"""
+        path = tmp_path / "load.db"
+        counts = generate(f"sqlite:///{path}", DatasetSpec(**SPEC))
+        assert (counts["users"], counts["products"], counts["orders"]) == (200, 50, 1000)
+        assert counts["order_items"] > counts["orders"]
+
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+            mismatched = conn.execute(
+                "SELECT count(*) FROM orders o JOIN (SELECT order_id, sum(price_at_order * quantity) AS total "
+                "FROM order_items GROUP BY order_id) i ON i.order_id = o.id WHERE abs(o.total_price - i.total) > 0.01"
+            ).fetchone()[0]
+            assert mismatched == 0
+            # Агрегаты продаж заполнены триггерами
+            assert conn.execute("SELECT sum(order_count) FROM daily_status_orders").fetchone()[0] == 1000
+
+    def test_product_popularity_is_skewed(self, tmp_path):
+        """Тест: популярность продуктов по Ципфу - первый продукт продаётся много чаще медианного"""
+        path = tmp_path / "load.db"
+        generate(f"sqlite:///{path}", DatasetSpec(**SPEC))
+        with sqlite3.connect(path) as conn:
+            sales = dict(conn.execute("SELECT product_id, count(*) FROM order_items GROUP BY product_id"))
+        counts = sorted(sales.values(), reverse=True)
+        assert counts[0] > 5 * counts[len(counts) // 2]
+
+    def test_same_seed_same_data_with_workers(self, tmp_path):
+        """Тест: один seed даёт одни и те же строки с процессами и без, другой seed - другие"""
+        serial, parallel, other = tmp_path / "serial.db", tmp_path / "parallel.db", tmp_path / "other.db"
+        generate(f"sqlite:///{serial}", DatasetSpec(**SPEC))
+        generate(f"sqlite:///{parallel}", DatasetSpec(**SPEC), workers=2)
+        generate(f"sqlite:///{other}", DatasetSpec(seed=2, **SPEC))
+        assert dump(serial) == dump(parallel)
+        assert dump(serial)["orders"] != dump(other)["orders"]
+
+    def test_refuses_to_append_without_reset(self, tmp_path):
+        """Тест: повторная генерация в заполненную БД требует --reset"""
+        url = f"sqlite:///{tmp_path / 'load.db'}"
+        generate(url, DatasetSpec(**SPEC))
+        with pytest.raises(ValueError, match="not empty"):
+            generate(url, DatasetSpec(**SPEC))
+        assert generate(url, DatasetSpec(**SPEC), reset=True)["orders"] == 1000
@@ -0,0 +1,220 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from litestar.di import Provide
+from litestar.testing import create_test_client
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.controllers.job_controller import JobController
+from app.controllers.order_controller import OrderController
+from app.controllers.user_controller import UserController
+from app.database import configure_sqlite
+from app.jobs import JobRunner
+from app.services.job_handlers import register_jobs
+from app.writer import GroupCommitWriter
+from src.models import Address, Job
+
+
+@pytest.fixture
+async def sessions(engine, tables):
+    writer_engine = configure_sqlite(create_async_engine(engine.url, poolclass=NullPool), "throughput", begin="DEFERRED")
+    factory = sessionmaker(writer_engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        await session.execute(delete(Job))
+        await session.commit()
+    yield factory
+    await writer_engine.dispose()
+
+
+@pytest.fixture
+async def runner(sessions):
+    writer = GroupCommitWriter(sessions)
+    runner = JobRunner(writer, sessions, concurrency=2, poll_interval=0.02, backoff_base=0.01)
+    yield runner
+    await runner.stop()
+    await writer.stop()
+
+
+async def wait_finished(runner, job_id) -> Job:
+    # Тайм-аут только страхует от зависания: ожидание завершается записью конечного состояния
+    return await asyncio.wait_for(runner.wait(job_id), 10)
+
+
+class TestJobRunner:
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff_then_succeeds(self, runner, sessions):
+        """Тест: временная ошибка повторяется с паузой, результат сохраняется после успешной попытки"""
+        calls = []
+
+        async def flaky(job_id, params):
+            calls.append(params["n"])
+            if len(calls) < 3:
+                raise RuntimeError("temporary")
+            return {"n": params["n"]}
+
+        runner.register("flaky", flaky)
+        await runner.start()
+        job = await runner.enqueue("flaky", {"n": 7})
+        job = await wait_finished(runner, job.id)
+        assert (job.status, job.attempts, job.result, job.error) == ("succeeded", 3, {"n": 7}, None)
+        assert calls == [7, 7, 7]
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_and_exhausted_attempts_fail(self, runner, sessions):
+        """Тест: ValueError не повторяется, прочие ошибки - пока не исчерпан max_attempts"""
+        async def invalid(job_id, params):
+            raise ValueError("User not found")
+
+        async def broken(job_id, params):
+            raise RuntimeError("still broken")
+
+        runner.register("invalid", invalid)
+        runner.register("broken", broken)
+        await runner.start()
+        invalid_job = await runner.enqueue("invalid")
+        broken_job = await runner.enqueue("broken", max_attempts=3)
+
+        invalid_job = await wait_finished(runner, invalid_job.id)
+        broken_job = await wait_finished(runner, broken_job.id)
+        assert (invalid_job.status, invalid_job.attempts) == ("failed", 1)
+        assert invalid_job.error == "ValueError: User not found"
+        assert (broken_job.status, broken_job.attempts) == ("failed", 3)
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            await runner.enqueue("missing")
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, runner, sessions):
+        """Тест: одновременно выполняется не больше concurrency задач, каждая - один раз"""
+        running, peak, done = 0, 0, []
+
+        async def slow(job_id, params):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            done.append(params["n"])
+
+        runner.register("slow", slow)
+        await runner.start()
+        jobs = [await runner.enqueue("slow", {"n": n}) for n in range(6)]
+        for job in jobs:
+            await wait_finished(runner, job.id)
+        assert peak == 2
+        assert sorted(done) == list(range(6))
+
+    @pytest.mark.asyncio
+    async def test_interrupted_job_resumes_after_restart(self, runner, sessions):
+        """Тест: задача, оставшаяся running после остановки процесса, выполняется при следующем старте"""
+        async def ok(job_id, params):
+            return "done"
+
+        runner.register("ok", ok)
+        async with sessions() as session:
+            session.add(Job(id=(job_id := uuid.uuid4()), kind="ok", status="running", attempts=1))
+            await session.commit()
+
+        await runner.start()
+        job = await wait_finished(runner, job_id)
+        assert (job.status, job.attempts, job.result) == ("succeeded", 2, "done")
+
+
+@pytest.fixture
+def jobs_runner(api_session_factory, api_writer, sessions, tmp_path):
+    """Очередь задач тестового приложения; выгрузки - во временный каталог"""
+    runner = JobRunner(api_writer, api_session_factory, poll_interval=0.02)
+    register_jobs(runner, export_dir=str(tmp_path))
+    return runner
+
+
+@pytest.fixture
+def jobs_client(api_dependencies, api_writer, jobs_runner):
+    async def provide_jobs():
+        return jobs_runner
+
+    with create_test_client(
+        route_handlers=[JobController, UserController, OrderController],
+        dependencies={**api_dependencies, "jobs": Provide(provide_jobs)},
+        on_startup=[jobs_runner.start],
+        on_shutdown=[jobs_runner.stop, api_writer.stop],
+    ) as client:
+        yield client
+
+
+def finished(client, runner, response) -> dict:
+    """Дождаться завершения задачи из ответа 202 в цикле приложения и вернуть её состояние"""
+    job_id = uuid.UUID(response.json()["id"])
+    client.blocking_portal.call(asyncio.wait_for, runner.wait(job_id), 10)
+    return client.get(response.headers["Location"]).json()
+
+
+class TestJobsApi:
+    def test_delete_user_in_background(self, jobs_client, jobs_runner):
+        """Тест: удаление с Prefer: respond-async отвечает 202, задача удаляет заказы и пользователя"""
+        user = jobs_client.post("/users/", json={"username": "jobs_user", "email": "jobs_user@example.com"}).json()
+        for _ in range(3):
+            assert jobs_client.post("/orders/", json={"user_id": user["id"], "items": []}).status_code == 201
+
+        response = jobs_client.delete(f"/users/{user['id']}", headers={"Prefer": "respond-async"})
+        assert response.status_code == 202
+        assert response.headers["Location"] == f"/jobs/{response.json()['id']}"
+        job = finished(jobs_client, jobs_runner, response)
+        assert (job["kind"], job["status"], job["result"]) == ("users.delete", "succeeded", {"orders_deleted": 3})
+
+        assert jobs_client.get(f"/users/{user['id']}").status_code == 404
+        assert jobs_client.get("/orders/", params={"user_id": user["id"]}).json() == []
+        # Без Prefer удаление по-прежнему синхронное
+        assert jobs_client.delete(f"/users/{user['id']}").status_code == 404
+
+    def test_delete_user_with_addresses(self, jobs_client, jobs_runner, sessions):
+        """Тест: адреса удаляются каскадом вместе с пользователем - синхронно и в фоновой задаче с первой попытки"""
+        async def add_address(user_id):
+            async with sessions() as session:
+                session.add(Address(
+                    user_id=uuid.UUID(user_id), street="Main 1", city="Oslo", state="", zip_code="", country="NO",
+                    updated_at=datetime.now(),
+                ))
+                await session.commit()
+
+        async def count_addresses(user_id):
+            async with sessions() as session:
+                return await session.scalar(select(func.count()).where(Address.user_id == uuid.UUID(user_id)))
+
+        users = [
+            jobs_client.post("/users/", json={"username": f"addr_user_{n}", "email": f"addr_user_{n}@example.com"}).json()
+            for n in range(2)
+        ]
+        for user in users:
+            jobs_client.blocking_portal.call(add_address, user["id"])
+
+        assert jobs_client.delete(f"/users/{users[0]['id']}").status_code == 204
+        response = jobs_client.delete(f"/users/{users[1]['id']}", headers={"Prefer": "respond-async"})
+        job = finished(jobs_client, jobs_runner, response)
+        assert (job["status"], job["attempts"]) == ("succeeded", 1)
+        for user in users:
+            assert jobs_client.blocking_portal.call(count_addresses, user["id"]) == 0
+
+    def test_export_job_result_is_the_file(self, jobs_client, jobs_runner):
+        """Тест: выгрузка фоновой задачей отдаёт файл через GET /jobs/{id}/result"""
+        jobs_client.post("/users/", json={"username": "jobs_export", "email": "jobs_export@example.com"})
+        response = jobs_client.get("/users/export", params={"username": "jobs_export"}, headers={"Prefer": "respond-async"})
+        assert response.status_code == 202
+        assert finished(jobs_client, jobs_runner, response)["status"] == "succeeded"
+
+        result = jobs_client.get(f"{response.headers['Location']}/result")
+        assert result.status_code == 200
+        assert result.headers["content-type"].startswith("application/x-ndjson")
+        assert [line for line in result.text.splitlines() if "jobs_export" in line]
+
+    def test_post_jobs_validates_kind(self, jobs_client, jobs_runner):
+        """Тест: POST /jobs ставит известную задачу в очередь и отклоняет неизвестную"""
+        assert jobs_client.post("/jobs/", json={"kind": "nope"}).status_code == 400
+        response = jobs_client.post("/jobs/", json={"kind": "rollups.rebuild", "params": {"batch_days": 10}})
+        assert response.status_code == 202
+        assert finished(jobs_client, jobs_runner, response)["status"] == "succeeded"
+        assert jobs_client.get(f"/jobs/{uuid.uuid4()}").status_code == 404
@@ -0,0 +1,61 @@
+import re
+
+from litestar.testing import create_test_client
+
+from app.controllers.metrics_controller import MetricsController
+from app.controllers.product_controller import ProductController
+from app.metrics import MetricsMiddleware, MetricsRegistry
+
+
+def _sample(text: str, name: str, **labels: str) -> float:
+    """Значение сэмпла с данными метками (порядок меток как в выводе)"""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$", text, re.MULTILINE)
+    assert match, f"{name}{{{label_text}}} not found"
+    return float(match.group(1))
+
+
+class TestMetricsRegistry:
+    def test_text_exposition(self):
+        """Тест текстового формата: накопленные корзины, +Inf, _sum/_count и экранирование меток"""
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs_total", "Jobs", ("kind",))
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        counter.inc(kind='a"b')
+        counter.inc(2, kind='a"b')
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, route="/x")
+
+        text = registry.render()
+        assert "# TYPE jobs_total counter" in text
+        assert 'jobs_total{kind="a\\"b"} 3' in text
+        assert _sample(text, "latency_seconds_bucket", route="/x", le="0.1") == 1
+        assert _sample(text, "latency_seconds_bucket", route="/x", le="1") == 2
+        assert _sample(text, "latency_seconds_bucket", route="/x", le="+Inf") == 3
+        assert _sample(text, "latency_seconds_count", route="/x") == 3
+        assert _sample(text, "latency_seconds_sum", route="/x") == 5.55
+
+
+def test_metrics_endpoint_reports_requests_and_statements(api_dependencies):
+    """Тест /metrics: задержка по обработчику, SQL-запросы на запрос, запросы в работе и пулы"""
+    handler = "ProductController.get_all_products"
+    with create_test_client(
+        route_handlers=[ProductController, MetricsController],
+        dependencies=api_dependencies,
+        middleware=[MetricsMiddleware()],
+    ) as client:
+        before = client.get("/metrics").text
+        count_before = _sample(before, "http_request_duration_seconds_count", handler=handler, method="GET", status="200") \
+            if handler in before else 0
+        client.get("/products", params={"count": 5})
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert _sample(text, "http_request_duration_seconds_count", handler=handler, method="GET", status="200") == count_before + 1
+    assert _sample(text, "db_statements_per_request_bucket", handler=handler, le="0") == 0
+    assert _sample(text, "db_statements_total", engine="test") >= 1
+    assert _sample(text, "http_requests_in_flight", handler="MetricsController.get_metrics") == 1
+    assert 'db_pool_size{pool="read"}' in text
+    assert "# TYPE db_pool_timeouts_total counter" in text
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderResponse
+from app.schemas.user import UserCreate
+
+
+PAGE_SIZE = 100
+
+
+class TestOrderItemsLoading:
+    @pytest.mark.asyncio
+    async def test_page_of_orders_takes_two_selects(self, engine, tables, assert_max_queries):
+        """Тест: страница из 100 заказов с позициями - ровно два SELECT, без запроса на каждый заказ"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        order_repository = OrderRepository(cache=LRUCache(maxsize=0))
+        async with session_factory() as session:
+            user = await UserRepository().create(session, UserCreate(username="items_user", email="items@example.com"))
+            first = await ProductRepository().create(session, name="Items First", price=3.0, stock_quantity=1000)
+            second = await ProductRepository().create(session, name="Items Second", price=4.0, stock_quantity=1000)
+            for _ in range(PAGE_SIZE):
+                await order_repository.create(session, user.id, items=[
+                    {"product_id": first.id, "quantity": 1},
+                    {"product_id": second.id, "quantity": 2},
+                ])
+            await session.commit()
+
+        with assert_max_queries(2) as queries:
+            async with session_factory() as session:
+                orders = await order_repository.get_by_filter(session, PAGE_SIZE, 1, user_id=user.id)
+                responses = [OrderResponse.model_validate(order) for order in orders]
+
+        assert len(responses) == PAGE_SIZE
+        assert all(len(response.items) == 2 for response in responses)
+        assert sum(item.price_at_order * item.quantity for item in responses[0].items) == 11.0
+        assert queries.count == 2
+        assert all(statement.startswith("SELECT") for statement in queries.statements)
+
+    @pytest.mark.asyncio
+    async def test_lazy_load_raises_and_cached_items_follow_product_delete(self, engine, tables):
+        """Тест: неявная загрузка связи падает; позиции из кэша заказа сбрасываются при удалении продукта"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        order_cache = LRUCache()
+        order_repository = OrderRepository(cache=order_cache)
+        product_repository = ProductRepository(order_cache=order_cache)
+        async with session_factory() as session:
+            user = await UserRepository().create(session, UserCreate(username="raise_user", email="raise@example.com"))
+            kept = await product_repository.create(session, name="Raise Kept", price=1.0, stock_quantity=10)
+            dropped = await product_repository.create(session, name="Raise Dropped", price=2.0, stock_quantity=10)
+            order = await order_repository.create(session, user.id, items=[
+                {"product_id": kept.id, "quantity": 1},
+                {"product_id": dropped.id, "quantity": 1},
+            ])
+            await session.commit()
+
+        async with session_factory() as session:
+            loaded = await order_repository.get_by_id(session, order.id)
+            with pytest.raises(InvalidRequestError):
+                loaded.user
+        async with session_factory() as session:
+            cached = await order_repository.get_by_id(session, order.id)
+            assert order_cache.hits == 1
+            assert len(OrderResponse.model_validate(cached).items) == 2
+
+        async with session_factory() as session:
+            await product_repository.delete(session, dropped.id)
+            await session.commit()
+        async with session_factory() as session:
+            reloaded = await order_repository.get_by_id(session, order.id)
+            assert [item.product_id for item in reloaded.items] == [kept.id]
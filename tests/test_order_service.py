@@ -1,5 +1,11 @@
 import pytest
 from unittest.mock import Mock, AsyncMock
+from sqlalchemy import event
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderCreate, OrderItemBase
+from app.schemas.user import UserCreate
 from app.services.order_service import OrderService
 
 
@@ -8,13 +14,13 @@ class TestOrderService:
     async def test_create_order_success(self):
         """Тест успешного создания заказа"""
         # Мокаем репозитории
-        mock_order_repo = AsyncMock(spec=OrderService)
-        mock_product_repo = AsyncMock(spec=OrderService)
-        mock_user_repo = AsyncMock(spec=OrderService)
+        mock_order_repo = AsyncMock(spec=OrderRepository)
+        mock_product_repo = AsyncMock(spec=ProductRepository)
+        mock_user_repo = AsyncMock(spec=UserRepository)
 
         # Настраиваем поведение моков
         mock_user_repo.get_by_id.return_value = Mock(id=1, email="test@example.com")
-        mock_product_repo.get_by_id.return_value = Mock(id=1, name="Test Product", price=100.0, stock_quantity=5)
+        mock_product_repo.get_by_ids.return_value = [Mock(id=1, name="Test Product", price=100.0, stock_quantity=5)]
         mock_order_repo.create.return_value = Mock(id=1, user_id=1, total_amount=200.0, status="pending")
 
         # Создаем сервис с моками
@@ -40,12 +46,12 @@ class TestOrderService:
     @pytest.mark.asyncio
     async def test_create_order_insufficient_stock(self):
         """Тест создания заказа с недостаточным количеством товара"""
-        mock_user_repo = AsyncMock(spec=OrderService)
-        mock_product_repo = AsyncMock(spec=OrderService)
-        mock_order_repo = AsyncMock(spec=OrderService)
+        mock_user_repo = AsyncMock(spec=UserRepository)
+        mock_product_repo = AsyncMock(spec=ProductRepository)
+        mock_order_repo = AsyncMock(spec=OrderRepository)
 
         mock_user_repo.get_by_id.return_value = Mock(id=1)
-        mock_product_repo.get_by_id.return_value = Mock(id=1, name="Test Product", price=100.0, stock_quantity=1)
+        mock_product_repo.get_by_ids.return_value = [Mock(id=1, name="Test Product", price=100.0, stock_quantity=1)]
 
         order_service = OrderService(
             order_repository=mock_order_repo,
@@ -60,4 +66,51 @@ class TestOrderService:
         order_data.status = "pending"
 
         with pytest.raises(ValueError, match="Insufficient stock"):
-            await order_service.create_order(None, order_data)
\ No newline at end of file
+            await order_service.create_order(None, order_data)
+
+
+class TestOrderPlacementQueries:
+    @staticmethod
+    async def _count_placement_statements(session, engine, items_count: int) -> int:
+        """Разместить заказ из items_count позиций и вернуть число выполненных SQL-запросов"""
+        user_repository = UserRepository()
+        product_repository = ProductRepository()
+        user = await user_repository.create(
+            session,
+            UserCreate(username=f"placement_{items_count}", email=f"placement_{items_count}@example.com"),
+        )
+        products = [
+            await product_repository.create(
+                session, name=f"Placement {items_count} #{i}", price=1.5, stock_quantity=10
+            )
+            for i in range(items_count)
+        ]
+        order_data = OrderCreate(
+            user_id=user.id,
+            items=[OrderItemBase(product_id=product.id, quantity=2) for product in products],
+        )
+        order_service = OrderService(OrderRepository(), user_repository, product_repository)
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        try:
+            order = await order_service.create_order(session, order_data)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+        assert order.total_price == pytest.approx(1.5 * 2 * items_count)
+        return len(statements)
+
+    @pytest.mark.asyncio
+    async def test_statement_count_does_not_grow_with_items(self, session, engine):
+        """Тест: число запросов при размещении заказа не зависит от числа позиций"""
+        small = await self._count_placement_statements(session, engine, 1)
+        large = await self._count_placement_statements(session, engine, 50)
+        await session.rollback()
+
+        assert small == large
+        assert large <= 5
@@ -0,0 +1,199 @@
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.user import UserCreate
+from src.models import DailyStatusOrders, uuid7
+
+
+class TestKeysetPagination:
+    @pytest.mark.asyncio
+    async def test_walk_products_by_cursor(self, session):
+        """Тест обхода всего каталога по курсору без пропусков и повторов"""
+        product_repository = ProductRepository()
+        for i in range(7):
+            await product_repository.create(session, name=f"Cursor Product {i}", price=10.0 + i)
+
+        seen = []
+        after = None
+        while True:
+            page = await product_repository.get_by_filter(session, 3, 1, after, name="Cursor Product")
+            seen.extend(product.name for product in page)
+            after = product_repository.next_cursor(page, 3)
+            if after is None:
+                break
+
+        assert seen == [f"Cursor Product {i}" for i in range(7)]
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_cursor_matches_page(self, session):
+        """Тест совместимости: курсор продолжает выборку так же, как следующая страница"""
+        product_repository = ProductRepository()
+        for i in range(4):
+            await product_repository.create(session, name=f"Page Product {i}", price=5.0)
+
+        first_page = await product_repository.get_by_filter(session, 2, 1, name="Page Product")
+        second_page = await product_repository.get_by_filter(session, 2, 2, name="Page Product")
+        by_cursor = await product_repository.get_by_filter(
+            session, 2, 1, product_repository.next_cursor(first_page, 2), name="Page Product"
+        )
+
+        assert [p.id for p in by_cursor] == [p.id for p in second_page]
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_walk_orders_by_cursor(self, session):
+        """Тест курсора по (order_date, id) для заказов одного пользователя"""
+        user = await UserRepository().create(
+            session, UserCreate(username="cursor_orders_user", email="cursor_orders@example.com")
+        )
+        order_repository = OrderRepository()
+        created = [await order_repository.create(session, user_id=user.id) for _ in range(5)]
+
+        seen = []
+        after = None
+        while True:
+            page = await order_repository.get_by_filter(session, 2, 1, after, user_id=user.id)
+            seen.extend(order.id for order in page)
+            after = order_repository.next_cursor(page, 2)
+            if after is None:
+                break
+
+        assert sorted(seen) == sorted(order.id for order in created)
+        assert len(seen) == len(set(seen))
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_walk_orders_with_mixed_date_format(self, session):
+        """Тест: заказы, вставленные в обход ORM (секунды, 'T', server_default), приводятся к одному формату и не теряются курсором"""
+        user = await UserRepository().create(
+            session, UserCreate(username="cursor_format_user", email="cursor_format@example.com")
+        )
+        order_repository = OrderRepository()
+        orm_order = await order_repository.create(session, user_id=user.id)
+        second = orm_order.order_date.strftime("%Y-%m-%d %H:%M:%S")
+        raw_ids = [uuid7() for _ in range(3)]
+        for order_id, order_date in zip(raw_ids, [second, second.replace(" ", "T") + ".5"]):
+            await session.execute(
+                text("INSERT INTO orders (id, user_id, order_date, total_price, status) VALUES (:id, :user_id, :order_date, 0, 'pending')"),
+                {"id": order_id.bytes, "user_id": user.id.bytes, "order_date": order_date},
+            )
+        await session.execute(
+            text("INSERT INTO orders (id, user_id, total_price, status) VALUES (:id, :user_id, 0, 'pending')"),
+            {"id": raw_ids[2].bytes, "user_id": user.id.bytes},
+        )
+
+        stored = (await session.execute(
+            text("SELECT order_date FROM orders WHERE user_id = :user_id"), {"user_id": user.id.bytes}
+        )).scalars().all()
+        assert all(len(value) == 26 and value[10] == " " for value in stored)
+
+        seen = []
+        after = None
+        while True:
+            page = await order_repository.get_by_filter(session, 1, 1, after, user_id=user.id)
+            seen.extend(order.id for order in page)
+            after = order_repository.next_cursor(page, 1)
+            if after is None:
+                break
+        assert sorted(seen) == sorted([orm_order.id, *raw_ids])
+
+        pending = await session.scalar(
+            select(func.sum(DailyStatusOrders.order_count)).where(DailyStatusOrders.status == 'pending')
+        )
+        assert pending == await session.scalar(select(func.count()).select_from(text("orders")).where(text("status = 'pending'")))
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, session):
+        """Тест отказа на испорченном курсоре"""
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            await ProductRepository().get_by_filter(session, 10, 1, "not-a-cursor")
+
+
+class TestTotalCounts:
+    @pytest.mark.asyncio
+    async def test_counters_match_count(self, session):
+        """Тест: точные итоги из таблиц счётчиков совпадают с COUNT(*) после вставки, смены статуса и каскадного удаления"""
+        users = [
+            await UserRepository().create(session, UserCreate(username=f"total_user_{n}", email=f"total_{n}@example.com"))
+            for n in range(2)
+        ]
+        order_repository = OrderRepository()
+        orders = [await order_repository.create(session, user_id=users[0].id) for _ in range(3)]
+        await order_repository.create(session, user_id=users[1].id)
+        await order_repository.update(session, orders[0].id, status="paid")
+        await UserRepository().delete(session, users[1].id)
+
+        for filters in (
+            {}, {"status": "paid"}, {"status": "pending"}, {"user_id": users[0].id}, {"user_id": users[1].id},
+            # Без счётчика: COUNT(*) по выборке
+            {"user_id": users[0].id, "status": "paid"},
+        ):
+            stmt = order_repository._filter_stmt(**filters)
+            expected = await session.scalar(select(func.count()).select_from(stmt.subquery()))
+            assert await order_repository.count_by_filter(session, **filters) == (expected, True)
+        assert await order_repository.count_by_filter(session, user_id=users[0].id) == (3, True)
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_other_filters_use_cached_count(self, engine, tables):
+        """Тест: итог по произвольному фильтру берётся из кэша и после записи помечается приблизительным"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        product_repository = ProductRepository()
+        product_repository.count_cache = LRUCache(ttl=60)
+        async with session_factory() as session:
+            await product_repository.create(session, name="Total Kettle", price=1.0)
+            await session.commit()
+            assert await product_repository.count_by_filter(session, name="Total Kettle") == (1, True)
+            assert await product_repository.count_by_filter(session, name="Total Kettle") == (1, True)
+
+            await product_repository.create(session, name="Total Kettle 2", price=1.0)
+            await session.commit()
+            # Число из кэша: не старше TTL, но уже не точное
+            assert await product_repository.count_by_filter(session, name="Total Kettle") == (1, False)
+
+        product_repository.count_cache = LRUCache(ttl=0)
+        async with session_factory() as session:
+            assert await product_repository.count_by_filter(session, name="Total Kettle") == (2, True)
+
+
+def test_include_total_header(api_client):
+    """Тест: include_total отдаёт итог заголовками X-Total-Count и X-Total-Count-Exact"""
+    user = api_client.post("/users", json={"username": "total_api_user", "email": "total_api@example.com"}).json()
+    for _ in range(3):
+        assert api_client.post("/orders", json={"user_id": user["id"], "items": []}).status_code == 201
+
+    response = api_client.get("/orders", params={"user_id": user["id"], "count": 2, "include_total": True})
+    assert len(response.json()) == 2
+    assert (response.headers["x-total-count"], response.headers["x-total-count-exact"]) == ("3", "true")
+    assert "x-total-count" not in api_client.get("/orders", params={"user_id": user["id"]}).headers
+
+    response = api_client.get("/users", params={"username": "total_api_user", "include_total": True})
+    assert response.headers["x-total-count"] == "1"
+
+
+def test_next_cursor_header(api_client):
+    """Тест заголовка X-Next-Cursor и параметра after в API"""
+    for i in range(3):
+        response = api_client.post("/products", json={"name": f"Api Cursor {i}", "price": 1.0})
+        assert response.status_code == 201
+
+    first = api_client.get("/products", params={"count": 2, "name": "Api Cursor"})
+    assert first.status_code == 200
+    assert [p["name"] for p in first.json()] == ["Api Cursor 0", "Api Cursor 1"]
+
+    second = api_client.get(
+        "/products",
+        params={"count": 2, "name": "Api Cursor", "after": first.headers["x-next-cursor"]},
+    )
+    assert [p["name"] for p in second.json()] == ["Api Cursor 2"]
+    assert "x-next-cursor" not in second.headers
+
+    assert api_client.get("/products", params={"after": "broken"}).status_code == 400
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.services.product_import import MAX_LINE_SIZE, LineTooLongError, iter_lines, iter_records
+
+
+async def _stream(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+class TestImportParsing:
+    @pytest.mark.asyncio
+    async def test_lines_split_across_chunks(self):
+        """Тест сборки строк и многобайтных символов, разрезанных границей чанка"""
+        text = "первая\r\nвторая\nтретья".encode()
+        lines = [line async for line in iter_lines(_stream(text[:3], text[3:15], text[15:]))]
+        assert lines == ["первая", "вторая", "третья"]
+
+    @pytest.mark.asyncio
+    async def test_csv_quoted_multiline_field(self):
+        """Тест CSV-поля в кавычках, занимающего несколько строк"""
+        lines = _stream(b'name,price,description\n"Lamp",10.5,"two\nlines"\nBad,1\n')
+        records = [record async for record in iter_records(iter_lines(lines), "csv")]
+        assert records[0] == (2, {"name": "Lamp", "price": "10.5", "description": "two\nlines"}, None)
+        assert records[1][0] == 4
+        assert records[1][2] == "Expected 3 columns, got 2"
+
+    @pytest.mark.asyncio
+    async def test_csv_stray_quote_is_capped(self):
+        """Тест: непарная кавычка не склеивает остаток файла - запись сверх предела даёт ошибку, разбор продолжается"""
+        body = 'name,price\n"Broken,1\n' + "".join(f"Filler {n},1\n" for n in range(10)) + '"Lamp",2\n'
+        records = [record async for record in iter_records(iter_lines(_stream(body.encode())), "csv", max_record_size=50)]
+        assert records[0] == (2, None, "Record exceeds 50 characters (unbalanced quote?)")
+        assert records[-1] == (13, {"name": "Lamp", "price": "2"}, None)
+        assert all(error is None for _, _, error in records[1:])
+
+    @pytest.mark.asyncio
+    async def test_line_over_limit_is_rejected(self):
+        """Тест: строка сверх предела (в том числе тело без переводов строки) прерывает разбор, а не копится"""
+        lines = iter_lines(_stream(b"short\n", b"x" * 30, b"x" * 30, b"\nlast\n"), max_line_size=50)
+        assert await lines.__anext__() == "short"
+        with pytest.raises(LineTooLongError, match="Line 2 exceeds 50 characters"):
+            await lines.__anext__()
+
+        lines = iter_lines(_stream(b"x" * 25, b"x" * 24, b"\r\nnext"), max_line_size=50)
+        assert [line async for line in lines] == ["x" * 49, "next"]
+
+
+def test_import_ndjson_upsert(api_client):
+    """Тест потокового NDJSON-импорта: пачки, upsert по имени и построчные ошибки"""
+    rows = [{"name": f"Import {i}", "price": i + 0.5, "stock_quantity": i} for i in range(5)]
+    body = [json.dumps(row).encode() + b"\n" for row in rows]
+    body.insert(2, b'{"name": "Import broken", "price": "free"}\n')
+    body.insert(4, b"not json\n")
+
+    response = api_client.post(
+        "/products/import",
+        params={"chunk_size": 3},
+        content=iter(body),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["inserted"] == 5
+    assert report["updated"] == 0
+    assert report["errors"] == 2
+    assert report["chunks"] == 3
+    assert [(error["chunk"], error["line"]) for error in report["error_details"]] == [(1, 3), (2, 5)]
+
+    # Повторный импорт обновляет существующие продукты по имени
+    response = api_client.post(
+        "/products/import",
+        params={"format": "csv"},
+        content=b"name,price,stock_quantity\nImport 1,99.0,7\nImport new,1.0,1\n",
+    )
+    report = response.json()
+    assert (report["inserted"], report["updated"], report["errors"]) == (1, 1, 0)
+
+    products = api_client.get("/products", params={"name": "Import 1"}).json()
+    assert (products[0]["price"], products[0]["stock_quantity"]) == (99.0, 7)
+
+
+def test_import_line_too_long(api_client):
+    """Тест: слишком длинная строка - 413, строки до неё импортированы и учтены в отчёте"""
+    body = [b'{"name": "Import before long", "price": 1.0}\n', b"x" * (MAX_LINE_SIZE + 1)]
+    response = api_client.post("/products/import", content=iter(body), headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 413
+    assert response.json()["extra"]["report"]["inserted"] == 1
+
+
+def test_import_unknown_format(api_client):
+    """Тест отказа на неизвестном формате импорта"""
+    response = api_client.post("/products/import", params={"format": "xml"}, content=b"<a/>")
+    assert response.status_code == 400
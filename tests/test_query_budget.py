@@ -0,0 +1,49 @@
+import pytest
+from litestar.testing import create_test_client
+
+from app.controllers.product_controller import ProductController
+from app.query_budget import QueryBudgetMiddleware, count_queries, statement_shape
+from app.repositories.cache import LRUCache
+from app.repositories.product_repository import ProductRepository
+
+
+class TestQueryBudget:
+    def test_statement_shape_ignores_in_list_length(self):
+        """Тест: списки IN разной длины дают одну форму запроса"""
+        assert statement_shape("SELECT id FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+            "SELECT id FROM t\nWHERE id IN (?, ?)"
+        )
+
+    @pytest.mark.asyncio
+    async def test_detects_query_per_row(self, session, assert_max_queries):
+        """Тест: пакетное чтение укладывается в бюджет, чтение по строке ловится как N+1"""
+        repository = ProductRepository(cache=LRUCache(maxsize=0))
+        products = [await repository.create(session, name=f"Budget {i}", price=1.0) for i in range(5)]
+        ids = [product.id for product in products]
+
+        with assert_max_queries(1):
+            assert len(await repository.get_by_ids(session, ids)) == 5
+
+        with pytest.raises(AssertionError, match="possible N\\+1"):
+            with assert_max_queries(10):
+                for product_id in ids:
+                    await repository._load_by_id(session, product_id)
+
+        with count_queries() as queries:
+            for product_id in ids:
+                await repository._load_by_id(session, product_id)
+        assert list(queries.repeated().values()) == [5]
+        await session.rollback()
+
+
+def test_debug_headers(api_dependencies):
+    """Тест режима разработки: число запросов обработчика в заголовке ответа"""
+    with create_test_client(
+        route_handlers=[ProductController],
+        dependencies=api_dependencies,
+        middleware=[QueryBudgetMiddleware()],
+    ) as client:
+        response = client.get("/products", params={"count": 5})
+    assert response.status_code == 200
+    assert response.headers["X-Query-Count"] == "1"
+    assert "X-Query-Repeated" not in response.headers
@@ -0,0 +1,84 @@
+import logging
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.database import configure_sqlite
+from app.query_log import QueryLogger, current_route
+from app.repositories.cache import LRUCache
+from app.repositories.product_repository import ProductRepository
+from app.writer import GroupCommitWriter
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+async def logged_engine(engine, tables):
+    """Отдельный движок тестовой БД; журнал к нему подключает сам тест"""
+    logged = configure_sqlite(create_async_engine(engine.url, poolclass=NullPool), "throughput", begin="DEFERRED")
+    yield logged
+    await logged.dispose()
+
+
+def _query_logger(**kwargs):
+    handler = ListHandler()
+    query_log = QueryLogger(handlers=[handler], logger_name=f"test.sql.{uuid.uuid4().hex}", **kwargs)
+    query_log.start()
+    return query_log, handler
+
+
+class TestQueryLogger:
+    @pytest.mark.asyncio
+    async def test_slow_query_records_route_and_caller(self, logged_engine):
+        """Тест: запрос выше порога пишется с длительностью, маршрутом и методом репозитория, в том числе из задачи записи"""
+        query_log, handler = _query_logger(threshold_ms=0)
+        query_log.attach(logged_engine, "write")
+        session_factory = sessionmaker(logged_engine, class_=AsyncSession, expire_on_commit=False)
+        repository = ProductRepository(cache=LRUCache(maxsize=0))
+        writer = GroupCommitWriter(session_factory)
+
+        token = current_route.set("POST /products")
+        try:
+            product = await writer.submit(lambda session: repository.create(session, name="Logged Product", price=1.0))
+        finally:
+            current_route.reset(token)
+        async with session_factory() as session:
+            current_route.set("GET /products/{product_id}")
+            await repository.get_by_id(session, product.id)
+        await writer.stop()
+        query_log.stop()
+
+        assert all(record.slow and record.duration_ms >= 0 for record in handler.records)
+        callers = {(record.route, record.caller) for record in handler.records}
+        assert ("POST /products", "ProductRepository.create") in callers
+        assert ("GET /products/{product_id}", "ProductRepository._load_by_id") in callers
+
+    @pytest.mark.asyncio
+    async def test_threshold_and_sampling(self, logged_engine):
+        """Тест: быстрые запросы не пишутся без выборки и пишутся все при sample_rate=1"""
+        quiet, quiet_handler = _query_logger(threshold_ms=60_000, sample_rate=0)
+        sampled, sampled_handler = _query_logger(threshold_ms=60_000, sample_rate=1)
+        quiet.attach(logged_engine)
+        sampled.attach(logged_engine)
+
+        session_factory = sessionmaker(logged_engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            for _ in range(3):
+                await ProductRepository(cache=LRUCache(maxsize=0)).get_by_id(session, uuid.uuid4())
+        quiet.stop()
+        sampled.stop()
+
+        assert quiet_handler.records == []
+        selects = [record for record in sampled_handler.records if record.statement.startswith("SELECT")]
+        assert len(selects) == 3
+        assert not any(record.slow for record in sampled_handler.records)
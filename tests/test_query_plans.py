@@ -0,0 +1,117 @@
+import re
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from app.repositories.cache import LRUCache
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.user import UserCreate, UserUpdate
+
+# Полный просмотр таблицы без индекса; просмотр по индексу и виртуальные таблицы FTS5 допустимы
+FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+# Поиск строк-потомков, который SQLite выполняет при каскадах внешних ключей
+FK_LOOKUPS = [
+    ("SELECT 1 FROM orders WHERE user_id = ?", "ix_orders_user_id_order_date_id"),
+    ("SELECT 1 FROM orders WHERE address_id = ?", "ix_orders_address_id"),
+    ("SELECT 1 FROM addresses WHERE user_id = ?", "ix_addresses_user_id"),
+    ("SELECT 1 FROM order_items WHERE product_id = ?", "ix_order_items_product_id"),
+]
+
+
+async def explain(session, statement: str, parameters=()) -> list:
+    result = await session.connection()
+    rows = await result.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters))
+    return [row[-1] for row in rows]
+
+
+@pytest.fixture
+def captured_statements(engine):
+    """Все SELECT/UPDATE/DELETE, которые отправлены в БД за время теста"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+class TestQueryPlans:
+    @pytest.mark.asyncio
+    async def test_repository_queries_use_indexes(self, session, captured_statements):
+        """Тест: ни один запрос репозиториев не просматривает таблицу целиком"""
+        # Кэши отключены, чтобы get_by_id всегда доходил до БД
+        product_repository = ProductRepository(cache=LRUCache(maxsize=0))
+        user_repository = UserRepository(cache=LRUCache(maxsize=0), order_cache=LRUCache(maxsize=0))
+        order_repository = OrderRepository(cache=LRUCache(maxsize=0), product_cache=LRUCache(maxsize=0))
+
+        user = await user_repository.create(session, UserCreate(username="plan_user", email="plan@example.com"))
+        await user_repository.get_by_id(session, user.id)
+        await user_repository.update(session, user.id, UserUpdate(email="plan2@example.com"))
+        page = await user_repository.get_by_filter(session, 1, 1)
+        await user_repository.get_by_filter(session, 1, 1, after=user_repository.next_cursor(page, 1))
+        await user_repository.get_by_filter(session, 10, 1, username="plan")
+        await user_repository.get_by_filter(session, 10, 1, q="plan")
+
+        product = await product_repository.create(session, name="Plan Product", price=10.0, stock_quantity=5)
+        await product_repository.get_by_id(session, product.id)
+        await product_repository.get_by_ids(session, [product.id, uuid.uuid4()])
+        page = await product_repository.get_by_filter(session, 1, 1)
+        await product_repository.get_by_filter(session, 1, 1, after=product_repository.next_cursor(page, 1))
+        await product_repository.get_by_filter(session, 10, 2, min_price=5.0, max_price=20.0)
+        await product_repository.get_by_filter(session, 10, 1, q="plan")
+        await product_repository.upsert_many(session, [{"name": "Plan Product", "price": 11.0, "description": None, "stock_quantity": 5}])
+        await product_repository.update(session, product.id, price=12.0)
+
+        order = await order_repository.create(session, user.id, items=[{"product_id": product.id, "quantity": 1}])
+        await order_repository.get_by_id(session, order.id)
+        page = await order_repository.get_by_filter(session, 1, 1)
+        await order_repository.get_by_filter(session, 1, 1, after=order_repository.next_cursor(page, 1))
+        await order_repository.get_by_filter(session, 10, 1, user_id=user.id)
+        await order_repository.get_by_filter(session, 10, 1, status="pending")
+        await order_repository.get_by_filter(session, 10, 1, user_id=user.id, status="pending")
+        async for _ in order_repository.stream_by_filter(session, user_id=user.id):
+            pass
+        await order_repository.update(session, order.id, status="shipped")
+        await order_repository.delete(session, order.id)
+        await product_repository.delete(session, product.id)
+        await user_repository.delete(session, user.id)
+
+        statements = list(captured_statements)
+        assert len(statements) > 20
+        full_scans = []
+        for statement, parameters in statements:
+            for detail in await explain(session, statement, parameters):
+                if FULL_SCAN_RE.match(detail):
+                    full_scans.append(f"{detail}: {statement}")
+        await session.rollback()
+        assert not full_scans, "\n".join(full_scans)
+
+    @pytest.mark.asyncio
+    async def test_order_list_follows_composite_indexes(self, session):
+        """Тест: список заказов читается по составному индексу без сортировки во временном B-дереве"""
+        order_repository = OrderRepository()
+        cases = [
+            ({}, "ix_orders_order_date_id"),
+            ({"user_id": uuid.uuid4()}, "ix_orders_user_id_order_date_id"),
+            ({"status": "pending"}, "ix_orders_status_order_date_id"),
+        ]
+        for filters, index in cases:
+            stmt = order_repository._filter_stmt(**filters).order_by(*order_repository.cursor_columns).limit(10)
+            compiled = stmt.compile(session.bind.sync_engine, compile_kwargs={"literal_binds": True})
+            plan = await explain(session, str(compiled))
+            assert any(index in detail for detail in plan), plan
+            assert not any("TEMP B-TREE" in detail for detail in plan), plan
+
+    @pytest.mark.asyncio
+    async def test_foreign_key_lookups_use_indexes(self, session):
+        """Тест: каскады внешних ключей находят дочерние строки по индексу"""
+        for statement, index in FK_LOOKUPS:
+            plan = await explain(session, statement, ("x",))
+            assert any(detail.startswith("SEARCH") and index in detail for detail in plan), (statement, plan)
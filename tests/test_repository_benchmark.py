@@ -0,0 +1,34 @@
+from benchmarks.repository_benchmark import compare, merge_baseline
+
+
+def run(median_ms: float, queries: int = 1, size: str = "1000") -> dict:
+    return {"meta": {}, "results": {size: {"UserRepository.get_by_id": {"median_ms": median_ms, "min_ms": median_ms, "queries": queries}}}}
+
+
+class TestRegressionGate:
+    def test_slowdown_over_threshold_fails(self):
+        """Тест: рост медианы больше порога - регрессия, в пределах порога - нет"""
+        baseline = run(10.0)
+        assert compare(baseline, run(11.5), threshold=20, min_delta_ms=0.2) == []
+        regressions = compare(baseline, run(12.5), threshold=20, min_delta_ms=0.2)
+        assert len(regressions) == 1
+        assert "UserRepository.get_by_id @ 1000" in regressions[0]
+
+    def test_noise_below_min_delta_is_ignored(self):
+        """Тест: рост в доли миллисекунды у быстрого метода не считается регрессией"""
+        assert compare(run(0.1), run(0.25), threshold=20, min_delta_ms=0.2) == []
+
+    def test_extra_query_fails_regardless_of_time(self):
+        """Тест: лишний SQL-запрос - регрессия, даже если метод не замедлился"""
+        regressions = compare(run(10.0, queries=1), run(9.0, queries=2), threshold=20, min_delta_ms=0.2)
+        assert regressions == ["UserRepository.get_by_id @ 1000: 1 -> 2 queries"]
+
+    def test_methods_and_sizes_missing_from_baseline_are_skipped(self):
+        """Тест: новые методы и размеры без базовой линии не проваливают проверку"""
+        assert compare(run(1.0, size="1000"), run(100.0, size="100000"), threshold=20, min_delta_ms=0.2) == []
+
+    def test_update_keeps_other_sizes(self):
+        """Тест: обновление базовой линии заменяет только размеры текущего прогона"""
+        merged = merge_baseline(run(1.0, size="1000000"), run(2.0, size="1000"))
+        assert set(merged["results"]) == {"1000", "1000000"}
+        assert merged["results"]["1000"]["UserRepository.get_by_id"]["median_ms"] == 2.0
@@ -0,0 +1,47 @@
+import pytest
+
+from app.repositories.product_repository import ProductRepository
+from app.repositories.search import fts_query
+
+
+class TestProductSearch:
+    def test_fts_query_escapes_syntax(self):
+        """Тест экранирования ввода: операторы FTS5 не исполняются, слова ищутся по префиксу"""
+        assert fts_query('lamp OR "desk') == '"lamp"* "OR"* "desk"*'
+        assert fts_query("***") == ""
+
+    @pytest.mark.asyncio
+    async def test_search_ranked_and_synced(self, session):
+        """Тест поиска q: ранжирование bm25, синхронизация индекса триггерами при изменении и удалении"""
+        product_repository = ProductRepository()
+        lamp = await product_repository.create(session, name="Search Desk Lamp", price=1.0, description="bright light")
+        await product_repository.create(session, name="Search Chair", price=2.0, description="goes well with a desk lamp")
+        await product_repository.create(session, name="Search Table", price=3.0, description="oak")
+
+        found = await product_repository.get_by_filter(session, 10, 1, q="desk lamp")
+        # Совпадение в названии весит больше, чем в описании
+        assert [p.name for p in found] == ["Search Desk Lamp", "Search Chair"]
+        assert [p.name for p in await product_repository.get_by_filter(session, 10, 1, q="lam")][0] == "Search Desk Lamp"
+
+        await product_repository.update(session, lamp.id, name="Search Floor Torch")
+        assert [p.name for p in await product_repository.get_by_filter(session, 10, 1, q="torch")] == ["Search Floor Torch"]
+        await product_repository.delete(session, lamp.id)
+        assert await product_repository.get_by_filter(session, 10, 1, q="torch") == []
+
+        # Поиск подстроки остаётся доступным и находит середину слова
+        assert [p.name for p in await product_repository.get_by_filter(session, 10, 1, name="able")] == ["Search Table"]
+        with pytest.raises(ValueError):
+            await product_repository.get_by_filter(session, 10, 1, after="x", q="oak")
+        await session.rollback()
+
+
+def test_search_users_api(api_client):
+    """Тест параметра q у списка пользователей"""
+    api_client.post("/users", json={"username": "search_alice", "email": "alice@fts.example.com"})
+    api_client.post("/users", json={"username": "search_bob", "email": "bob@fts.example.com"})
+
+    response = api_client.get("/users", params={"q": "alice"})
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == ["search_alice"]
+    assert "x-next-cursor" not in response.headers
+    assert len(api_client.get("/users", params={"q": "fts example", "count": 1}).json()) == 1
@@ -0,0 +1,40 @@
+import json
+import uuid
+from datetime import datetime
+
+import msgspec
+
+from app.schemas.order import OrderResponse
+from app.schemas.product import ProductResponse
+from app.schemas.records import OrderRecord, ProductRecord, UserRecord, to_record, to_records
+from app.schemas.user import UserResponse
+from src.models import Order, OrderItem, Product, User
+
+
+def _user(email: str = "record@example.com") -> User:
+    now = datetime(2026, 1, 2, 3, 4, 5, 678901)
+    return User(id=uuid.uuid4(), username="record_user", email=email, created_at=now, updated_at=now)
+
+
+class TestRecords:
+    def test_records_match_pydantic_responses(self):
+        """Тест: быстрые структуры дают тот же JSON, что и pydantic-схемы ответов"""
+        product = Product(id=uuid.uuid4(), name="Record Product", price=9.5, description=None, stock_quantity=3)
+        order = Order(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), address_id=None, total_price=19.0, status="pending",
+            order_date=datetime(2026, 1, 2, 3, 4, 5),
+            items=[OrderItem(product_id=product.id, quantity=2, price_at_order=9.5)],
+        )
+        for row, record_type, schema in [
+            (_user(), UserRecord, UserResponse),
+            (product, ProductRecord, ProductResponse),
+            (order, OrderRecord, OrderResponse),
+        ]:
+            fast = json.loads(msgspec.json.encode(to_record(row, record_type)))
+            assert fast == json.loads(schema.model_validate(row).model_dump_json())
+            assert list(fast) == list(schema.model_fields)
+
+    def test_trusted_rows_are_not_revalidated(self):
+        """Тест: строки из БД не проверяются повторно - старый адрес не ломает весь список"""
+        records = to_records([_user("legacy-address"), _user()], UserRecord)
+        assert [record.email for record in records] == ["legacy-address", "record@example.com"]
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.cache import LRUCache
+from app.repositories.product_repository import ProductRepository
+from app.schemas.product import ProductCreate
+from app.services.product_service import ProductService
+from app.services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_load(self):
+        """Тест: одновременные вызовы с одним ключом выполняют load один раз и получают один результат"""
+        flight = SingleFlight("test")
+        calls = []
+
+        async def load(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return {"value": value}
+
+        results = await asyncio.gather(*(flight.do("a", lambda: load("a")) for _ in range(10)), flight.do("b", lambda: load("b")))
+        assert calls == ["a", "b"]
+        assert all(result is results[0] for result in results[:10])
+        assert flight.stats() == {"in_flight": 0, "leaders": 2, "followers": 9, "coalesced_ratio": 9 / 11}
+
+        # Завершённое чтение не запоминается
+        await flight.do("a", lambda: load("a"))
+        assert calls == ["a", "b", "a"]
+
+    @pytest.mark.asyncio
+    async def test_errors_and_leader_cancellation(self):
+        """Тест: ошибка чтения получают все ожидающие, а отмена ведущего не отменяет остальных"""
+        flight = SingleFlight("test")
+
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flight.do("k", broken), flight.do("k", broken), return_exceptions=True)
+        assert [str(result) for result in results] == ["boom", "boom"]
+
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", slow))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "done"
+        assert leader.cancelled()
+
+
+class TestServiceCoalescing:
+    @pytest.mark.asyncio
+    async def test_hot_reads_run_one_query(self, engine, tables):
+        """Тест: одновременные GET одного продукта и одной страницы - по одному SQL-запросу"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        # Пустой кэш: каждый вызов без объединения пошёл бы в БД
+        service = ProductService(ProductRepository(cache=LRUCache(maxsize=0)), SingleFlight("products"))
+        async with session_factory() as session:
+            product = await service.create(session, ProductCreate(name="Hot Flight", price=3.0))
+            await session.commit()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        async def read(call):
+            async with session_factory() as session:
+                return await call(session)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        try:
+            records = await asyncio.gather(*(read(lambda s: service.get_record(s, product.id)) for _ in range(20)))
+            by_id = len(statements)
+            pages = await asyncio.gather(*(read(lambda s: service.get_page(s, 5, 1, name="Hot Flight")) for _ in range(20)))
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+        assert by_id == 1
+        assert len(statements) == 2
+        assert {record.price for record in records} == {3.0}
+        assert all(page is pages[0] for page in pages)
+        assert [record.name for record in pages[0][0]] == ["Hot Flight"]
+        assert service.reads.stats()["followers"] == 38
+
+    @pytest.mark.asyncio
+    async def test_write_starts_a_new_flight(self, engine, tables):
+        """Тест: после записи ключ с новой версией не присоединяется к чтению, начатому до неё"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        service = ProductService(ProductRepository(cache=LRUCache(maxsize=0)), SingleFlight("products"))
+        async with session_factory() as session:
+            product = await service.create(session, ProductCreate(name="Versioned Flight", price=1.0))
+            await session.commit()
+
+        # Чтение задерживается, пока тест не откроет ворота: запись успевает закоммититься во время него
+        gate = asyncio.Event()
+        load = service._load_record
+
+        async def gated(session, product_id):
+            await gate.wait()
+            return await load(session, product_id)
+
+        service._load_record = gated
+        async with session_factory() as first, session_factory() as second, session_factory() as third:
+            before = asyncio.gather(service.get_record(first, product.id), service.get_record(second, product.id))
+            await asyncio.sleep(0)
+            async with session_factory() as writer:
+                await service.product_repository.update(writer, product.id, price=2.0)
+                await writer.commit()
+            after = asyncio.ensure_future(service.get_record(third, product.id))
+            await asyncio.sleep(0)
+            gate.set()
+            await before
+            after = await after
+
+        assert after.price == 2.0
+        assert (service.reads.leaders, service.reads.followers) == (2, 1)
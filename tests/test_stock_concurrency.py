@@ -0,0 +1,214 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+import pytest
+from litestar.testing import create_async_test_client
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.controllers.order_controller import OrderController
+from app.controllers.product_controller import ProductController
+from app.controllers.user_controller import UserController
+from app.repositories.order_repository import OrderRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas.order import OrderCreate, OrderItemBase
+from app.schemas.user import UserCreate
+from app.services.order_service import OrderService
+from src.models import Order, Product, User, order_items
+
+
+CONCURRENT_ORDERS = 300
+
+
+async def _legacy_create_order(
+    session: AsyncSession,
+    order_data: OrderCreate,
+    before_write: Optional[Callable[[], Awaitable[None]]] = None,
+) -> Order:
+    """Прежний путь размещения: прочитать остаток в Python, проверить и записать новое значение.
+
+    before_write вызывается между чтением остатка и записью - тест задаёт им чередование.
+    """
+    if not await session.scalar(select(User).where(User.id == order_data.user_id)):
+        raise ValueError(f"User with id {order_data.user_id} not found")
+    for item in order_data.items:
+        product = await session.scalar(select(Product).where(Product.id == item.product_id))
+        if product.stock_quantity < item.quantity:
+            raise ValueError(f"Insufficient stock for product {item.product_id}")
+    if before_write is not None:
+        await before_write()
+
+    order = Order(user_id=order_data.user_id, total_price=0.0, status="pending")
+    session.add(order)
+    await session.flush()
+    await session.refresh(order)
+    for item in order_data.items:
+        product = await session.get(Product, item.product_id)
+        if product.stock_quantity < item.quantity:
+            raise ValueError(f"Not enough stock for product {item.product_id}")
+        product.stock_quantity -= item.quantity
+        await session.execute(order_items.insert().values(
+            order_id=order.id, product_id=item.product_id,
+            quantity=item.quantity, price_at_order=product.price,
+        ))
+        order.total_price += product.price * item.quantity
+    await session.flush()
+    await session.refresh(order)
+    return order
+
+
+async def _place_concurrently(engine, place, prefix: str, stock: int):
+    """Разместить CONCURRENT_ORDERS заказов на один продукт параллельно.
+
+    Возвращает число принятых заказов, заказов в БД, итоговый остаток и число
+    запросов к БД на один принятый заказ.
+    """
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        user = await UserRepository().create(
+            session, UserCreate(username=f"{prefix}_user", email=f"{prefix}@example.com")
+        )
+        product = await ProductRepository().create(
+            session, name=f"{prefix} product", price=1.0, stock_quantity=stock
+        )
+        await session.commit()
+
+    order_data = OrderCreate(user_id=user.id, items=[OrderItemBase(product_id=product.id, quantity=1)])
+
+    async def place_one() -> bool:
+        async with session_factory() as session:
+            try:
+                await place(session, order_data)
+            except ValueError:
+                # Отказ по остатку; ошибка блокировки SQLite - провал теста, а не отказ
+                await session.rollback()
+                return False
+            await session.commit()
+            return True
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        results = await asyncio.gather(*(place_one() for _ in range(CONCURRENT_ORDERS)))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    async with session_factory() as session:
+        stock_left = await session.scalar(
+            select(Product.stock_quantity).where(Product.id == product.id)
+        )
+        orders_stored = len((await session.execute(
+            select(order_items.c.order_id).where(order_items.c.product_id == product.id)
+        )).all())
+    return sum(results), orders_stored, stock_left, statements / max(sum(results), 1)
+
+
+class TestStockConcurrency:
+    @pytest.mark.asyncio
+    async def test_no_oversell_under_concurrent_post(self, api_dependencies):
+        """Стресс-тест: сотни параллельных POST /orders на один продукт не уводят остаток в минус"""
+        stock = 100
+        async with create_async_test_client(
+            route_handlers=[UserController, ProductController, OrderController],
+            dependencies=api_dependencies,
+        ) as client:
+            user = (await client.post("/users", json={"username": "hot_buyer", "email": "hot@example.com"})).json()
+            product = (await client.post(
+                "/products", json={"name": "Hot Product", "price": 9.5, "stock_quantity": stock}
+            )).json()
+
+            payload = {"user_id": user["id"], "items": [{"product_id": product["id"], "quantity": 1}]}
+            responses = await asyncio.gather(
+                *(client.post("/orders", json=payload) for _ in range(CONCURRENT_ORDERS))
+            )
+            stock_left = (await client.get(f"/products/{product['id']}")).json()["stock_quantity"]
+
+        accepted = [response for response in responses if response.status_code == 201]
+        rejected = [response for response in responses if response.status_code != 201]
+        # Каждый отказ - по остатку (400), а не 500 от блокировки базы
+        assert len(accepted) == stock
+        assert all(response.status_code == 400 for response in rejected)
+        assert stock_left == 0
+
+    @pytest.mark.asyncio
+    async def test_duplicate_items_are_merged(self, session):
+        """Тест: повторы продукта в позициях списываются суммой, а при нехватке суммы заказ отклоняется"""
+        order_repository = OrderRepository()
+        user = await UserRepository().create(session, UserCreate(username="dup_items_user", email="dup_items@example.com"))
+        product = await ProductRepository().create(session, name="Duplicate Items", price=2.0, stock_quantity=5)
+
+        order = await order_repository.create(session, user.id, items=[
+            {"product_id": product.id, "quantity": 2},
+            {"product_id": product.id, "quantity": 2},
+        ])
+        stock_left = await session.scalar(select(Product.stock_quantity).where(Product.id == product.id))
+        assert [(item.product_id, item.quantity) for item in order.items] == [(product.id, 4)]
+        assert (order.total_price, stock_left) == (8.0, 1)
+
+        with pytest.raises(ValueError, match="Not enough stock"):
+            await order_repository.create(session, user.id, items=[
+                {"product_id": product.id, "quantity": 1},
+                {"product_id": product.id, "quantity": 1},
+            ])
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_read_check_write_loses_update(self, engine, tables):
+        """Тест: прежнее чтение-проверка-запись теряет списание, если оба заказа прочитали остаток до записи"""
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            user = await UserRepository().create(session, UserCreate(username="lost_user", email="lost@example.com"))
+            product = await ProductRepository().create(session, name="Lost Update", price=1.0, stock_quantity=10)
+            await session.commit()
+        order_data = OrderCreate(user_id=user.id, items=[OrderItemBase(product_id=product.id, quantity=1)])
+
+        # Ни один заказ не пишет, пока оба не прочитали остаток
+        arrived = 0
+        both_read = asyncio.Event()
+
+        async def rendezvous() -> None:
+            nonlocal arrived
+            arrived += 1
+            if arrived == 2:
+                both_read.set()
+            await both_read.wait()
+
+        async def place() -> None:
+            async with session_factory() as session:
+                await _legacy_create_order(session, order_data, before_write=rendezvous)
+                await session.commit()
+
+        await asyncio.gather(place(), place())
+        async with session_factory() as session:
+            stock_left = await session.scalar(select(Product.stock_quantity).where(Product.id == product.id))
+            stored = len((await session.execute(
+                select(order_items.c.order_id).where(order_items.c.product_id == product.id)
+            )).all())
+        # Два заказа сохранены, а со склада ушла одна штука
+        assert (stored, stock_left) == (2, 9)
+
+    @pytest.mark.asyncio
+    async def test_guarded_update_uses_fewer_statements(self, engine, tables):
+        """Тест: условный UPDATE не продаёт лишнего и выполняет меньше запросов на заказ, чем чтение-проверка-запись.
+
+        Сравнивается число запросов к БД на принятый заказ, а не пропускная
+        способность: время параллельных прогонов в тестах нестабильно.
+        """
+        service = OrderService(OrderRepository(), UserRepository(), ProductRepository())
+        stock = CONCURRENT_ORDERS * 2
+
+        accepted, stored, stock_left, statements_per_order = await _place_concurrently(
+            engine, service.create_order, "guarded", stock
+        )
+        assert accepted == stored == CONCURRENT_ORDERS
+        assert stock_left == stock - CONCURRENT_ORDERS
+
+        *_, legacy_statements_per_order = await _place_concurrently(engine, _legacy_create_order, "legacy", stock)
+        assert statements_per_order < legacy_statements_per_order
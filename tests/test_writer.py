@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.database import configure_sqlite
+from app.repositories.product_repository import ProductRepository
+from app.writer import GroupCommitWriter
+from src.models import Product
+
+
+@pytest.fixture
+async def writer(engine, tables):
+    writer_engine = configure_sqlite(create_async_engine(engine.url, poolclass=NullPool), "throughput", begin="DEFERRED")
+    writer = GroupCommitWriter(sessionmaker(writer_engine, class_=AsyncSession, expire_on_commit=False), max_delay=0.05)
+    yield writer
+    await writer.stop()
+    await writer_engine.dispose()
+
+
+class TestGroupCommitWriter:
+    @pytest.mark.asyncio
+    async def test_batch_commits_once_and_isolates_failures(self, writer):
+        """Тест группового commit: пачка фиксируется одной транзакцией, ошибка откатывает только свою работу"""
+        product_repository = ProductRepository()
+
+        def create(name: str):
+            return lambda session: product_repository.create(session, name=name, price=1.0)
+
+        async def fail(session):
+            await product_repository.create(session, name="Writer Failing", price=1.0)
+            raise ValueError("rejected")
+
+        results = await asyncio.gather(
+            writer.submit(create("Writer A")),
+            writer.submit(create("Writer A")),
+            writer.submit(fail),
+            writer.submit(create("Writer B")),
+            return_exceptions=True,
+        )
+        assert results[0].name == "Writer A"
+        assert isinstance(results[1], IntegrityError)
+        assert isinstance(results[2], ValueError)
+        assert results[3].name == "Writer B"
+        assert writer.batches == 1
+
+        names = await writer.submit(
+            lambda session: session.scalars(select(Product.name).where(Product.name.like("Writer %")).order_by(Product.name))
+        )
+        assert names.all() == ["Writer A", "Writer B"]
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_queue(self, writer):
+        """Тест остановки: уже поставленные работы выполняются до выхода задачи записи"""
+        pending = [
+            asyncio.ensure_future(writer.submit(lambda session: session.scalar(select(func.count(Product.id)))))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        await writer.stop()
+        assert all(isinstance(task.result(), int) for task in pending)